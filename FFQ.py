@@ -1,23 +1,63 @@
 # AI Enterprise Integration Financial Intelligence Platform
+import time
+SCRIPT_STARTED = time.perf_counter()  # the startup report times the imports below
+
 import streamlit as st
 import pandas as pd
 import numpy as np
-from io import BytesIO
+import json
+import os
+import tempfile
+import threading
+from importlib.util import find_spec
 
-# Handle plotly import with fallback
-try:
-    import plotly.graph_objects as go
-    import plotly.express as px
-    PLOTLY_AVAILABLE = True
-except ImportError:
-    PLOTLY_AVAILABLE = False
+from financial_engine import (
+    MONTHS, MAX_HORIZON_MONTHS, GRANULARITIES, AI_ENTERPRISE_DEFAULTS, AI_ENTERPRISE_PARAMS, MONTE_CARLO_METRICS, SCENARIO_PRESETS,
+    ModelMemo, batch_stacked_frame, client_cohort_matrix, compact_financials, generate_ai_enterprise_financials_batch, horizon_periods, parameter_bounds,
+    scenario_cache_key, simulate_ai_enterprise_financials, parameter_grid, sensitivity_grid, optimize_scenario,
+)
+from profiling import RerunProfiler, StartupReport
+from result_cache import ResultCache
+from scenario_store import SUMMARY_COLUMNS, ScenarioStore, scenario_summary
+from table_view import DEFAULT_PAGE_SIZE, PAGE_SIZES, column_format, page_count, table_page
+
+# Plotly and the chart builders are imported by the first run that draws a figure (plotting())
+PLOTLY_AVAILABLE = find_spec("plotly") is not None
+if not PLOTLY_AVAILABLE:
     st.error("⚠️ Plotly not available. Installing plotly will enable advanced visualizations.")
 
+@st.cache_resource
+def plotting():
+    """(plotly.graph_objects, charts), imported once per server process"""
+    import plotly.graph_objects as go
+    import charts
+    return go, charts
+
+# -----------------------------
+# Cold-start report: phases from launch to this server process's first rendered run
+# -----------------------------
+@st.cache_resource
+def get_startup_report():
+    return StartupReport()
+
+startup_report = get_startup_report()
+startup_run = startup_report.begin(SCRIPT_STARTED)
+
 # -----------------------------
 # Page setup & light theming
 # -----------------------------
 st.set_page_config(page_title="AI Enterprise Integration Financial Model", layout="wide")
 
+# -----------------------------
+# Opt-in rerun profiler (sidebar toggle, or ?profile=1 in the URL)
+# -----------------------------
+PROFILE_QUERY_VALUES = {"1", "true", "yes", "on"}
+PROFILE_HISTORY_DEFAULT = 20
+
+profiler = st.session_state.setdefault("rerun_profiler", RerunProfiler(PROFILE_HISTORY_DEFAULT))
+profile_default = st.query_params.get("profile", "").lower() in PROFILE_QUERY_VALUES
+profiler.start_rerun(st.session_state.get("profile_reruns", profile_default))
+
 CUSTOM_CSS = """
 <style>
 /* Global tweaks */
@@ -31,7 +71,8 @@ h1, h2, h3 { font-weight: 700; }
 st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 
 st.title("🤖 Vx AI Enterprise Integration Financial Intelligence Platform")
-st.markdown("### 🎯 Advanced Scenario Modeling for Enterprise AI Transformation (36-Month Forecast)")
+# The horizon widget lives in the sidebar; its value from the last run labels the header
+st.markdown(f"### 🎯 Advanced Scenario Modeling for Enterprise AI Transformation ({st.session_state.get('forecast_months', MONTHS)}-Month Forecast)")
 
 # Add professional header with key value props
 st.markdown("""
@@ -42,10 +83,193 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # -----------------------------
-# Session state for scenarios
+# Shared result cache (one per server process, shared by all sessions)
 # -----------------------------
-if "scenarios" not in st.session_state:
-    st.session_state.scenarios = {}
+RESULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+@st.cache_resource
+def get_result_cache():
+    return ResultCache(max_bytes=RESULT_CACHE_MAX_BYTES)
+
+result_cache = get_result_cache()
+
+# Model graph nodes shared by every session: a new parameter set only recomputes the
+# nodes downstream of the inputs that changed
+MODEL_MEMO_MAX_BYTES = 64 * 1024 * 1024
+
+@st.cache_resource
+def get_model_memo():
+    return ModelMemo(max_bytes=MODEL_MEMO_MAX_BYTES)
+
+model_memo = get_model_memo()
+
+def cached_financials(periods, params, granularity="monthly"):
+    """Per-period financials for a parameter set, computed once per server process.
+
+    The cache holds the compact form; callers expand it with .to_frame() for display.
+    """
+    return result_cache.get_or_compute(
+        ("financials", periods, granularity) + scenario_cache_key(params),
+        lambda: compact_financials(periods, params, granularity, memo=model_memo)
+    )
+
+# The cohort chart groups acquisitions by year, or by longer blocks to stay within this many cohorts
+COHORT_CHART_MAX_COHORTS = 20
+
+def cached_client_cohorts(periods, params, granularity, cohort_months):
+    """Active clients by acquisition cohort for a parameter set, computed once per server process"""
+    return result_cache.get_or_compute(
+        ("client_cohorts", periods, granularity, cohort_months) + scenario_cache_key(params),
+        lambda: client_cohort_matrix(generate_ai_enterprise_financials_batch(periods, params, granularity=granularity, memo=model_memo),
+                                     0, cohort_months)
+    )
+
+def cached_summary(periods, params, granularity="monthly"):
+    """Summary KPIs (NPV, IRR, payback, ...) for a parameter set, computed once per server process"""
+    return result_cache.get_or_compute(
+        ("summary", periods, granularity) + scenario_cache_key(params),
+        lambda: scenario_summary(periods, params, granularity, memo=model_memo)
+    )
+
+def cached_gradients(periods, params, granularity="monthly"):
+    """Partial derivatives of the summary metrics for a parameter set (scenario_gradients), computed once per server process"""
+    def build():
+        from model_derivatives import scenario_gradients
+        return scenario_gradients(periods, params, granularity)
+    return result_cache.get_or_compute(("gradients", periods, granularity) + scenario_cache_key(params), build)
+
+def cached_what_if(periods, params, granularity, metric, step_pct):
+    """First-order change in a summary metric for a step_pct increase of each input (what_if_deltas), computed once per server process"""
+    def build():
+        from model_derivatives import what_if_deltas
+        return what_if_deltas(cached_gradients(periods, params, granularity)[metric], params, step_pct)
+    return result_cache.get_or_compute(("what_if", periods, granularity, metric, step_pct) + scenario_cache_key(params), build)
+
+def cached_figures(kind, builders, frames_key, *args, **kwargs):
+    """Figures memoized on a hash of their input data, plus whether this call was a cache hit"""
+    key = ("figures", kind, frames_key, tuple(sorted(kwargs.items())))
+    missing = object()
+    figs = result_cache.get(key, missing)
+    if figs is not missing:
+        return figs, True
+    return result_cache.put(key, plotting()[1].build_figures(builders, *args, **kwargs)), False
+
+def show_chart(name, fig, container=st):
+    """Render one Plotly figure, timed as its own profiler stage"""
+    with profiler.stage(f"chart: {name}"):
+        container.plotly_chart(fig, use_container_width=True)
+
+def show_figure_stats(figs, cache_hit):
+    """Per-figure build time and payload size for the last build of these charts"""
+    with st.expander("📈 Chart build stats"):
+        st.caption("Served from cache this run" if cache_hit else "Built this run")
+        st.dataframe(pd.DataFrame({
+            "Figure": list(figs),
+            "Build (ms)": [f["build_seconds"] * 1000 for f in figs.values()],
+            "Payload (KB)": [f["payload_bytes"] / 1024 for f in figs.values()],
+            "Traces": [len(f["figure"].data) for f in figs.values()],
+        }).round(1), use_container_width=True, hide_index=True)
+
+def cohort_block_months(months):
+    """Months per acquisition cohort on the cohort chart: a year, or longer blocks on long horizons"""
+    return 12 * max(-(-months // (12 * COHORT_CHART_MAX_COHORTS)), 1)
+
+def warm_scenario(params, months=MONTHS, granularity="monthly"):
+    """Fill the shared caches with everything the dashboard and what-if hints show for a parameter set"""
+    periods = horizon_periods(months, granularity)
+    df = cached_financials(periods, params, granularity).to_frame()
+    cached_summary(periods, params, granularity)
+    cached_gradients(periods, params, granularity)
+    if PLOTLY_AVAILABLE:
+        _, charts = plotting()
+        cached_figures("dashboard", charts.DASHBOARD_FIGURES, charts.frame_fingerprint(df), df, downsample=True)
+        cohort_months = cohort_block_months(months)
+        cohort_labels, cohort_clients = cached_client_cohorts(periods, params, granularity, cohort_months)
+        cached_figures("cohorts", charts.COHORT_FIGURES, (periods, granularity, cohort_months) + scenario_cache_key(params),
+                       cohort_labels, cohort_clients, GRANULARITIES[granularity][1], downsample=True)
+
+def warm_presets():
+    """Warm the one-click presets; runs in the background once the first run has rendered"""
+    with startup_report.phase("warm cache: presets"):
+        for params in SCENARIO_PRESETS.values():
+            warm_scenario(params)
+
+# The first run of a server process shows the defaults, so compute them up front
+if startup_run:
+    with startup_report.phase("warm cache: defaults"):
+        warm_scenario(AI_ENTERPRISE_DEFAULTS)
+
+# -----------------------------
+# Saved scenarios (on-disk store: parameters + summary KPIs only)
+# -----------------------------
+SCENARIO_DB_PATH = os.environ.get("AI_ENTERPRISE_SCENARIO_DB", "scenarios.db")
+
+@st.cache_resource
+def get_scenario_store():
+    return ScenarioStore(SCENARIO_DB_PATH)
+
+scenario_store = get_scenario_store()
+
+def iter_saved_scenario_frames(names):
+    """Yield (name, DataFrame) for stored scenarios one at a time, bypassing the result cache"""
+    for name in names:
+        periods, params, granularity = scenario_store.get(name)
+        yield name, compact_financials(periods, params, granularity).to_frame()
+
+def saved_scenario_frame(name):
+    """Recompute (or fetch from the result cache) the full series of a stored scenario"""
+    periods, params, granularity = scenario_store.get(name)
+    return cached_financials(periods, params, granularity).to_frame()
+
+# Ranking options: store column -> label; SCENARIO_SORT_ASCENDING columns rank low values first
+SCENARIO_SORT_OPTIONS = {
+    "cumulative_profit": "Cumulative Profit",
+    "final_roi_pct": "Final ROI %",
+    "final_profit": "Final Profit",
+    "cumulative_revenue": "Cumulative Revenue",
+    "final_revenue": "Final Revenue",
+    "break_even_month": "Earliest Break-even",
+    "npv": "NPV",
+    "irr_pct": "IRR",
+    "payback_month": "Earliest Payback",
+    "created_at": "Date Saved",
+    "name": "Name",
+}
+SCENARIO_SORT_ASCENDING = {"break_even_month", "payback_month", "name"}
+
+# Full time series are loaded for at most this many top-ranked scenarios
+MAX_SERIES_SCENARIOS = 10
+
+# -----------------------------
+# Stored sweeps (Arrow IPC files, read through a memory map)
+# -----------------------------
+SWEEP_DIR = os.environ.get("AI_ENTERPRISE_SWEEP_DIR", "sweeps")
+COMPARE_SOURCES = ["Saved scenarios", "Stored sweep"]
+# A sensitivity grid is stored only up to this many scenario x period rows (about 200 bytes each on disk)
+MAX_STORED_SWEEP_ROWS = 10_000_000
+
+@st.cache_resource(max_entries=4)
+def open_sweep(path, modified_ns):
+    """Memory-mapped sweep shared by all sessions; modified_ns in the key reopens a rewritten file"""
+    from arrow_io import SweepFile
+    return SweepFile(path)
+
+# -----------------------------
+# Settings inputs and presets
+# -----------------------------
+# Settings inputs are keyed input_<parameter> and seeded with the balanced preset (the
+# defaults); a preset button writes its values there before the inputs render.
+def preset_widget_values(preset):
+    """Session state for the Settings inputs under a preset; sales commission is entered in whole percent"""
+    return {f"input_{name}": round(value * 100) if name == "sales_commission_pct" else value
+            for name, value in SCENARIO_PRESETS[preset].items()}
+
+def apply_preset(preset):
+    """Preset button callback: load the preset into the Settings inputs"""
+    st.session_state.update(preset_widget_values(preset))
+
+for key, default in preset_widget_values("balanced").items():
+    st.session_state.setdefault(key, default)
 
 # -----------------------------
 # Sidebar: enterprise scenario management
@@ -53,145 +277,232 @@ if "scenarios" not in st.session_state:
 with st.sidebar:
     st.header("🎯 Enterprise AI Scenarios")
     scenario_name = st.text_input("Scenario Name", "Conservative AI Rollout")
+    scenario_tags = st.text_input("Tags (comma-separated)", "", help="Used to filter the scenario library")
+
+    st.markdown("### 📅 Forecast Horizon")
+    forecast_months = st.number_input("Horizon (months)", 12, MAX_HORIZON_MONTHS, MONTHS, 12, key="forecast_months",
+                                      help="10 years = 120 months; multi-decade horizons up to 100 years")
+    granularity = st.radio("Granularity", list(GRANULARITIES), format_func=str.title, horizontal=True, key="granularity",
+                           help="Inputs stay quoted per month; weekly runs convert them to per-week amounts")
+    forecast_periods = horizon_periods(forecast_months, granularity)
+    period_label = GRANULARITIES[granularity][1]
+    model_bounds = parameter_bounds(forecast_months)
+    st.caption(f"{forecast_periods:,} {period_label.lower()}s per scenario")
     
     st.markdown("### 📊 Quick Scenario Presets")
-    if st.button("🚀 Aggressive AI Transformation", use_container_width=True):
-        st.session_state.preset = "aggressive"
-    if st.button("📈 Balanced Integration", use_container_width=True):
-        st.session_state.preset = "balanced"
-    if st.button("🛡️ Conservative Rollout", use_container_width=True):
-        st.session_state.preset = "conservative"
+    st.button("🚀 Aggressive AI Transformation", use_container_width=True, on_click=apply_preset, args=("aggressive",))
+    st.button("📈 Balanced Integration", use_container_width=True, on_click=apply_preset, args=("balanced",))
+    st.button("🛡️ Conservative Rollout", use_container_width=True, on_click=apply_preset, args=("conservative",))
     
     st.caption("💡 Use the **Settings** tab to configure detailed parameters. Click **Save Scenario** to preserve analysis.")
 
-# ===========================================================
-# Core computation (integer-safe), pricing & capacity rules
-# ===========================================================
-def generate_ai_enterprise_financials(
-    # AI Enterprise Integration Model
-    months, 
-    # AI Implementation Services
-    start_ai_implementations, end_ai_implementations, avg_implementation_value, 
-    start_ai_consulting_monthly, end_ai_consulting_monthly,
-    # AI Training & Support Services  
-    num_enterprise_clients, start_training_hours, end_training_hours, training_rate_per_hour, 
-    start_support_services_monthly, end_support_services_monthly,
-    # Business Development & Operations
-    sales_commission_pct, marketing_cost_monthly, marketing_start_month,
-    # Advanced AI Metrics
-    ai_adoption_acceleration_factor, enterprise_retention_rate
-):
-    idx = np.arange(1, months + 1)
-
-    # ---- AI Enterprise Integration Financial Model ----
-    
-    # AI Implementation Services (core revenue driver)
-    ai_implementations_per_month = np.linspace(start_ai_implementations, end_ai_implementations, months)
-    # Apply AI adoption acceleration (exponential growth factor)
-    ai_implementations_per_month = ai_implementations_per_month * (1 + (idx - 1) * ai_adoption_acceleration_factor / 100)
-    ai_implementation_revenue = ai_implementations_per_month * avg_implementation_value
-    ai_consulting_revenue = np.linspace(start_ai_consulting_monthly, end_ai_consulting_monthly, months)
-    
-    # AI Training & Support Services (recurring revenue)
-    training_hours_per_month = np.linspace(start_training_hours, end_training_hours, months)
-    # Apply enterprise retention factor to training hours
-    training_hours_per_month = training_hours_per_month * (enterprise_retention_rate / 100)
-    training_revenue = training_hours_per_month * training_rate_per_hour
-    support_services_revenue = np.linspace(start_support_services_monthly, end_support_services_monthly, months)
-    
-    # Round for display
-    ai_implementations_display = np.rint(ai_implementations_per_month).astype(int)
-    training_hours_display = np.rint(training_hours_per_month).astype(int)
-    
-    # Map to existing column structure for compatibility
-    rental_rev_eventspace = ai_implementation_revenue
-    managed_rev_eventspace = ai_consulting_revenue
-    conf_rental_revenue = training_revenue
+    chart_downsample = st.checkbox("📉 Downsample long chart series", True,
+                                   help="Lines keep each bucket's min and max so peaks survive; stacked bars show each bucket's average. Long horizons stay light")
 
-    # Map support services to final revenue stream
-    conf_managed_revenue = support_services_revenue
-    
-    # ---- Total AI Enterprise Revenue ----
-    total_revenue = (ai_implementation_revenue + ai_consulting_revenue +
-                     training_revenue + support_services_revenue)
+    with st.expander("⚡ Result Cache"):
+        cache_stats = result_cache.stats()
+        st.caption(f"{cache_stats['entries']} entries • {cache_stats['bytes'] / 1024:,.0f} KB of {cache_stats['max_bytes'] / 1024**2:,.0f} MB")
+        st.caption(f"Hits {cache_stats['hits']:,} • Misses {cache_stats['misses']:,} • Evictions {cache_stats['evictions']:,} • Hit rate {cache_stats['hit_rate']:.0%}")
+        node_stats = pd.DataFrame.from_dict(model_memo.stats(), orient="index")
+        node_hits, node_misses = node_stats["hits"].sum(), node_stats["misses"].sum()
+        st.caption(f"Model nodes: {node_hits:,} reused • {node_misses:,} recomputed"
+                   + (f" • hit rate {node_hits / (node_hits + node_misses):.0%}" if node_hits + node_misses else ""))
+        if model_memo.last_recomputed:
+            st.caption("Last evaluation recomputed: " + ", ".join(model_memo.last_recomputed))
+        st.dataframe(node_stats.rename(columns={"hits": "Hits", "misses": "Recomputed", "compute_seconds": "Compute (s)"}),
+                     column_config={"Compute (s)": st.column_config.NumberColumn(format="%.4f")})
 
-    # ---- AI Enterprise Costs ----
-    # Sales commission (percentage of revenue)
-    sales_commission = (total_revenue * sales_commission_pct).round(0)
-    
-    # Marketing costs start from specified month (growth investment)
-    marketing_costs = np.zeros(months)
-    marketing_costs[marketing_start_month-1:] = int(marketing_cost_monthly)
-    
-    # AI Implementation delivery costs (25% of implementation revenue)
-    implementation_costs = ai_implementations_per_month * (avg_implementation_value * 0.25)
-    
-    total_costs = sales_commission + marketing_costs + implementation_costs
-    profit = total_revenue - total_costs
-    roi_pct = np.where(total_costs > 0, profit / total_costs * 100, 0)
-
-    df = pd.DataFrame({
-        "Month": idx,
-
-        # AI Implementation Metrics
-        "AI Implementations per Month": ai_implementations_display,
-        "Avg Implementation Value ($)": [int(avg_implementation_value)] * months,
-        "AI Adoption Acceleration (%)": [round(ai_adoption_acceleration_factor, 2)] * months,
-
-        # AI Training & Support
-        "Enterprise Clients": [int(num_enterprise_clients)] * months,
-        "Training Hours per Month": training_hours_display,
-        "Training Rate per Hour ($)": [int(training_rate_per_hour)] * months,
-        "Enterprise Retention Rate (%)": [round(enterprise_retention_rate, 1)] * months,
-
-        # Revenue Streams
-        "Rev: AI Implementation Services": rental_rev_eventspace.astype(int),
-        "Rev: AI Consulting Services": managed_rev_eventspace.astype(int),
-        "Rev: AI Training Services": conf_rental_revenue.astype(int),
-        "Rev: AI Support Services": conf_managed_revenue.astype(int),
-        "Revenue: Total": total_revenue.astype(int),
-
-        # Cost Structure
-        "Cost: Sales Commission": sales_commission.astype(int),
-        "Cost: Marketing Investment": marketing_costs.astype(int),
-        "Cost: Implementation Delivery": implementation_costs.astype(int),
-        "Costs: Total": total_costs.astype(int),
-        
-        # Performance Metrics
-        "Profit": profit.astype(int),
-        "ROI %": roi_pct.round(1),
-        "Revenue per Implementation ($)": np.where(ai_implementations_display > 0, total_revenue / ai_implementations_display, 0).round(0),
-    })
-    return df
-
-# =========================================
-# Default settings (can be adjusted in UI)
-# =========================================
-MONTHS = 36
-
-AI_ENTERPRISE_DEFAULTS = dict(
-    # AI Implementation Services
-    start_ai_implementations=2, end_ai_implementations=15,
-    avg_implementation_value=125000,
-    start_ai_consulting_monthly=25000, end_ai_consulting_monthly=200000,
-    # AI Training & Support
-    num_enterprise_clients=5, start_training_hours=80, end_training_hours=500,
-    training_rate_per_hour=300,
-    start_support_services_monthly=15000, end_support_services_monthly=150000,
-    # Business Operations
-    sales_commission_pct=0.15, marketing_cost_monthly=25000,
-    # Advanced AI Metrics
-    ai_adoption_acceleration_factor=2.5, enterprise_retention_rate=95.0
-)
+    st.toggle("🩺 Profile reruns", profile_default, key="profile_reruns",
+              help="Times each stage of every rerun (computation, tabs, charts, export); also enabled by ?profile=1")
+
+# Display names for model inputs in sweeps and optimizers
+PARAMETER_LABELS = {
+    "start_ai_implementations": "AI Implementations (Month 1)",
+    "end_ai_implementations": "AI Implementations (Final Month)",
+    "avg_implementation_value": "Average Implementation Value ($)",
+    "start_ai_consulting_monthly": "AI Consulting Revenue (Month 1) ($)",
+    "end_ai_consulting_monthly": "AI Consulting Revenue (Final Month) ($)",
+    "start_training_hours": "Training Hours (Month 1)",
+    "end_training_hours": "Training Hours (Final Month)",
+    "training_rate_per_hour": "Training Rate per Hour ($)",
+    "start_support_services_monthly": "Support Services Revenue (Month 1) ($)",
+    "end_support_services_monthly": "Support Services Revenue (Final Month) ($)",
+    "sales_commission_pct": "Sales Commission (share of revenue)",
+    "marketing_cost_monthly": "Monthly Marketing Investment ($)",
+    "marketing_start_month": "Marketing Start Month",
+    "ai_adoption_acceleration_factor": "AI Adoption Acceleration Factor (%)",
+    "enterprise_retention_rate": "Enterprise Retention Rate (%)",
+    "new_client_share": "New Clients per Implementation",
+    "client_expansion_rate": "Client Expansion Rate (% per month)",
+    "initial_investment": "Initial Investment ($)",
+    "discount_rate": "Discount Rate (% per year)",
+}
+# Every differentiable input, including those not offered for sweeps
+INPUT_LABELS = {**PARAMETER_LABELS, "num_enterprise_clients": "Number of Enterprise Clients"}
+
+# Optimizer goals: label -> (summarize_batch objective, maximize?)
+OPTIMIZER_GOALS = {
+    "Maximize cumulative profit": ("cumulative_profit", True),
+    "Earliest break-even month": ("break_even_month", False),
+    "Maximize final-period ROI": ("final_roi_pct", True),
+    "Maximize NPV": ("npv", True),
+    "Earliest payback month": ("payback_month", False),
+}
+OPTIMIZER_DEFAULT_VARIABLES = ["marketing_start_month", "marketing_cost_monthly", "sales_commission_pct",
+                               "start_ai_implementations", "end_ai_implementations"]
+
+# Heatmap metrics: summarize_batch key -> label
+SENSITIVITY_METRICS = {
+    "cumulative_profit": "Cumulative Profit ($)",
+    "final_roi_pct": "Final-Period ROI (%)",
+    "final_profit": "Final-Period Profit ($)",
+    "final_revenue": "Final-Period Revenue ($)",
+    "npv": "NPV ($)",
+    "irr_pct": "IRR (% per year)",
+    "payback_month": "Payback Month",
+}
+# Heatmap metrics where the lowest value is best
+SENSITIVITY_LOWER_IS_BETTER = {"payback_month"}
+# Metrics in percent, whose changes are shown in percentage points
+PERCENT_METRICS = {"final_roi_pct", "irr_pct"}
+
+# Settings inputs show the first-order change in final-period profit for this step (% of the input)
+WHAT_IF_STEP_PCT = 10
+
+# Financial Analysis table sources: key -> label
+TABLE_VIEWS = {"current": "Current scenario", "stacked": "Saved scenarios (stacked)"}
+STACKED_TABLE_DEFAULT_SCENARIOS = 5
+
+# Grids at least this large get a progress bar while they compute
+SENSITIVITY_PROGRESS_CELLS = 2500
+
+# Risk simulation widgets: (input, label, default distribution, default spread %)
+MONTE_CARLO_DISTRIBUTIONS = ["Fixed", "Normal", "Uniform", "Triangular"]
+MONTE_CARLO_UI_DEFAULTS = [
+    ("ai_adoption_acceleration_factor", "AI Adoption Acceleration", "Triangular", 40),
+    ("enterprise_retention_rate", "Enterprise Retention", "Normal", 3),
+    ("avg_implementation_value", "Implementation Value", "Normal", 15),
+    ("start_ai_implementations", "Implementations (Month 1)", "Uniform", 25),
+    ("end_ai_implementations", "Implementations (Final Month)", "Uniform", 25),
+]
+
+def spread_distribution(kind, base, spread_pct):
+    """Map a UI distribution choice to a draw_scenario_samples spec (None = fixed)."""
+    spread = abs(base) * spread_pct / 100
+    if kind == "Fixed" or spread == 0:
+        return None
+    if kind == "Normal":
+        return ("normal", base, spread)
+    if kind == "Uniform":
+        return ("uniform", base - spread, base + spread)
+    return ("triangular", base - spread, base, base + spread)
+
+# Widgets in tabs that render only while open (keys with these prefixes). Streamlit
+# drops the state of widgets that were not drawn in a run, so their values are
+# seeded here and re-assigned every run; the widgets are created without defaults.
+LAZY_WIDGET_PREFIXES = ("compare_", "sens_", "export_", "table_")
+LAZY_WIDGET_DEFAULTS = {
+    "compare_source": COMPARE_SOURCES[0],
+    "compare_rows": 200,
+    "compare_top_k": 3,
+    "compare_sweep_sort": "cumulative_profit",
+    "compare_sweep_rows": 200,
+    "compare_sweep_top_k": 3,
+    "sens_x": "ai_adoption_acceleration_factor",
+    "sens_y": "enterprise_retention_rate",
+    "sens_steps": 50,
+    "sens_tornado_metric": "final_profit",
+    "sens_tornado_step": WHAT_IF_STEP_PCT,
+    "sens_tornado_rows": 10,
+    "table_page_size": DEFAULT_PAGE_SIZE,
+}
+for key, default in LAZY_WIDGET_DEFAULTS.items():
+    st.session_state.setdefault(key, default)
+for key in [k for k in st.session_state if k.startswith(LAZY_WIDGET_PREFIXES)]:
+    st.session_state[key] = st.session_state[key]
+
+def format_change(amount, unit="$"):
+    """Signed change for hints and captions, e.g. +$1,234 or −2.5 pts"""
+    sign = "+" if amount >= 0 else "−"
+    return f"{sign}${abs(amount):,.0f}" if unit == "$" else f"{sign}{abs(amount):,.1f} {unit}"
+
+what_if_slots = {}
+
+def what_if_slot(name, container=st):
+    """Placeholder under a Settings input for its what-if hint, filled in once the model has run"""
+    what_if_slots[name] = container.empty()
+
+def format_irr(irr_pct):
+    """IRR for display; NaN means the cash flows never change sign"""
+    return f"{irr_pct:,.1f}%" if np.isfinite(irr_pct) else "n/a"
+
+def seed_choice(key, options):
+    """Reset a lazily drawn select's kept value to the first option once it is no longer offered"""
+    if st.session_state.get(key) not in options:
+        st.session_state[key] = options[0]
+
+def seed_range(key, low, high):
+    """Seed a lazily drawn range slider with the full range and fit its kept value to new bounds.
+
+    A range that covered the old bounds completely widens to cover the new ones.
+    """
+    previous = st.session_state.get(f"{key}_bounds", (low, high))
+    lo, hi = st.session_state.get(key, (low, high))
+    if (lo, hi) == tuple(previous):
+        lo, hi = low, high
+    st.session_state[key] = (min(max(lo, low), high), max(min(hi, high), low))
+    st.session_state[f"{key}_bounds"] = (low, high)
+
+@st.fragment
+def optimizer_panel(current_params, forecast_periods, forecast_months, granularity, period_label, model_bounds):
+    """Goal seek over the current inputs; its widgets rerun only this fragment"""
+    with st.expander("🎯 Goal Seek & Optimizer", False):
+        st.caption("Searches the chosen parameter ranges (all other inputs stay as set above) for the best scenario.")
+        c1, c2 = st.columns(2)
+        opt_goal = c1.selectbox("Goal", list(OPTIMIZER_GOALS))
+        opt_min_roi = c2.number_input("Minimum Final-Period ROI (%)", 0.0, 1000.0, 0.0, 5.0, help="0 = no ROI constraint")
+        opt_variables = st.multiselect("Parameters to optimize", list(PARAMETER_LABELS), OPTIMIZER_DEFAULT_VARIABLES, format_func=PARAMETER_LABELS.get)
+        opt_ranges = {}
+        for name in opt_variables:
+            low, high, _ = model_bounds[name]
+            opt_ranges[name] = st.slider(f"{PARAMETER_LABELS[name]} search range", float(low), float(high), (float(low), float(high)), key=f"opt_range_{name}")
+
+        if st.button("🎯 Run Optimizer", disabled=not opt_variables):
+            opt_objective, opt_maximize = OPTIMIZER_GOALS[opt_goal]
+            with profiler.stage("compute: optimizer"):
+                opt = optimize_scenario(forecast_periods, current_params, opt_ranges, objective=opt_objective, maximize=opt_maximize,
+                                        constraints={"final_roi_pct": (opt_min_roi, None)} if opt_min_roi > 0 else None,
+                                        granularity=granularity)
+            if not opt["feasible"]:
+                st.warning(f"No scenario in these ranges reaches {opt_min_roi:.0f}% ROI; showing the closest one found.")
+            m1, m2, m3, m4 = st.columns(4)
+            m1.metric("Cumulative Profit", f"${opt['metrics']['cumulative_profit']:,.0f}")
+            m2.metric(f"ROI % ({period_label} {forecast_periods})", f"{opt['metrics']['final_roi_pct']:.1f}%")
+            m3.metric("Break-even Month", opt["metrics"]["break_even_month"] if opt["metrics"]["break_even_month"] <= forecast_months else "Not reached")
+            m4.metric(f"Profit ({period_label} {forecast_periods})", f"${opt['metrics']['final_profit']:,.0f}")
+            m5, m6, m7, _ = st.columns(4)
+            m5.metric("NPV", f"${opt['metrics']['npv']:,.0f}")
+            m6.metric("IRR", format_irr(opt["metrics"]["irr_pct"]))
+            m7.metric("Payback Month", opt["metrics"]["payback_month"] if opt["metrics"]["payback_month"] <= forecast_months else "Not reached")
+            st.dataframe(pd.DataFrame({
+                "Parameter": [PARAMETER_LABELS[n] for n in opt_variables],
+                "Current": [current_params[n] for n in opt_variables],
+                "Optimized": [opt["params"][n] for n in opt_variables],
+            }), use_container_width=True, hide_index=True)
+            st.caption(f"⏱️ {opt['evaluations']:,} candidate scenarios evaluated in {opt['elapsed']:.3f}s")
 
 # ===========================================================
 # SETTINGS TAB (all inputs neatly grouped in expanders)
 # ===========================================================
-tab_overview, tab_table, tab_compare, tab_settings, tab_download = st.tabs(
-    ["🎯 Executive Dashboard", "📊 Financial Analysis", "⚖️ Scenario Comparison", "🔧 AI Model Parameters", "📁 Export & Reports"]
+# Only the open tab's content runs (switching tabs reruns the app). Settings always
+# runs because every other tab reads the model it defines; Comparison, Sensitivity,
+# Export and the optimizer are fragments, so their own widgets rerun only themselves.
+tab_overview, tab_table, tab_compare, tab_sensitivity, tab_settings, tab_download = st.tabs(
+    ["🎯 Executive Dashboard", "📊 Financial Analysis", "⚖️ Scenario Comparison", "🌡️ Sensitivity", "🔧 AI Model Parameters", "📁 Export & Reports"],
+    key="active_tab", on_change="rerun"
 )
 
-with tab_settings:
+with tab_settings, profiler.stage("tab: AI Model Parameters"):
     st.header("🤖 AI Enterprise Integration Parameters")
     
     # Add sophisticated scenario preset system
@@ -199,345 +510,672 @@ with tab_settings:
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        if st.button("🚀 Aggressive AI Transformation", use_container_width=True, type="primary"):
+        if st.button("🚀 Aggressive AI Transformation", use_container_width=True, type="primary",
+                     on_click=apply_preset, args=("aggressive",)):
             st.success("Applied: High-growth AI rollout with 5x acceleration factor")
     with col2:
-        if st.button("📈 Balanced Enterprise Integration", use_container_width=True):
+        if st.button("📈 Balanced Enterprise Integration", use_container_width=True, on_click=apply_preset, args=("balanced",)):
             st.info("Applied: Measured growth with risk mitigation")
     with col3:
-        if st.button("🛡️ Conservative Validation Approach", use_container_width=True):
+        if st.button("🛡️ Conservative Validation Approach", use_container_width=True, on_click=apply_preset, args=("conservative",)):
             st.warning("Applied: Proof-of-concept focused deployment")
+
+    # A shorter horizon can leave the kept marketing start past its end
+    st.session_state["input_marketing_start_month"] = min(st.session_state["input_marketing_start_month"], forecast_months)
     
     with st.expander("🤖 AI Implementation Services", True):
         st.markdown("**📈 AI Implementation Volume**")
         c1, c2 = st.columns(2)
-        start_ai_implementations = c1.number_input("AI Implementations per Month (Month 1)", 0, 50, AI_ENTERPRISE_DEFAULTS["start_ai_implementations"], 1)
-        end_ai_implementations = c2.number_input("AI Implementations per Month (Month 36)", 0, 100, AI_ENTERPRISE_DEFAULTS["end_ai_implementations"], 1)
+        start_ai_implementations = c1.number_input("AI Implementations per Month (Month 1)", 0, 50, step=1, key="input_start_ai_implementations")
+        what_if_slot("start_ai_implementations", c1)
+        end_ai_implementations = c2.number_input("AI Implementations per Month (Final Month)", 0, 100, step=1, key="input_end_ai_implementations")
+        what_if_slot("end_ai_implementations", c2)
         
         st.markdown("**💰 Implementation Pricing**")
         c3, c4 = st.columns(2)
-        avg_implementation_value = c3.number_input("Average Implementation Value ($)", 10000, 1000000, AI_ENTERPRISE_DEFAULTS["avg_implementation_value"], 5000)
-        ai_adoption_acceleration_factor = c4.slider("AI Adoption Acceleration Factor (%)", 0.0, 10.0, AI_ENTERPRISE_DEFAULTS["ai_adoption_acceleration_factor"], 0.1)
+        avg_implementation_value = c3.number_input("Average Implementation Value ($)", 10000, 1000000, step=5000, key="input_avg_implementation_value")
+        what_if_slot("avg_implementation_value", c3)
+        ai_adoption_acceleration_factor = c4.slider("AI Adoption Acceleration Factor (%)", 0.0, 10.0, step=0.1, key="input_ai_adoption_acceleration_factor")
+        what_if_slot("ai_adoption_acceleration_factor", c4)
         
         st.markdown("**🛠️ AI Consulting Services Revenue per Month**")
         c5, c6 = st.columns(2)
-        start_ai_consulting_monthly = c5.number_input("AI Consulting Revenue (Month 1) ($)", 0, 1000000, AI_ENTERPRISE_DEFAULTS["start_ai_consulting_monthly"], 1000)
-        end_ai_consulting_monthly = c6.number_input("AI Consulting Revenue (Month 36) ($)", 0, 1000000, AI_ENTERPRISE_DEFAULTS["end_ai_consulting_monthly"], 1000)
+        start_ai_consulting_monthly = c5.number_input("AI Consulting Revenue (Month 1) ($)", 0, 1000000, step=1000, key="input_start_ai_consulting_monthly")
+        what_if_slot("start_ai_consulting_monthly", c5)
+        end_ai_consulting_monthly = c6.number_input("AI Consulting Revenue (Final Month) ($)", 0, 1000000, step=1000, key="input_end_ai_consulting_monthly")
+        what_if_slot("end_ai_consulting_monthly", c6)
 
 
 
     with st.expander("🎓 AI Training & Support Services", True):
         st.markdown("**🏢 Enterprise Client Portfolio**")
-        num_enterprise_clients = st.number_input("Number of Enterprise Clients", 1, 100, AI_ENTERPRISE_DEFAULTS["num_enterprise_clients"], 1)
-        enterprise_retention_rate = st.slider("Enterprise Retention Rate (%)", 70.0, 100.0, AI_ENTERPRISE_DEFAULTS["enterprise_retention_rate"], 0.5)
+        num_enterprise_clients = st.number_input("Number of Enterprise Clients", 1, 100, step=1, key="input_num_enterprise_clients")
+        what_if_slot("num_enterprise_clients")
+        enterprise_retention_rate = st.slider("Enterprise Retention Rate (%)", 70.0, 100.0, step=0.5, key="input_enterprise_retention_rate",
+                                              help="Share of clients kept each month; every acquisition cohort decays at this rate")
+        what_if_slot("enterprise_retention_rate")
+        c1, c2 = st.columns(2)
+        new_client_share = c1.slider("New Clients per Implementation", 0.0, 1.0, step=0.01, key="input_new_client_share",
+                                     help="Share of implementation projects that bring in a new enterprise client")
+        what_if_slot("new_client_share", c1)
+        client_expansion_rate = c2.slider("Client Expansion Rate (% per month)", 0.0, 10.0, step=0.1, key="input_client_expansion_rate",
+                                          help="Growth of each retained client's training and support usage per month of tenure")
+        what_if_slot("client_expansion_rate", c2)
         
         st.markdown("**⏰ AI Training Hours per Month**")
         c1, c2 = st.columns(2)
-        start_training_hours = c1.number_input("Training Hours (Month 1)", 0, 2000, AI_ENTERPRISE_DEFAULTS["start_training_hours"], 10)
-        end_training_hours = c2.number_input("Training Hours (Month 36)", 0, 2000, AI_ENTERPRISE_DEFAULTS["end_training_hours"], 10)
+        start_training_hours = c1.number_input("Training Hours (Month 1)", 0, 2000, step=10, key="input_start_training_hours")
+        what_if_slot("start_training_hours", c1)
+        end_training_hours = c2.number_input("Training Hours (Final Month)", 0, 2000, step=10, key="input_end_training_hours")
+        what_if_slot("end_training_hours", c2)
         
         # Show training impact
-        st.caption(f"📊 Effective training hours with {enterprise_retention_rate}% retention: Month 1 = {start_training_hours * enterprise_retention_rate / 100:.0f} hrs, Month 36 = {end_training_hours * enterprise_retention_rate / 100:.0f} hrs")
+        st.caption(f"📊 Training and support ramps are for the initial {num_enterprise_clients} clients (Month 1 = {start_training_hours / num_enterprise_clients:.0f} hrs per client); "
+                   f"each cohort keeps {(enterprise_retention_rate / 100) ** 12:.0%} of its clients after a year, and retained clients grow usage {(1 + client_expansion_rate / 100) ** 12 - 1:.0%} per year")
         
         st.markdown("**💰 Training & Support Pricing**")
-        training_rate_per_hour = st.number_input("Training Rate per Hour ($)", 100, 1000, AI_ENTERPRISE_DEFAULTS["training_rate_per_hour"], 25)
+        training_rate_per_hour = st.number_input("Training Rate per Hour ($)", 100, 1000, step=25, key="input_training_rate_per_hour")
+        what_if_slot("training_rate_per_hour")
         
         st.markdown("**🛠️ AI Support Services Revenue per Month**")
         c5, c6 = st.columns(2)
-        start_support_services_monthly = c5.number_input("Support Services Revenue (Month 1) ($)", 0, 500000, AI_ENTERPRISE_DEFAULTS["start_support_services_monthly"], 1000)
-        end_support_services_monthly = c6.number_input("Support Services Revenue (Month 36) ($)", 0, 500000, AI_ENTERPRISE_DEFAULTS["end_support_services_monthly"], 1000)
+        start_support_services_monthly = c5.number_input("Support Services Revenue (Month 1) ($)", 0, 500000, step=1000, key="input_start_support_services_monthly")
+        what_if_slot("start_support_services_monthly", c5)
+        end_support_services_monthly = c6.number_input("Support Services Revenue (Final Month) ($)", 0, 500000, step=1000, key="input_end_support_services_monthly")
+        what_if_slot("end_support_services_monthly", c6)
 
     with st.expander("💼 Business Operations", True):
         c1, c2 = st.columns(2)
-        marketing_cost_monthly = c1.number_input("Monthly Marketing Investment ($)", 0, 200000, AI_ENTERPRISE_DEFAULTS["marketing_cost_monthly"], 1000)
-        sales_commission_pct = c2.slider("Sales Commission % of Total Revenue", 0, 50, int(AI_ENTERPRISE_DEFAULTS["sales_commission_pct"]*100), 1) / 100
+        marketing_cost_monthly = c1.number_input("Monthly Marketing Investment ($)", 0, 200000, step=1000, key="input_marketing_cost_monthly")
+        what_if_slot("marketing_cost_monthly", c1)
+        sales_commission_pct = c2.slider("Sales Commission % of Total Revenue", 0, 50, step=1, key="input_sales_commission_pct") / 100
+        what_if_slot("sales_commission_pct", c2)
         
         st.markdown("**📅 Marketing Start Timing**")
-        marketing_start_month = st.number_input("Marketing Start Month", 1, 36, 1, 1, 
+        marketing_start_month = st.number_input("Marketing Start Month", 1, forecast_months, step=1, key="input_marketing_start_month", 
                                                help="Choose which month to start marketing expenses (1 = immediate, 6 = start in month 6, etc.)")
         if marketing_start_month > 1:
             st.caption(f"💡 Marketing expenses will start in month {marketing_start_month} (saving ${marketing_cost_monthly * (marketing_start_month-1):,.0f} in early months)")
 
+    with st.expander("💵 Investment & Valuation", True):
+        c1, c2 = st.columns(2)
+        initial_investment = c1.number_input("Initial Investment ($)", 0, 100000000, step=50000, key="input_initial_investment",
+                                             help="Upfront cash paid before the first period; NPV, IRR and payback include it")
+        what_if_slot("initial_investment", c1)
+        discount_rate = c2.slider("Discount Rate (% per year)", 0.0, 50.0, step=0.5, key="input_discount_rate",
+                                  help="Rate the NPV discounts each period's profit at, compounded per period")
+        what_if_slot("discount_rate", c2)
+
+    with st.expander("🎲 Risk Simulation (Monte Carlo)", False):
+        st.caption("Pick a distribution for each uncertain input. The spread is ± % of the value set above (one standard deviation for Normal).")
+        mc_distribution_choices = {}
+        for name, label, kind, spread in MONTE_CARLO_UI_DEFAULTS:
+            c1, c2 = st.columns(2)
+            mc_distribution_choices[name] = (
+                c1.selectbox(f"{label} Distribution", MONTE_CARLO_DISTRIBUTIONS, MONTE_CARLO_DISTRIBUTIONS.index(kind), key=f"mc_dist_{name}"),
+                c2.slider(f"{label} Spread (±%)", 0, 100, spread, 1, key=f"mc_spread_{name}"),
+            )
+        c1, c2 = st.columns(2)
+        mc_samples = c1.select_slider("Samples", [10000, 50000, 100000, 250000, 500000, 1000000], 50000)
+        mc_seed = c2.number_input("Random Seed", 0, 2**32 - 1, 42, 1, help="Same seed and inputs reproduce the same bands")
+
     # Build current DF with AI enterprise inputs
-    df_current = generate_ai_enterprise_financials(
-        MONTHS,
-        # AI Implementation Services
-        start_ai_implementations, end_ai_implementations, avg_implementation_value, 
+    current_params = dict(zip(AI_ENTERPRISE_PARAMS, [
+        start_ai_implementations, end_ai_implementations, avg_implementation_value,
         start_ai_consulting_monthly, end_ai_consulting_monthly,
-        # AI Training & Support Services  
-        num_enterprise_clients, start_training_hours, end_training_hours, training_rate_per_hour, 
+        num_enterprise_clients, start_training_hours, end_training_hours, training_rate_per_hour,
         start_support_services_monthly, end_support_services_monthly,
-        # Business Development & Operations
         sales_commission_pct, marketing_cost_monthly, marketing_start_month,
-        # Advanced AI Metrics
-        ai_adoption_acceleration_factor, enterprise_retention_rate
-    )
+        ai_adoption_acceleration_factor, enterprise_retention_rate,
+        new_client_share, client_expansion_rate,
+        initial_investment, discount_rate,
+    ]))
+
+    # Identical parameter sets (defaults, presets) are computed once per server process
+    with profiler.stage("compute: financials"):
+        df_current = cached_financials(forecast_periods, current_params, granularity).to_frame()
+    with profiler.stage("compute: summary"):
+        current_summary = cached_summary(forecast_periods, current_params, granularity)
+    # First-order what-if under each input, from the same single derivative pass as the tornado chart
+    with profiler.stage("compute: gradients"):
+        profit_deltas = cached_what_if(forecast_periods, current_params, granularity, "final_profit", WHAT_IF_STEP_PCT)
+    for name, slot in what_if_slots.items():
+        if current_params[name]:
+            change = format_change(profit_deltas[name]) if profit_deltas[name] else "unchanged"
+            slot.caption(f"+{WHAT_IF_STEP_PCT}% → {period_label} {forecast_periods} profit {change}")
+
+    save_col, mc_col, _ = st.columns([1,1,2])
+    if mc_col.button("🎲 Run Risk Simulation"):
+        distributions = {}
+        for name, (kind, spread) in mc_distribution_choices.items():
+            dist = spread_distribution(kind, current_params[name], spread)
+            if dist is not None:
+                distributions[name] = dist
+        with st.spinner(f"Simulating {mc_samples:,} scenarios..."), profiler.stage("compute: monte carlo"):
+            mc_key = ("monte_carlo", forecast_periods, granularity, mc_samples, int(mc_seed), tuple(sorted(distributions.items()))) + scenario_cache_key(current_params)
+            st.session_state.monte_carlo = result_cache.get_or_compute(mc_key, lambda: simulate_ai_enterprise_financials(
+                forecast_periods, current_params, distributions, n_samples=mc_samples, seed=int(mc_seed), granularity=granularity))
+        st.success(f"Simulation complete: {st.session_state.monte_carlo['samples_per_sec']:,.0f} samples/sec. See the Executive Dashboard.")
 
-    save_col, _ = st.columns([1,3])
     if save_col.button("💾 Save Scenario", type="primary"):
-        st.session_state.scenarios[scenario_name] = df_current.copy()
+        scenario_store.save(scenario_name, current_params, forecast_periods,
+                            tags=[t.strip() for t in scenario_tags.split(",") if t.strip()], metrics=current_summary,
+                            granularity=granularity)
         st.success(f"Scenario '{scenario_name}' saved.")
 
+    optimizer_panel(current_params, forecast_periods, forecast_months, granularity, period_label, model_bounds)
+
 # ===========================================================
 # OVERVIEW (KPIs + Charts)
 # ===========================================================
-with tab_overview:
-    st.subheader("Key Metrics (Month 36)")
-    k1, k2, k3, k4 = st.columns(4)
-    k1.metric("Total Revenue", f"${df_current['Revenue: Total'].iloc[-1]:,.0f}")
-    k2.metric("Profit", f"${df_current['Profit'].iloc[-1]:,.0f}")
-    k3.metric("ROI %", f"{df_current['ROI %'].iloc[-1]:.1f}%")
-    k4.metric("Avg Monthly Profit", f"${df_current['Profit'].mean():,.0f}")
+if tab_overview.open:
+    with tab_overview, profiler.stage("tab: Executive Dashboard"):
+        st.subheader(f"Key Metrics ({period_label} {forecast_periods})")
+        k1, k2, k3, k4 = st.columns(4)
+        k1.metric("Total Revenue", f"${df_current['Revenue: Total'].iloc[-1]:,.0f}")
+        k2.metric("Profit", f"${df_current['Profit'].iloc[-1]:,.0f}")
+        k3.metric("ROI %", f"{df_current['ROI %'].iloc[-1]:.1f}%")
+        k4.metric(f"Avg {granularity.title()} Profit", f"${df_current['Profit'].mean():,.0f}")
+        k5, k6, k7, k8 = st.columns(4)
+        k5.metric(f"NPV @ {discount_rate:g}%", f"${current_summary['npv']:,.0f}")
+        k6.metric("IRR", format_irr(current_summary["irr_pct"]), help="Annual rate at which the NPV of the investment and profits is zero")
+        k7.metric("Payback Month", current_summary["payback_month"] if current_summary["payback_month"] <= forecast_months else "Not reached",
+                  help="First month in which cumulative cash, after the initial investment, is back above zero")
+        k8.metric("Cumulative Cash", f"${df_current['Cumulative Cash ($)'].iloc[-1]:,.0f}")
 
-    if PLOTLY_AVAILABLE:
-        st.markdown("#### Revenue vs Costs")
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(x=df_current["Month"], y=df_current["Revenue: Total"], mode="lines+markers", name="Total Revenue", line=dict(width=3)))
-        fig.add_trace(go.Scatter(x=df_current["Month"], y=df_current["Costs: Total"], mode="lines+markers", name="Total Costs", line=dict(width=3)))
-        fig.update_layout(
-            height=350, 
-            margin=dict(l=10,r=10,t=30,b=10),
-            xaxis_title="Month",
-            yaxis_title="Amount ($)",
-            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5)
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        if "monte_carlo" in st.session_state:
+            mc = st.session_state.monte_carlo
+            st.markdown("#### 🎲 Risk Bands (P5 / P50 / P95)")
+            st.caption(f"{mc['n_samples']:,} simulated scenarios • seed {mc['seed']} • {mc['elapsed']:.2f}s ({mc['samples_per_sec']:,.0f} samples/sec)")
+            r1, r2, r3 = st.columns(3)
+            for col, (key, label) in zip((r1, r2, r3), MONTE_CARLO_METRICS.items()):
+                p5, p50, p95 = mc["bands"][key][:, -1]
+                fmt = "{:,.1f}%" if key == "roi_pct" else "${:,.0f}"
+                col.metric(f"{label} P50 ({GRANULARITIES[mc['granularity']][1]} {mc['periods']})", fmt.format(p50),
+                           help=f"P5 {fmt.format(p5)} • P95 {fmt.format(p95)}")
+            if PLOTLY_AVAILABLE:
+                go, _ = plotting()
+                band_periods = np.arange(1, mc["periods"] + 1)
+                for col, (key, label) in zip(st.columns(3), MONTE_CARLO_METRICS.items()):
+                    p5, p50, p95 = mc["bands"][key]
+                    figband = go.Figure()
+                    figband.add_trace(go.Scatter(x=band_periods, y=p95, mode="lines", name="P95", line=dict(width=0), showlegend=False))
+                    figband.add_trace(go.Scatter(x=band_periods, y=p5, mode="lines", name="P5–P95", line=dict(width=0), fill="tonexty", fillcolor="rgba(102,126,234,0.25)"))
+                    figband.add_trace(go.Scatter(x=band_periods, y=p50, mode="lines", name="P50", line=dict(width=3, color="#667eea")))
+                    figband.update_layout(
+                        height=300,
+                        margin=dict(l=10,r=10,t=30,b=10),
+                        title=label,
+                        xaxis_title=GRANULARITIES[mc["granularity"]][1],
+                        showlegend=False
+                    )
+                    show_chart(f"risk band {key}", figband, col)
 
-        c1, c2 = st.columns(2)
-        with c1:
-            st.markdown("#### Profit over Time")
-            figp = px.line(df_current, x="Month", y="Profit", markers=True)
-            figp.update_layout(
-                height=320, 
-                margin=dict(l=10,r=10,t=30,b=10),
-                xaxis_title="Month",
-                yaxis_title="Profit ($)"
-            )
-            st.plotly_chart(figp, use_container_width=True)
-        with c2:
-            st.markdown("#### ROI % over Time")
-            figroi = px.line(df_current, x="Month", y="ROI %", markers=True)
-            figroi.update_layout(
-                height=320, 
-                margin=dict(l=10,r=10,t=30,b=10),
-                xaxis_title="Month",
-                yaxis_title="ROI (%)"
-            )
-            st.plotly_chart(figroi, use_container_width=True)
+        if PLOTLY_AVAILABLE:
+            _, charts = plotting()
+            with profiler.stage("figures: dashboard"):
+                figs, figs_cached = cached_figures("dashboard", charts.DASHBOARD_FIGURES, charts.frame_fingerprint(df_current),
+                                                   df_current, downsample=chart_downsample)
 
-        st.markdown("#### AI Revenue Streams (Stacked)")
-        rev_df = df_current[["Month","Rev: AI Implementation Services","Rev: AI Consulting Services","Rev: AI Training Services","Rev: AI Support Services"]]
-        figstack = go.Figure()
-        
-        # Use cleaner legend names for AI services
-        legend_names = {
-            "Rev: AI Implementation Services": "AI Implementation Projects",
-            "Rev: AI Consulting Services": "AI Consulting Services",
-            "Rev: AI Training Services": "AI Training Programs", 
-            "Rev: AI Support Services": "AI Support & Maintenance"
-        }
-        
-        for col in ["Rev: AI Implementation Services","Rev: AI Consulting Services","Rev: AI Training Services","Rev: AI Support Services"]:
-            figstack.add_trace(go.Bar(x=rev_df["Month"], y=rev_df[col], name=legend_names[col]))
-        
-        figstack.update_layout(
-            barmode="stack", 
-            height=380, 
-            margin=dict(l=10,r=10,t=30,b=10),
-            xaxis_title="Month",
-            yaxis_title="Revenue ($)",
-            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5)
-        )
-        st.plotly_chart(figstack, use_container_width=True)
-
-        st.markdown("#### AI Revenue Streams Growth Analysis")
-        rev_streams_df = df_current[["Month","Rev: AI Implementation Services","Rev: AI Consulting Services","Rev: AI Training Services","Rev: AI Support Services"]]
-        figstreams = go.Figure()
-        
-        # Add line for each AI revenue stream with distinct colors and styling
-        colors = ["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728"]  # Blue, Orange, Green, Red
-        line_styles = ["solid", "dash", "dot", "dashdot"]
-        
-        # Use the same cleaner legend names for AI services
-        for i, col in enumerate(["Rev: AI Implementation Services","Rev: AI Consulting Services","Rev: AI Training Services","Rev: AI Support Services"]):
-            figstreams.add_trace(go.Scatter(
-                x=rev_streams_df["Month"], 
-                y=rev_streams_df[col], 
-                mode="lines+markers",
-                name=legend_names[col],
-                line=dict(width=3, color=colors[i], dash=line_styles[i]),
-                marker=dict(size=6, color=colors[i])
-            ))
-        
-        figstreams.update_layout(
-            height=400, 
-            margin=dict(l=10,r=10,t=30,b=10),
-            xaxis_title="Month",
-            yaxis_title="Revenue ($)",
-            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5),
-            hovermode='x unified'
-        )
-        st.plotly_chart(figstreams, use_container_width=True)
-
-        st.markdown("#### AI Enterprise Cost Structure")
-        cost_df = df_current[["Month","Cost: Sales Commission","Cost: Marketing Investment","Cost: Implementation Delivery"]]
-        figcost = go.Figure()
-        
-        # Use cleaner legend names for AI enterprise costs
-        cost_names = {
-            "Cost: Sales Commission": "Sales Team Commission",
-            "Cost: Marketing Investment": "Growth Marketing Investment",
-            "Cost: Implementation Delivery": "AI Implementation Delivery Costs"
-        }
-        
-        for col in cost_df.columns[1:]:
-            figcost.add_trace(go.Scatter(
-                x=cost_df["Month"], 
-                y=cost_df[col], 
-                mode="lines+markers", 
-                name=cost_names.get(col, col.replace("Cost: ","")),
-                line=dict(width=3),
-                marker=dict(size=6)
-            ))
-        
-        figcost.update_layout(
-            height=350, 
-            margin=dict(l=10,r=10,t=30,b=10),
-            xaxis_title="Month",
-            yaxis_title="Cost ($)",
-            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5)
-        )
-        st.plotly_chart(figcost, use_container_width=True)
-    else:
-        st.warning("📊 Charts require plotly installation. Showing data table instead.")
-        st.dataframe(df_current[["Month", "Revenue: Total", "Costs: Total", "Profit", "ROI %"]], use_container_width=True)
+            st.markdown("#### Revenue vs Costs")
+            show_chart("dashboard revenue_costs", figs["revenue_costs"]["figure"])
+
+            c1, c2 = st.columns(2)
+            with c1:
+                st.markdown("#### Profit over Time")
+                show_chart("dashboard profit", figs["profit"]["figure"])
+            with c2:
+                st.markdown("#### ROI % over Time")
+                show_chart("dashboard roi", figs["roi"]["figure"])
+
+            st.markdown("#### AI Revenue Streams (Stacked)")
+            show_chart("dashboard revenue_stack", figs["revenue_stack"]["figure"])
+
+            st.markdown("#### AI Revenue Streams Growth Analysis")
+            show_chart("dashboard revenue_streams", figs["revenue_streams"]["figure"])
+
+            st.markdown("#### AI Enterprise Cost Structure")
+            show_chart("dashboard cost_structure", figs["cost_structure"]["figure"])
+
+            st.markdown("#### Cumulative Cash (after initial investment)")
+            show_chart("dashboard cumulative_cash", figs["cumulative_cash"]["figure"])
+
+            cohort_months = cohort_block_months(forecast_months)
+            with profiler.stage("compute: client cohorts"):
+                cohort_labels, cohort_clients = cached_client_cohorts(forecast_periods, current_params, granularity, cohort_months)
+                cohort_figs, cohort_cached = cached_figures(
+                    "cohorts", charts.COHORT_FIGURES, (forecast_periods, granularity, cohort_months) + scenario_cache_key(current_params),
+                    cohort_labels, cohort_clients, period_label, downsample=chart_downsample)
+            st.markdown("#### Active Clients by Acquisition Cohort")
+            show_chart("dashboard client_cohorts", cohort_figs["client_cohorts"]["figure"])
+            st.caption(f"{df_current['Active Clients'].iloc[-1]:,.1f} active clients in {period_label.lower()} {forecast_periods:,}, "
+                       f"from {len(cohort_labels) - 1} acquisition cohorts plus the initial portfolio")
+            show_figure_stats({**figs, **cohort_figs}, figs_cached and cohort_cached)
+        else:
+            st.warning("📊 Charts require plotly installation. Showing data table instead.")
+            st.dataframe(df_current[[period_label, "Revenue: Total", "Costs: Total", "Profit", "ROI %"]], use_container_width=True)
 
 # ===========================================================
 # DETAILED TABLE
 # ===========================================================
-with tab_table:
-    st.subheader("📊 AI Enterprise Financial Analysis")
-    st.caption("🤖 Comprehensive AI integration financial model: Implementation projects, consulting services, training programs, and support services with advanced metrics.")
-    st.dataframe(
-        df_current.style.format({
-            "Avg Implementation Value ($)": "${:,.0f}",
-            "Training Rate per Hour ($)": "${:,.0f}",
-            "AI Adoption Acceleration (%)": "{:.1f}%",
-            "Enterprise Retention Rate (%)": "{:.1f}%",
-            "Rev: AI Implementation Services": "${:,.0f}",
-            "Rev: AI Consulting Services": "${:,.0f}",
-            "Rev: AI Training Services": "${:,.0f}",
-            "Rev: AI Support Services": "${:,.0f}",
-            "Revenue: Total": "${:,.0f}",
-            "Cost: Sales Commission": "${:,.0f}",
-            "Cost: Marketing Investment": "${:,.0f}",
-            "Cost: Implementation Delivery": "${:,.0f}",
-            "Costs: Total": "${:,.0f}",
-            "Profit": "${:,.0f}",
-            "ROI %": "{:.1f}%",
-            "Revenue per Implementation ($)": "${:,.0f}"
-        }),
-        use_container_width=True, hide_index=True
-    )
+def saved_scenarios_stacked(names):
+    """Full series of stored scenarios as one long frame (Scenario column first), batched per horizon"""
+    stored = scenario_store.get_many(names)
+    key = ("stacked",) + tuple((name, periods, gran) + scenario_cache_key(params) for name, (periods, params, gran) in stored.items())
+
+    def build():
+        groups = {}
+        for name, (periods, params, gran) in stored.items():
+            groups.setdefault((periods, gran), []).append((name, params))
+        mixed = len({gran for _, gran in groups}) > 1
+        frames = []
+        for (periods, gran), scenarios in groups.items():
+            frame = batch_stacked_frame(generate_ai_enterprise_financials_batch(periods, [p for _, p in scenarios], granularity=gran),
+                                        [n for n, _ in scenarios])
+            if mixed:
+                # Month and week columns only line up under a neutral label
+                frame.columns = [c.replace(GRANULARITIES[gran][1], "Period") for c in frame.columns]
+            frames.append(frame)
+        table = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        if len(frames) > 1:
+            # Back to the selection order; each scenario is one contiguous block
+            position = {name: i for i, name in enumerate(names)}
+            table = table.iloc[np.argsort(table["Scenario"].map(position).to_numpy(), kind="stable")]
+        return table[["Scenario"] + [c for c in table.columns if c != "Scenario"]].reset_index(drop=True)
+
+    return result_cache.get_or_compute(key, build)
+
+@st.fragment
+def financial_table(df_current):
+    """Filtered, sorted and paged financial table; its widgets rerun only this fragment"""
+    with profiler.stage("tab: Financial Analysis"):
+        st.subheader("📊 AI Enterprise Financial Analysis")
+        st.caption("🤖 Comprehensive AI integration financial model: Implementation projects, consulting services, training programs, and support services with advanced metrics.")
+        c1, c2 = st.columns([1, 3])
+        view = c1.radio("View", list(TABLE_VIEWS), format_func=TABLE_VIEWS.get, key="table_view")
+        if view == "stacked":
+            saved_names = scenario_store.names()
+            if not saved_names:
+                st.info("No saved scenarios yet. Configure settings and click **Save Scenario** there.")
+                return
+            st.session_state["table_scenarios"] = [
+                n for n in st.session_state.get("table_scenarios", saved_names[:STACKED_TABLE_DEFAULT_SCENARIOS]) if n in saved_names]
+            names = c2.multiselect("Scenarios", saved_names, key="table_scenarios")
+            if not names:
+                st.info("Pick one or more saved scenarios to stack.")
+                return
+            with profiler.stage("compute: stacked scenarios"):
+                table = saved_scenarios_stacked(names)
+            key_columns = list(table.columns[:2])
+        else:
+            table = df_current
+            key_columns = [table.columns[0]]
+        period = key_columns[-1]
+        value_columns = [c for c in table.columns if c not in key_columns]
+
+        # An emptied or stale column choice falls back to every column
+        kept_columns = [c for c in st.session_state.get("table_columns", []) if c in value_columns]
+        st.session_state["table_columns"] = kept_columns or value_columns
+        shown = st.multiselect("Columns", value_columns, key="table_columns")
+
+        c1, c2, c3, c4, c5 = st.columns([2, 1, 2, 1, 1])
+        sort_options = [None] + key_columns + value_columns
+        seed_choice("table_sort", sort_options)
+        sort_by = c1.selectbox("Sort by", sort_options, format_func=lambda c: "Default order" if c is None else c, key="table_sort")
+        descending = c2.toggle("Descending", key="table_descending")
+        seed_choice("table_filter", [None] + value_columns)
+        filter_column = c3.selectbox("Filter column", [None] + value_columns, format_func=lambda c: "No filter" if c is None else c, key="table_filter")
+        filter_min = c4.number_input("Min", value=None, disabled=filter_column is None, key="table_min")
+        filter_max = c5.number_input("Max", value=None, disabled=filter_column is None, key="table_max")
+
+        c1, c2 = st.columns([3, 1])
+        last_period = int(table[period].max())
+        seed_range("table_periods", 1, last_period)
+        period_range = c1.slider(f"{period} range", 1, last_period, key="table_periods")
+        page_size = c2.selectbox("Rows per page", PAGE_SIZES, key="table_page_size")
+
+        started = time.perf_counter()
+        page = st.session_state.get("table_page", 1)
+        with profiler.stage("table: filter, sort & page"):
+            args = dict(columns=key_columns + shown, period_column=period, period_range=period_range,
+                        filter_column=filter_column, filter_min=filter_min, filter_max=filter_max,
+                        sort_by=sort_by, descending=descending, page_size=page_size)
+            page_df, matching = table_page(table, page=page, **args)
+            pages = page_count(matching, page_size)
+            if page > pages:
+                page = pages
+                page_df, matching = table_page(table, page=page, **args)
+        shaped_ms = (time.perf_counter() - started) * 1000
+        st.session_state["table_page"] = page
+
+        # Typed columns: the browser formats currency and percentages, only this page is sent
+        st.dataframe(page_df, use_container_width=True, hide_index=True, column_config={
+            col: st.column_config.NumberColumn(format=column_format(col)) for col in page_df.columns if column_format(col)
+        })
+        c1, c2 = st.columns([1, 3])
+        c1.number_input(f"Page (of {pages:,})", 1, pages, step=1, key="table_page")
+        first = (page - 1) * page_size + 1 if matching else 0
+        c2.caption(f"Rows {first:,}–{first + len(page_df) - 1 if matching else 0:,} of {matching:,} matching "
+                   f"({len(table):,} total) • filtered, sorted and paged in {shaped_ms:.1f} ms")
+
+if tab_table.open:
+    with tab_table:
+        financial_table(df_current)
 
 # ===========================================================
 # SCENARIO COMPARE
 # ===========================================================
-with tab_compare:
-    st.subheader("Compare Saved Scenarios")
-    if st.session_state.scenarios:
-        selected = st.multiselect("Select scenarios to compare", list(st.session_state.scenarios.keys()),
-                                  default=list(st.session_state.scenarios.keys())[:2])
-        if selected:
-            # KPI cards for last-month metrics
-            st.markdown("#### Month 36 KPIs")
-            cols = st.columns(len(selected))
-            for i, name in enumerate(selected):
-                df = st.session_state.scenarios[name]
-                with cols[i]:
-                    st.markdown(f"**{name}**")
-                    st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-                    st.metric("Revenue", f"${df['Revenue: Total'].iloc[-1]:,.0f}")
-                    st.metric("Profit", f"${df['Profit'].iloc[-1]:,.0f}")
-                    st.metric("ROI %", f"{df['ROI %'].iloc[-1]:.1f}%")
-                    st.markdown('</div>', unsafe_allow_html=True)
-
-            comp_df = pd.concat([st.session_state.scenarios[n].assign(Scenario=n) for n in selected], ignore_index=True)
+def comparison_charts(comp_frames, selected, chart_downsample):
+    """Profit, ROI, revenue-stream, cost and cumulative cash series of the selected scenarios"""
+    if PLOTLY_AVAILABLE:
+        _, charts = plotting()
+        with profiler.stage("figures: comparison"):
+            comp_key = charts.frame_fingerprint(*comp_frames.values()) + "|" + "|".join(selected)
+            comp_figs, comp_cached = cached_figures("comparison", charts.COMPARISON_FIGURES, comp_key,
+                                                    comp_frames, downsample=chart_downsample)
 
-            if PLOTLY_AVAILABLE:
-                st.markdown("#### Profit Over Time")
-                figP = px.line(comp_df, x="Month", y="Profit", color="Scenario", markers=True)
-                figP.update_layout(
-                    height=350, 
-                    margin=dict(l=10,r=10,t=30,b=10),
-                    xaxis_title="Month",
-                    yaxis_title="Profit ($)"
-                )
-                st.plotly_chart(figP, use_container_width=True)
+        st.markdown("#### Profit Over Time")
+        show_chart("comparison profit", comp_figs["profit"]["figure"])
 
-                st.markdown("#### ROI % Over Time")
-                figR = px.line(comp_df, x="Month", y="ROI %", color="Scenario", markers=True)
-                figR.update_layout(
-                    height=350, 
-                    margin=dict(l=10,r=10,t=30,b=10),
-                    xaxis_title="Month",
-                    yaxis_title="ROI (%)"
-                )
-                st.plotly_chart(figR, use_container_width=True)
-
-                st.markdown("#### AI Revenue Streams Comparison")
-                melt_cols = ["Rev: AI Implementation Services","Rev: AI Consulting Services","Rev: AI Training Services","Rev: AI Support Services"]
-                melt_df = comp_df.melt(id_vars=["Month","Scenario"], value_vars=melt_cols, var_name="AI Revenue Stream", value_name="Amount")
-                figRB = px.line(melt_df, x="Month", y="Amount", color="Scenario", line_dash="AI Revenue Stream", markers=True)
-                figRB.update_layout(
-                    height=380, 
-                    margin=dict(l=10,r=10,t=30,b=10),
-                    xaxis_title="Month",
-                    yaxis_title="Revenue ($)"
+        st.markdown("#### ROI % Over Time")
+        show_chart("comparison roi", comp_figs["roi"]["figure"])
+
+        st.markdown("#### AI Revenue Streams Comparison")
+        show_chart("comparison revenue_streams", comp_figs["revenue_streams"]["figure"])
+
+        st.markdown("#### AI Enterprise Cost Analysis")
+        show_chart("comparison costs", comp_figs["costs"]["figure"])
+
+        st.markdown("#### Cumulative Cash Over Time")
+        show_chart("comparison cumulative_cash", comp_figs["cumulative_cash"]["figure"])
+        show_figure_stats(comp_figs, comp_cached)
+    else:
+        comp_df = pd.concat([df.assign(Scenario=n) for n, df in comp_frames.items()], ignore_index=True)
+        st.dataframe(comp_df[[comp_df.columns[0], "Scenario", "Revenue: Total", "Profit", "ROI %"]], use_container_width=True)
+
+def stored_sweep_comparison(chart_downsample):
+    """Rank and chart the scenarios of an Arrow sweep file; only the charted ones are copied out of the map"""
+    from arrow_io import SWEEP_SUMMARY_COLUMNS, list_sweeps
+    sweep_paths = list_sweeps(SWEEP_DIR)
+    if not sweep_paths:
+        st.info(f"No Arrow sweep files in `{SWEEP_DIR}/` yet. Store one from the Sensitivity tab, export saved "
+                f"scenarios as Arrow, or run `python batch_run.py book.csv --series-output {SWEEP_DIR}/book.arrow`.")
+        return
+    c1, c2, c3 = st.columns([2, 1, 1])
+    seed_choice("compare_sweep", sweep_paths)
+    sweep_path = c1.selectbox("Sweep file", sweep_paths, format_func=os.path.basename, key="compare_sweep")
+    sweep_sort = c2.selectbox("Rank by", list(SWEEP_SUMMARY_COLUMNS), format_func=SWEEP_SUMMARY_COLUMNS.get, key="compare_sweep_sort")
+    sweep_rows = c3.number_input("Rows", 10, 1000, step=10, key="compare_sweep_rows")
+    try:
+        with profiler.stage("compare: map sweep"):
+            sweep = open_sweep(sweep_path, os.stat(sweep_path).st_mtime_ns)
+            sweep_summary = sweep.summary()
+    except (OSError, ValueError, KeyError) as e:
+        st.error(f"❌ Could not read {os.path.basename(sweep_path)} as a sweep: {e}")
+        return
+    ranked = sweep_summary.sort_values(sweep_sort, ascending=sweep_sort == "payback_month", kind="stable").head(sweep_rows)
+    ranked.insert(0, "rank", np.arange(1, len(ranked) + 1))
+    st.caption(f"Showing {len(ranked):,} of {len(sweep_summary):,} scenarios • {sweep.num_rows:,} rows, "
+               f"{sweep.nbytes / 1024**2:,.1f} MB memory-mapped ({sweep.granularity}). Rankings are computed over "
+               "the mapped columns; only the charted scenarios are read into memory.")
+    st.dataframe(ranked, use_container_width=True, hide_index=True, column_config={
+        "rank": st.column_config.NumberColumn("#"),
+        "periods": st.column_config.NumberColumn("Periods"),
+        "final_revenue": st.column_config.NumberColumn("Final Revenue", format="$%.0f"),
+        "final_profit": st.column_config.NumberColumn("Final Profit", format="$%.0f"),
+        "final_roi_pct": st.column_config.NumberColumn("Final ROI %", format="%.1f%%"),
+        "cumulative_revenue": st.column_config.NumberColumn("Cumulative Revenue", format="$%.0f"),
+        "cumulative_profit": st.column_config.NumberColumn("Cumulative Profit", format="$%.0f"),
+        "payback_month": st.column_config.NumberColumn("Payback Month"),
+    })
+    top_k = st.number_input("Full time series for the top K scenarios", 1, MAX_SERIES_SCENARIOS,
+                            step=1, key="compare_sweep_top_k")
+    selected = ranked["name"].head(top_k).tolist()
+    with profiler.stage("compute: sweep series"):
+        comp_frames = {n: sweep.frame(n) for n in selected}
+    comparison_charts(comp_frames, selected, chart_downsample)
+
+@st.fragment
+def scenario_comparison(chart_downsample):
+    """Saved-scenario ranking and top-K series; filter changes rerun only this fragment"""
+    with profiler.stage("tab: Scenario Comparison"):
+        st.subheader("Compare Saved Scenarios")
+        compare_source = st.radio("Source", COMPARE_SOURCES, horizontal=True, key="compare_source",
+                                  help=f"Stored sweeps are Arrow files in `{SWEEP_DIR}/`, read through a memory map")
+        if compare_source == "Stored sweep":
+            stored_sweep_comparison(chart_downsample)
+            return
+        saved_count = scenario_store.count()
+        if saved_count:
+            st.markdown("#### 🏆 Scenario Ranking")
+            c1, c2, c3, c4 = st.columns(4)
+            tag_options = ["All"] + scenario_store.tags()
+            seed_choice("compare_tag", tag_options)
+            library_tag = c1.selectbox("Tag", tag_options, key="compare_tag")
+            library_search = c2.text_input("Name contains", key="compare_search")
+            library_sort = c3.selectbox("Rank by", list(SCENARIO_SORT_OPTIONS), format_func=SCENARIO_SORT_OPTIONS.get, key="compare_sort")
+            library_limit = c4.number_input("Rows", 10, 1000, step=10, key="compare_rows")
+            # Reads the summary rows written on save; no scenario is recomputed here
+            with profiler.stage("compare: query summaries"):
+                library = scenario_store.query(
+                    tag=None if library_tag == "All" else library_tag, name_contains=library_search or None,
+                    order_by=library_sort, descending=library_sort not in SCENARIO_SORT_ASCENDING, limit=library_limit
                 )
-                st.plotly_chart(figRB, use_container_width=True)
-
-                st.markdown("#### AI Enterprise Cost Analysis")
-                melt_c = ["Cost: Sales Commission","Cost: Marketing Investment","Cost: Implementation Delivery"]
-                melt_cost = comp_df.melt(id_vars=["Month","Scenario"], value_vars=melt_c, var_name="Cost Type", value_name="Amount")
-                figCB = px.line(melt_cost, x="Month", y="Amount", color="Scenario", line_dash="Cost Type", markers=True)
-                figCB.update_layout(
-                    height=360, 
+            library.insert(0, "rank", np.arange(1, len(library) + 1))
+            st.caption(f"Showing {len(library):,} of {saved_count:,} saved scenarios. Click a column header to re-sort.")
+            st.dataframe(library, use_container_width=True, hide_index=True, column_config={
+                "rank": st.column_config.NumberColumn("#"),
+                "months": st.column_config.NumberColumn("Periods"),
+                "granularity": st.column_config.TextColumn("Granularity"),
+                "final_revenue": st.column_config.NumberColumn("Final Revenue", format="$%.0f"),
+                "final_profit": st.column_config.NumberColumn("Final Profit", format="$%.0f"),
+                "final_roi_pct": st.column_config.NumberColumn("Final ROI %", format="%.1f%%"),
+                "cumulative_revenue": st.column_config.NumberColumn("Cumulative Revenue", format="$%.0f"),
+                "cumulative_profit": st.column_config.NumberColumn("Cumulative Profit", format="$%.0f"),
+                "break_even_month": st.column_config.NumberColumn("Break-even Month"),
+                "peak_cost_month": st.column_config.NumberColumn("Peak Cost Month"),
+                "npv": st.column_config.NumberColumn("NPV", format="$%.0f"),
+                "irr_pct": st.column_config.NumberColumn("IRR", format="%.1f%%"),
+                "payback_month": st.column_config.NumberColumn("Payback Month"),
+            })
+            with st.expander("🗑️ Delete a scenario"):
+                to_delete = st.selectbox("Scenario", library["name"].tolist(), key="delete_scenario")
+                if st.button("Delete", disabled=to_delete is None):
+                    scenario_store.delete(to_delete)
+                    st.rerun()
+
+            if library.empty:
+                st.info("No saved scenarios match these filters.")
+            else:
+                rank_metric = library_sort if library_sort in SUMMARY_COLUMNS else "cumulative_profit"
+                if PLOTLY_AVAILABLE:
+                    _, charts = plotting()
+                    with profiler.stage("figures: summary"):
+                        summary_figs, summary_cached = cached_figures(
+                            "summary", charts.SUMMARY_FIGURES, charts.frame_fingerprint(library) + "|" + rank_metric,
+                            library, rank_metric, SCENARIO_SORT_OPTIONS[rank_metric])
+                    c1, c2 = st.columns(2)
+                    with c1:
+                        st.markdown(f"#### Top Scenarios by {SCENARIO_SORT_OPTIONS[rank_metric]}")
+                        show_chart("summary ranking", summary_figs["ranking"]["figure"])
+                    with c2:
+                        st.markdown("#### Cumulative Profit vs Final ROI")
+                        show_chart("summary profit_vs_roi", summary_figs["profit_vs_roi"]["figure"])
+                        st.markdown("#### Break-even Distribution")
+                        show_chart("summary break_even", summary_figs["break_even"]["figure"])
+
+                top_k = st.number_input("Full time series for the top K scenarios", 1, MAX_SERIES_SCENARIOS,
+                                        step=1, key="compare_top_k")
+                selected = library["name"].head(top_k).tolist()
+                with profiler.stage("compute: comparison series"):
+                    comp_frames = {n: saved_scenario_frame(n) for n in selected}
+
+                comparison_charts(comp_frames, selected, chart_downsample)
+        else:
+            st.info("No saved scenarios yet. Configure settings and click **Save Scenario** there.")
+
+if tab_compare.open:
+    with tab_compare:
+        scenario_comparison(chart_downsample)
+
+# ===========================================================
+# SENSITIVITY (two-parameter heatmap)
+# ===========================================================
+@st.fragment
+def sensitivity_surface(current_params, forecast_periods, granularity, model_bounds):
+    """Two-parameter sweep around the current inputs; grid changes rerun only this fragment"""
+    from model_derivatives import GRADIENT_METRICS, SENSITIVITY_PARAMS
+    # Tornado metrics: the heatmap metrics that have a derivative
+    tornado_metrics = [m for m in SENSITIVITY_METRICS if m in GRADIENT_METRICS]
+    with profiler.stage("tab: Sensitivity"):
+        st.subheader("🌪️ Input Impact")
+        st.caption("How far the metric moves when one input changes by the step below and every other input keeps its "
+                   "Settings value. First-order estimates from exact partial derivatives, all from one model pass.")
+        c1, c2, c3 = st.columns(3)
+        tornado_metric = c1.selectbox("Metric", tornado_metrics, format_func=SENSITIVITY_METRICS.get, key="sens_tornado_metric")
+        tornado_step = c2.slider("Step (± % of each input)", 1, 50, key="sens_tornado_step")
+        tornado_rows = c3.slider("Inputs shown", 5, len(SENSITIVITY_PARAMS), key="sens_tornado_rows")
+        with profiler.stage("compute: gradients"):
+            impact = pd.Series(cached_what_if(forecast_periods, current_params, granularity, tornado_metric, tornado_step)).dropna()
+        unit = "pts" if tornado_metric in PERCENT_METRICS else "$"
+        if impact.empty:
+            st.info(f"The current scenario has no {SENSITIVITY_METRICS[tornado_metric]}, so it has no sensitivities either.")
+        else:
+            impact = impact.reindex(impact.abs().sort_values(ascending=False).index).head(tornado_rows)
+            top = impact.index[0]
+            impact.index = [INPUT_LABELS[name] for name in impact.index]
+            if PLOTLY_AVAILABLE:
+                show_chart("input impact tornado", plotting()[1].tornado_figure(impact, SENSITIVITY_METRICS[tornado_metric], tornado_step))
+            else:
+                st.dataframe(pd.DataFrame({f"−{tornado_step}%": -impact, f"+{tornado_step}%": impact}), use_container_width=True)
+            st.caption(f"🏆 Biggest lever: +{tornado_step}% on {INPUT_LABELS[top]} changes {SENSITIVITY_METRICS[tornado_metric]} "
+                       f"by {format_change(impact.iloc[0], unit)}")
+
+        st.subheader("🌡️ Two-Parameter Sensitivity Surface")
+        st.caption("Sweeps two inputs over a grid while every other input stays at its current Settings value.")
+        sweepable = list(PARAMETER_LABELS)
+        c1, c2, c3 = st.columns(3)
+        x_name = c1.selectbox("X-axis parameter", sweepable, format_func=PARAMETER_LABELS.get, key="sens_x")
+        y_name = c2.selectbox("Y-axis parameter", sweepable, format_func=PARAMETER_LABELS.get, key="sens_y")
+        sens_metric = c3.selectbox("Metric", list(SENSITIVITY_METRICS), format_func=SENSITIVITY_METRICS.get, key="sens_metric")
+
+        if x_name == y_name:
+            st.info("Choose two different parameters to sweep.")
+        else:
+            c1, c2, c3 = st.columns(3)
+            x_low, x_high, _ = model_bounds[x_name]
+            y_low, y_high, _ = model_bounds[y_name]
+            seed_range(f"sens_range_x_{x_name}", float(x_low), float(x_high))
+            seed_range(f"sens_range_y_{y_name}", float(y_low), float(y_high))
+            x_range = c1.slider(f"{PARAMETER_LABELS[x_name]} range", float(x_low), float(x_high), key=f"sens_range_x_{x_name}")
+            y_range = c2.slider(f"{PARAMETER_LABELS[y_name]} range", float(y_low), float(y_high), key=f"sens_range_y_{y_name}")
+            grid_steps = c3.slider("Grid resolution (steps per axis)", 10, 200, step=10, key="sens_steps")
+
+            x_values = parameter_grid(x_name, *x_range, grid_steps)
+            y_values = parameter_grid(y_name, *y_range, grid_steps)
+            cells = len(x_values) * len(y_values)
+            sens_key = ("sensitivity", forecast_periods, granularity, x_name, tuple(x_values.tolist()), y_name, tuple(y_values.tolist()), sens_metric) + scenario_cache_key(current_params)
+
+            def run_sweep():
+                progress_bar = st.progress(0.0, text=f"Evaluating {cells:,} scenarios...") if cells >= SENSITIVITY_PROGRESS_CELLS else None
+                started = time.perf_counter()
+                surface = sensitivity_grid(forecast_periods, current_params, x_name, x_values, y_name, y_values, sens_metric,
+                                           progress=progress_bar.progress if progress_bar else None, granularity=granularity,
+                                           memo=model_memo)
+                if progress_bar:
+                    progress_bar.empty()
+                return surface, time.perf_counter() - started
+
+            with profiler.stage("compute: sensitivity"):
+                surface, sweep_seconds = result_cache.get_or_compute(sens_key, run_sweep)
+            st.caption(f"⏱️ {cells:,} scenarios ({len(x_values)} × {len(y_values)}) evaluated in {sweep_seconds:.3f}s")
+
+            if PLOTLY_AVAILABLE:
+                go, _ = plotting()
+                figheat = go.Figure(go.Heatmap(
+                    x=x_values, y=y_values, z=surface, colorscale="RdYlGn_r" if sens_metric in SENSITIVITY_LOWER_IS_BETTER else "RdYlGn",
+                    colorbar=dict(title=SENSITIVITY_METRICS[sens_metric]),
+                    hovertemplate=f"{PARAMETER_LABELS[x_name]}: %{{x}}<br>{PARAMETER_LABELS[y_name]}: %{{y}}<br>{SENSITIVITY_METRICS[sens_metric]}: %{{z:,.1f}}<extra></extra>"
+                ))
+                figheat.add_trace(go.Scatter(
+                    x=[current_params[x_name]], y=[current_params[y_name]], mode="markers",
+                    marker=dict(symbol="x", size=12, color="black"), name="Current settings"
+                ))
+                figheat.update_layout(
+                    height=520,
                     margin=dict(l=10,r=10,t=30,b=10),
-                    xaxis_title="Month",
-                    yaxis_title="Cost ($)"
+                    xaxis_title=PARAMETER_LABELS[x_name],
+                    yaxis_title=PARAMETER_LABELS[y_name]
                 )
-                st.plotly_chart(figCB, use_container_width=True)
+                show_chart("sensitivity heatmap", figheat)
             else:
-                st.dataframe(comp_df[["Month", "Scenario", "Revenue: Total", "Profit", "ROI %"]], use_container_width=True)
-        else:
-            st.info("Select at least one saved scenario to compare.")
-    else:
-        st.info("No saved scenarios yet. Configure settings and click **Save Scenario** there.")
+                st.dataframe(pd.DataFrame(surface, index=y_values, columns=x_values), use_container_width=True)
+
+            if np.isnan(surface).all():
+                st.caption(f"No cell on this grid has a {SENSITIVITY_METRICS[sens_metric]}.")
+            else:
+                pick = np.nanargmin if sens_metric in SENSITIVITY_LOWER_IS_BETTER else np.nanargmax
+                best = np.unravel_index(pick(surface), surface.shape)
+                st.caption(f"🏆 Best {SENSITIVITY_METRICS[sens_metric]} on this grid: {surface[best]:,.1f} at "
+                           f"{PARAMETER_LABELS[x_name]} = {x_values[best[1]]}, {PARAMETER_LABELS[y_name]} = {y_values[best[0]]}")
+
+            grid_rows = cells * forecast_periods
+            with st.expander("💾 Store this grid as a sweep"):
+                st.caption(f"Writes the full series of all {cells:,} scenarios ({grid_rows:,} rows) to an Arrow file in "
+                           f"`{SWEEP_DIR}/`. Compare it under Scenario Comparison → Stored sweep, or memory-map it from "
+                           "pandas, Polars or DuckDB.")
+                if grid_rows > MAX_STORED_SWEEP_ROWS:
+                    st.info(f"That is more than {MAX_STORED_SWEEP_ROWS:,} rows; lower the grid resolution or the horizon.")
+                elif st.button("Store sweep"):
+                    grid_x, grid_y = np.meshgrid(x_values, y_values)
+                    sweep_params = dict(current_params, **{x_name: grid_x.ravel(), y_name: grid_y.ravel()})
+                    sweep_names = [f"{x_name}={x:g}, {y_name}={y:g}" for x, y in zip(grid_x.ravel(), grid_y.ravel())]
+                    sweep_path = os.path.join(SWEEP_DIR, f"sensitivity_{x_name}_{y_name}_{time.strftime('%Y%m%d-%H%M%S')}.arrow")
+                    from arrow_io import write_sweep
+                    with profiler.stage("export: sweep"), st.spinner(f"Writing {cells:,} scenarios..."):
+                        write_sweep(sweep_path, forecast_periods, sweep_params, granularity, sweep_names)
+                    st.success(f"✅ Stored {cells:,} scenarios in `{sweep_path}` ({os.path.getsize(sweep_path) / 1024**2:,.1f} MB)")
+
+if tab_sensitivity.open:
+    with tab_sensitivity:
+        sensitivity_surface(current_params, forecast_periods, granularity, model_bounds)
 
 # ===========================================================
 # DOWNLOAD
 # ===========================================================
-with tab_download:
-    st.subheader("Download Scenarios")
-    if st.session_state.scenarios:
-        selected_dl = st.multiselect("Select scenarios", list(st.session_state.scenarios.keys()),
-                                     default=list(st.session_state.scenarios.keys())[:1])
-
-        def to_excel(dfs, names):
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-                for df, name in zip(dfs, names):
-                    df.to_excel(writer, sheet_name=name[:31], index=False)
-            return output.getvalue()
-
-        if st.button("Download Selected as Excel"):
-            excel_bytes = to_excel([st.session_state.scenarios[n] for n in selected_dl], selected_dl)
-            st.download_button("📥 Download Excel", data=excel_bytes,
-                               file_name="ai_enterprise_financial_scenarios.xlsx",
-                               mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-    else:
-        st.info("No saved scenarios to download yet.")
+@st.fragment
+def scenario_downloads():
+    """Export widgets; choosing scenarios or a format reruns only this fragment"""
+    from export_pipeline import EXPORT_FORMATS, export_scenarios
+    with profiler.stage("tab: Export & Reports"):
+        st.subheader("Download Scenarios")
+        saved_names = scenario_store.names()
+        if saved_names:
+            st.session_state["export_names"] = [n for n in st.session_state.get("export_names", saved_names[:1]) if n in saved_names]
+            selected_dl = st.multiselect("Select scenarios", saved_names, key="export_names")
+
+            export_format = st.radio("Format", list(EXPORT_FORMATS), format_func=lambda f: EXPORT_FORMATS[f][0], horizontal=True,
+                                     key="export_format")
+            _, extension, mime, _ = EXPORT_FORMATS[export_format]
+
+            def build_export(names=tuple(selected_dl), fmt=export_format):
+                # Runs only when the button is clicked; scenarios are recomputed and
+                # written one at a time into a temp file on disk
+                output = tempfile.TemporaryFile()
+                with profiler.stage(f"export: {fmt}"):
+                    export_scenarios(output, fmt, iter_saved_scenario_frames(names), summary=scenario_store.summaries(names))
+                output.seek(0)
+                return output
+
+            st.download_button(f"📥 Download {len(selected_dl)} scenario(s)", data=build_export,
+                               file_name=f"ai_enterprise_financial_scenarios.{extension}", mime=mime,
+                               disabled=not selected_dl)
+        else:
+            st.info("No saved scenarios to download yet.")
+
+if tab_download.open:
+    with tab_download:
+        scenario_downloads()
 
 # Add requirements installation instructions
 st.markdown("---")
@@ -548,4 +1186,63 @@ pip install streamlit pandas numpy plotly
 
 # Or if using requirements.txt:
 pip install -r requirements.txt
-""")
\ No newline at end of file
+""")
+
+# ===========================================================
+# STARTUP REPORT (closed by the first run to get here; presets warm afterwards)
+# ===========================================================
+if startup_report.finish():
+    print(f"⏱️ Startup to first render: {startup_report.summary()}", flush=True)
+    threading.Thread(target=warm_presets, name="warm-presets", daemon=True).start()
+with st.sidebar.expander("🚀 Startup"):
+    startup_phases = startup_report.frame()
+    st.caption(f"First render of this server process: {startup_report.total_seconds():.2f}s")
+    st.dataframe(pd.DataFrame({
+        "Phase": startup_phases["phase"] + np.where(startup_phases["before_render"], "", " (background)"),
+        "Wall (ms)": startup_phases["seconds"] * 1000,
+    }).round(1), use_container_width=True, hide_index=True)
+
+# ===========================================================
+# RERUN PROFILE (rendered last so the table includes this rerun)
+# ===========================================================
+profiler.finish_rerun()
+if profiler.enabled:
+    st.markdown("---")
+    st.markdown("### 🩺 Rerun Profile")
+    c1, c2 = st.columns([1, 3])
+    profiler.resize(c1.number_input("Reruns kept", 5, 500, PROFILE_HISTORY_DEFAULT, 5, key="profile_history"))
+    profile_totals = profiler.totals_frame()
+    profile_stages = profiler.history_frame()
+    latest = profile_totals.iloc[-1]
+    c2.caption(f"Last rerun {latest['seconds'] * 1000:,.1f} ms • peak {latest['peak_bytes'] / 1024**2:,.1f} MB traced • "
+               f"{len(profile_totals)} run(s) recorded. Allocation is net bytes still held when the stage ends; "
+               "tracing memory slows the app while profiling is on.")
+
+    c1, c2 = st.columns(2)
+    with c1:
+        st.markdown("#### Last rerun")
+        last_stages = profile_stages[profile_stages["rerun"] == latest["rerun"]]
+        st.dataframe(pd.DataFrame({
+            "Stage": ["\u2003" * d + name for d, name in zip(last_stages["depth"], last_stages["stage"])],
+            "Wall (ms)": last_stages["seconds"] * 1000,
+            "Alloc (KB)": last_stages["alloc_bytes"] / 1024,
+            "Peak (KB)": last_stages["peak_bytes"] / 1024,
+        }).round(1), use_container_width=True, hide_index=True)
+    with c2:
+        st.markdown(f"#### Last {len(profile_totals)} run(s)")
+        per_stage = profile_stages.groupby("stage", sort=False).agg(
+            runs=("rerun", "nunique"), wall=("seconds", "mean"), wall_max=("seconds", "max"),
+            alloc=("alloc_bytes", "mean"), peak=("peak_bytes", "max"))
+        st.dataframe(pd.DataFrame({
+            "Runs": per_stage["runs"],
+            "Mean (ms)": per_stage["wall"] * 1000,
+            "Max (ms)": per_stage["wall_max"] * 1000,
+            "Mean alloc (KB)": per_stage["alloc"] / 1024,
+            "Max peak (KB)": per_stage["peak"] / 1024,
+        }).round(1), use_container_width=True)
+        st.bar_chart(profile_totals.assign(ms=profile_totals["seconds"] * 1000).set_index("rerun")["ms"], height=160)
+
+    st.download_button("📥 Download trace (Chrome trace-event JSON)",
+                       data=lambda: json.dumps(profiler.chrome_trace()),
+                       file_name="ffq_rerun_profile.trace.json", mime="application/json",
+                       help="Opens in chrome://tracing, ui.perfetto.dev or speedscope")
@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""
+Local HTTP API for the AI Enterprise Integration financial model
+
+Lets planning tools and notebooks call the engine behind FFQ.py without the UI.
+Single-scenario requests that arrive within a few milliseconds of each other are
+coalesced into one vectorized engine call, identical requests in flight share one
+evaluation, and finished responses are kept in a memory-bounded LRU cache. Engine
+work runs in a process pool so the event loop only parses and routes.
+
+    python api_server.py                          # http://127.0.0.1:8600
+    python api_server.py --port 9000 --workers 4 --cache-mb 512
+
+    GET  /health      model version, pool size, cache and coalescing counters
+    GET  /parameters  defaults and valid range of every model input (?months=120)
+    POST /scenario    {"params": {...}, "months": 36, "granularity": "monthly"}
+                      -> summary and per-period series of one scenario
+    POST /batch       {"scenarios": [{...}, ...], "months": 36, "series": false}
+                      -> one summary row per scenario, plus stacked series if asked
+
+Missing parameters take their defaults. Responses are JSON (summary and series as
+column -> values objects, null for NaN) unless the request sends
+Accept: application/vnd.apache.arrow.stream (or ?format=arrow); the body is then an
+Arrow IPC stream of the series table, with the summary as JSON records under the
+"scenario_summary" schema metadata key, or of the summary table when no series are
+returned. /batch also takes an Arrow IPC stream body (one row per scenario, optional
+"scenario" column) with months, granularity and series as query parameters.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from batch_run import SCENARIO_COLUMN, evaluate_chunk, prepare_chunk
+from export_pipeline import PARQUET_SUMMARY_KEY
+from financial_engine import (
+    MONTHS, MAX_HORIZON_MONTHS, MODEL_VERSION, GRANULARITIES, AI_ENTERPRISE_DEFAULTS, AI_ENTERPRISE_PARAMS,
+    chunk_rows, horizon_periods, parameter_bounds,
+)
+from result_cache import ResultCache
+
+DEFAULT_PORT = 8600
+JSON_TYPE = "application/json"
+ARROW_TYPE = "application/vnd.apache.arrow.stream"
+MEDIA_TYPES = {"json": JSON_TYPE, "arrow": ARROW_TYPE}
+
+# Single-scenario requests wait at most this long for company before being evaluated
+COALESCE_WINDOW_MS = 2.0
+COALESCE_MAX_BATCH = 256
+
+# Request size limits: scenarios per batch, and scenario x period cells when series are returned
+MAX_BATCH_SCENARIOS = 100_000
+MAX_SERIES_CELLS = 5_000_000
+
+
+# ---- Parsing and validation ----
+
+def response_format(request):
+    """"arrow" when the client asks for an Arrow IPC stream, else "json" """
+    fmt = request.query_params.get("format")
+    if fmt is None:
+        return "arrow" if ARROW_TYPE in request.headers.get("accept", "") else "json"
+    if fmt not in MEDIA_TYPES:
+        raise ValueError(f"format must be one of: {', '.join(MEDIA_TYPES)}")
+    return fmt
+
+
+def parse_horizon(options):
+    """(periods, granularity, months) from a request's months/granularity options"""
+    try:
+        months = int(options.get("months", MONTHS))
+    except (TypeError, ValueError):
+        raise ValueError("months must be a whole number") from None
+    if not 1 <= months <= MAX_HORIZON_MONTHS:
+        raise ValueError(f"months must be between 1 and {MAX_HORIZON_MONTHS}")
+    granularity = options.get("granularity", "monthly")
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of: {', '.join(GRANULARITIES)}")
+    return horizon_periods(months, granularity), granularity, months
+
+
+def parse_flag(value):
+    if isinstance(value, str):
+        return value.lower() in ("1", "true", "yes")
+    return bool(value)
+
+
+def invalid(name, low, high, integer, scenario=None):
+    kind = "a whole number" if integer else "a number"
+    where = f" (scenario {scenario})" if scenario is not None else ""
+    return ValueError(f"{name} must be {kind} between {low:g} and {high:g}{where}")
+
+
+def out_of_bounds(values, low, high, integer):
+    """Mask of values outside [low, high] or, for integer inputs, not whole; NaN counts as out"""
+    return ~((values >= low) & (values <= high)) | (integer & (values != np.round(values)))
+
+
+def scenario_row(params, months):
+    """One parameter set as validated floats keyed by parameter name, defaults filled.
+
+    Plain-Python twin of scenario_table for /scenario, where a DataFrame round trip
+    would cost more than the cached response it is looking up.
+    """
+    if not isinstance(params, dict):
+        raise ValueError("params must be an object of parameter name -> value")
+    unknown = params.keys() - set(AI_ENTERPRISE_PARAMS)
+    if unknown:
+        raise ValueError(f"unknown parameter(s): {', '.join(sorted(unknown))}")
+    row = {}
+    for name, (low, high, integer) in parameter_bounds(months).items():
+        value = params.get(name)
+        try:
+            value = float(AI_ENTERPRISE_DEFAULTS[name] if value is None else value)
+        except (TypeError, ValueError):
+            raise invalid(name, low, high, integer) from None
+        if not low <= value <= high or (integer and value != round(value)):
+            raise invalid(name, low, high, integer)
+        row[name] = value
+    return row
+
+
+def scenario_table(rows, months):
+    """Parameter rows (list of dicts or DataFrame) as a validated scenario table with defaults filled"""
+    if not isinstance(rows, pd.DataFrame) and not all(isinstance(r, dict) for r in rows):
+        raise ValueError("each scenario must be an object of parameter name -> value")
+    table = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame.from_records(rows)
+    unknown = set(table.columns) - set(AI_ENTERPRISE_PARAMS) - {SCENARIO_COLUMN}
+    if unknown:
+        raise ValueError(f"unknown parameter(s): {', '.join(sorted(unknown))}")
+    chunk = prepare_chunk(table, 0)
+    for name, (low, high, integer) in parameter_bounds(months).items():
+        values = pd.to_numeric(chunk[name], errors="coerce").to_numpy(dtype=float)
+        bad = np.flatnonzero(out_of_bounds(values, low, high, integer))
+        if bad.size:
+            raise invalid(name, low, high, integer, bad[0] + 1)
+        chunk[name] = values
+    names = chunk[SCENARIO_COLUMN]
+    default_names = pd.Series([f"scenario_{i + 1}" for i in range(len(chunk))], index=names.index)
+    chunk[SCENARIO_COLUMN] = names.where(names.notna(), default_names).astype(str)
+    return chunk
+
+
+# ---- Evaluation and encoding (run in worker processes / threads) ----
+
+def json_list(values):
+    """NumPy column as a JSON-ready list, NaN as null"""
+    if values.dtype.kind == "f" and np.isnan(values).any():
+        return [None if v != v else v for v in values.tolist()]
+    return values.tolist()
+
+
+def arrow_stream(table, summary_json=None):
+    """Arrow IPC stream bytes of table, with the summary (JSON records) in the schema metadata"""
+    if summary_json is not None:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), PARQUET_SUMMARY_KEY: summary_json})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def encode(fmt, summary, series=None, meta=None):
+    """Response body: a JSON object with column -> values lists, or an Arrow IPC stream
+    of the series (summary in the metadata) or of the summary"""
+    if fmt == "arrow":
+        if series is None:
+            return arrow_stream(pa.Table.from_pandas(summary, preserve_index=False))
+        return arrow_stream(pa.Table.from_pandas(series, preserve_index=False), summary.to_json(orient="records"))
+    payload = {**(meta or {}), "summary": {c: json_list(summary[c].to_numpy()) for c in summary}}
+    if series is not None:
+        payload["series"] = {c: json_list(series[c].to_numpy()) for c in series}
+    return json.dumps(payload).encode()
+
+
+def render_scenarios(periods, granularity, rows, fmt, meta):
+    """Worker: evaluate a coalesced group of single-scenario requests, one encoded body each.
+
+    The group is evaluated and converted once; each body is then a slice of it.
+    """
+    summary, series = evaluate_chunk(periods, granularity, prepare_chunk(pd.DataFrame(rows), 0), True)
+    summary = summary.drop(columns=SCENARIO_COLUMN)
+    series = series.drop(columns="Scenario")
+    if fmt == "arrow":
+        table = pa.Table.from_pandas(series, preserve_index=False)
+        records = json.loads(summary.to_json(orient="records"))
+        return [arrow_stream(table.slice(i * periods, periods), json.dumps([records[i]])) for i in range(len(rows))]
+    summary_columns = {c: json_list(summary[c].to_numpy()) for c in summary}
+    series_columns = {c: series[c].to_numpy() for c in series}
+    return [json.dumps({
+        **meta,
+        "summary": {c: values[i] for c, values in summary_columns.items()},
+        "series": {c: json_list(values[i * periods:(i + 1) * periods]) for c, values in series_columns.items()},
+    }).encode() for i in range(len(rows))]
+
+
+def warm_up():
+    """Worker: import and run the engine once so the first real request skips that cost"""
+    evaluate_chunk(1, "monthly", prepare_chunk(pd.DataFrame(index=[0]), 0), True)
+    return os.getpid()
+
+
+class Coalescer:
+    """Merges single-scenario requests for the same horizon and format into one engine call.
+
+    A request waits at most `window` seconds for company. While every worker is busy,
+    requests keep queuing and each freed worker takes up to max_batch of them, so
+    batches grow with load instead of piling up single-scenario calls.
+    """
+
+    def __init__(self, pool, workers, window=COALESCE_WINDOW_MS / 1000, max_batch=COALESCE_MAX_BATCH):
+        self.pool = pool
+        self.workers = workers
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = {}  # (periods, granularity, fmt, months) -> [(row, future)], oldest group first
+        self._timer = None
+        self._busy = 0
+        self.requests = 0
+        self.engine_calls = 0
+
+    async def submit(self, group, row):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.requests += 1
+        waiting = self._pending.setdefault(group, [])
+        waiting.append((row, future))
+        if len(waiting) >= self.max_batch:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._dispatch)
+        return await future
+
+    def _dispatch(self):
+        """Hand the oldest waiting groups to idle workers"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        loop = asyncio.get_running_loop()
+        while self._pending and self._busy < self.workers:
+            group = next(iter(self._pending))
+            waiting = self._pending[group]
+            taken, rest = waiting[:self.max_batch], waiting[self.max_batch:]
+            if rest:
+                self._pending[group] = rest
+            else:
+                del self._pending[group]
+            periods, granularity, fmt, months = group
+            meta = {"model_version": MODEL_VERSION, "months": months, "granularity": granularity}
+            self._busy += 1
+            self.engine_calls += 1
+            task = loop.run_in_executor(self.pool, render_scenarios, periods, granularity,
+                                        [row for row, _ in taken], fmt, meta)
+            task.add_done_callback(lambda done, taken=taken: self._finished(taken, done))
+
+    def _finished(self, taken, done):
+        self._busy -= 1
+        self._resolve(taken, done)
+        if self._pending:  # these already waited for a worker; no extra window
+            self._dispatch()
+
+    @staticmethod
+    def _resolve(waiting, done):
+        error = done.exception()
+        bodies = [None] * len(waiting) if error is not None else done.result()
+        for (_, future), body in zip(waiting, bodies):
+            if future.done():  # caller went away
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(body)
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "engine_calls": self.engine_calls,
+            "scenarios_per_call": self.requests / self.engine_calls if self.engine_calls else 0.0,
+        }
+
+
+async def evaluate_batch(state, periods, granularity, chunk, with_series, fmt, meta):
+    """Split a batch across the worker pool (cell-budgeted chunks), then merge and encode"""
+    loop = asyncio.get_running_loop()
+    n = len(chunk)
+    step = chunk_rows(periods, -(-n // state.workers))
+    parts = await asyncio.gather(*(
+        loop.run_in_executor(state.pool, evaluate_chunk, periods, granularity, chunk.iloc[start:start + step], with_series)
+        for start in range(0, n, step)))
+    summary = pd.concat([s for s, _ in parts], ignore_index=True)
+    series = pd.concat([s for _, s in parts], ignore_index=True) if with_series else None
+    return await asyncio.to_thread(encode, fmt, summary, series, meta)
+
+
+async def cached_response(state, key, fmt, compute):
+    """Serve key from the response cache; on a miss, share one computation among identical in-flight requests"""
+    body = state.cache.get(key)
+    if body is None:
+        shared = state.inflight.get(key)
+        if shared is None:
+            shared = state.inflight[key] = asyncio.ensure_future(compute())
+
+            def finished(done):
+                state.inflight.pop(key, None)
+                if not done.cancelled() and done.exception() is None:
+                    state.cache.put(key, done.result())
+            shared.add_done_callback(finished)
+        else:
+            state.shared_inflight += 1
+        body = await asyncio.shield(shared)
+    return Response(body, media_type=MEDIA_TYPES[fmt])
+
+
+# ---- Endpoints ----
+
+def endpoint(handler):
+    """Report invalid requests as 400 and engine failures as 500, both as JSON"""
+    async def wrapped(request):
+        try:
+            return await handler(request)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        except Exception as e:
+            return JSONResponse({"error": f"{type(e).__name__}: {e}"}, status_code=500)
+    return wrapped
+
+
+@endpoint
+async def health(request):
+    state = request.app.state
+    return JSONResponse({
+        "status": "ok",
+        "model_version": MODEL_VERSION,
+        "workers": state.workers,
+        "cache": state.cache.stats(),
+        "coalescing": {**state.coalescer.stats(), "shared_inflight": state.shared_inflight},
+    })
+
+
+@endpoint
+async def parameters(request):
+    _, _, months = parse_horizon(request.query_params)
+    return JSONResponse({
+        "months": months,
+        "max_months": MAX_HORIZON_MONTHS,
+        "granularities": list(GRANULARITIES),
+        "defaults": AI_ENTERPRISE_DEFAULTS,
+        "bounds": {name: {"min": low, "max": high, "integer": integer}
+                   for name, (low, high, integer) in parameter_bounds(months).items()},
+    })
+
+
+@endpoint
+async def scenario(request):
+    state = request.app.state
+    fmt = response_format(request)
+    options = json.loads(await request.body() or b"{}")
+    if not isinstance(options, dict):
+        raise ValueError("request body must be a JSON object")
+    periods, granularity, months = parse_horizon(options)
+    row = scenario_row(options.get("params", {}), months)
+    group = (periods, granularity, fmt, months)
+    key = ("scenario", *group, tuple(row.values()))
+    return await cached_response(state, key, fmt, lambda: state.coalescer.submit(group, row))
+
+
+def read_batch(body, content_type, query):
+    """(scenario rows, options) from a JSON or Arrow IPC request body"""
+    if content_type.startswith(ARROW_TYPE):
+        return pa.ipc.open_stream(body).read_all().to_pandas(), query
+    options = json.loads(body or b"{}")
+    if not isinstance(options, dict) or not isinstance(options.get("scenarios"), list):
+        raise ValueError('request body must be a JSON object with a "scenarios" list')
+    return options["scenarios"], options
+
+
+@endpoint
+async def batch(request):
+    state = request.app.state
+    fmt = response_format(request)
+    rows, options = await asyncio.to_thread(
+        read_batch, await request.body(), request.headers.get("content-type", ""), dict(request.query_params))
+    periods, granularity, months = parse_horizon(options)
+    with_series = parse_flag(options.get("series", False))
+    n = len(rows)
+    if not 1 <= n <= MAX_BATCH_SCENARIOS:
+        raise ValueError(f"a batch holds between 1 and {MAX_BATCH_SCENARIOS:,} scenarios")
+    if with_series and n * periods > MAX_SERIES_CELLS:
+        raise ValueError(f"series for {n:,} scenarios x {periods:,} periods exceed {MAX_SERIES_CELLS:,} cells; "
+                         "request summaries only or split the batch")
+    chunk = await asyncio.to_thread(scenario_table, rows, months)
+    digest = hashlib.blake2b(np.ascontiguousarray(chunk[AI_ENTERPRISE_PARAMS].to_numpy(dtype=float)).tobytes())
+    digest.update("\0".join(chunk[SCENARIO_COLUMN]).encode())
+    key = ("batch", periods, granularity, fmt, months, with_series, digest.hexdigest())
+    meta = {"model_version": MODEL_VERSION, "months": months, "granularity": granularity, "scenarios": n}
+    return await cached_response(state, key, fmt,
+                                 lambda: evaluate_batch(state, periods, granularity, chunk, with_series, fmt, meta))
+
+
+def create_app(workers=None, cache_bytes=256 * 1024 * 1024, coalesce_ms=COALESCE_WINDOW_MS,
+               max_coalesce=COALESCE_MAX_BATCH):
+    """Starlette app owning a process pool of `workers` engines and a response cache of cache_bytes"""
+    workers = workers or os.cpu_count() or 1
+
+    @asynccontextmanager
+    async def lifespan(app):
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*(loop.run_in_executor(pool, warm_up) for _ in range(workers)))
+            app.state.pool = pool
+            app.state.workers = workers
+            app.state.cache = ResultCache(cache_bytes)
+            app.state.coalescer = Coalescer(pool, workers, coalesce_ms / 1000, max_coalesce)
+            app.state.inflight = {}
+            app.state.shared_inflight = 0
+            yield
+
+    return Starlette(routes=[
+        Route("/health", health),
+        Route("/parameters", parameters),
+        Route("/scenario", scenario, methods=["POST"]),
+        Route("/batch", batch, methods=["POST"]),
+    ], lifespan=lifespan)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the AI enterprise financial model over local HTTP")
+    parser.add_argument("--host", default="127.0.0.1", help="interface to bind (default 127.0.0.1, local only)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"port (default {DEFAULT_PORT})")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="engine worker processes")
+    parser.add_argument("--cache-mb", type=int, default=256, help="response cache size in MB (default 256)")
+    parser.add_argument("--coalesce-ms", type=float, default=COALESCE_WINDOW_MS,
+                        help=f"how long a single-scenario request waits to be batched (default {COALESCE_WINDOW_MS:g})")
+    parser.add_argument("--max-coalesce", type=int, default=COALESCE_MAX_BATCH,
+                        help=f"most single-scenario requests per engine call (default {COALESCE_MAX_BATCH})")
+    args = parser.parse_args()
+
+    if args.workers < 1 or args.max_coalesce < 1 or args.coalesce_ms < 0:
+        parser.error("--workers and --max-coalesce must be at least 1 and --coalesce-ms not negative")
+    app = create_app(args.workers, args.cache_mb * 1024 * 1024, args.coalesce_ms, args.max_coalesce)
+    print(f"🚀 Serving the financial model on http://{args.host}:{args.port} ({args.workers} worker(s))")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Arrow IPC (Feather v2) interchange for model results
+
+Engine output is written as Arrow record batches, in the stacked display layout
+(one row per scenario and period, Scenario column last, amounts unrounded), into
+uncompressed IPC files. pandas, Polars, DuckDB and pyarrow can memory-map such a "sweep" file and
+read it without copying; compressed buffers would have to be decoded into memory
+first. SweepFile reads one back through a memory map: per-scenario summaries come
+from Arrow kernels over the mapped columns, and only the scenarios actually shown
+are converted to pandas. No Streamlit needed.
+"""
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from financial_engine import (
+    MODEL_VERSION, GRANULARITIES, batch_stacked_frame, chunk_rows, generate_ai_enterprise_financials_batch,
+    normalize_scenario_params, period_month,
+)
+from export_pipeline import GRANULARITY_COLUMN, PERIOD_COLUMN
+
+SWEEP_SUFFIXES = (".arrow", ".feather")
+SWEEP_METADATA_KEY = b"sweep"
+SCENARIO_COLUMN = "Scenario"
+
+# SweepFile.summary() columns -> labels
+SWEEP_SUMMARY_COLUMNS = {
+    "final_revenue": "Final Revenue",
+    "final_profit": "Final Profit",
+    "final_roi_pct": "Final ROI %",
+    "cumulative_revenue": "Cumulative Revenue",
+    "cumulative_profit": "Cumulative Profit",
+    "payback_month": "Payback Month",
+}
+
+
+def sweep_metadata(periods, granularity="monthly"):
+    """Schema metadata recording a uniform sweep layout (every scenario spans `periods` rows)"""
+    info = {"periods": int(periods), "granularity": granularity, "model_version": MODEL_VERSION}
+    return {SWEEP_METADATA_KEY: json.dumps(info)}
+
+
+def batch_record_batch(batch, scenario_names=None):
+    """One engine batch as an Arrow record batch in the stacked display layout.
+
+    Amounts are kept unrounded, so SweepFile.summary() totals match summarize_batch.
+    """
+    n = len(batch["params"]["avg_implementation_value"])
+    names = scenario_names if scenario_names is not None else [f"Scenario {i + 1}" for i in range(n)]
+    return pa.RecordBatch.from_pandas(batch_stacked_frame(batch, names, rounded=False), preserve_index=False)
+
+
+def iter_sweep_batches(periods, params, granularity="monthly", scenario_names=None, chunk_size=5000):
+    """Evaluate a parameter table in memory-bounded chunks, yielding one record batch per chunk"""
+    p = normalize_scenario_params(params)
+    n = len(p["avg_implementation_value"])
+    names = list(scenario_names) if scenario_names is not None else [f"Scenario {i + 1}" for i in range(n)]
+    step = chunk_rows(periods, chunk_size)
+    for start in range(0, n, step):
+        end = min(start + step, n)
+        batch = generate_ai_enterprise_financials_batch(periods, {name: v[start:end] for name, v in p.items()},
+                                                        granularity=granularity)
+        yield batch_record_batch(batch, names[start:end])
+
+
+def write_sweep(path, periods, params, granularity="monthly", scenario_names=None, chunk_size=5000):
+    """Evaluate params and write every scenario's series to an Arrow IPC file; returns the scenario count.
+
+    The file is written next to `path` and renamed into place, so readers that
+    still have the previous version mapped keep a valid (old) view instead of
+    reading a truncated file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, partial = tempfile.mkstemp(dir=directory, suffix=".partial")
+    os.close(fd)
+    scenarios = 0
+    try:
+        writer = None
+        try:
+            for record_batch in iter_sweep_batches(periods, params, granularity, scenario_names, chunk_size):
+                if writer is None:
+                    schema = record_batch.schema
+                    writer = pa.ipc.new_file(partial, schema.with_metadata({**(schema.metadata or {}),
+                                                                            **sweep_metadata(periods, granularity)}))
+                writer.write_batch(record_batch)
+                scenarios += record_batch.num_rows // periods
+        finally:
+            if writer is not None:
+                writer.close()
+        os.replace(partial, path)
+    except BaseException:
+        os.remove(partial)
+        raise
+    return scenarios
+
+
+class SweepFile:
+    """Read-only, memory-mapped view of an Arrow IPC file of stacked scenario series.
+
+    Opening reads the IPC footer and maps the column buffers; nothing is copied
+    until a scenario frame is requested. Each scenario's rows must be contiguous,
+    as every writer here produces them. Files without sweep metadata work too:
+    the granularity is taken from the period column name, or per scenario from
+    the Granularity column of the Export tab's Arrow download (which may mix them).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._source = pa.memory_map(path, "r")
+        self.table = pa.ipc.open_file(self._source).read_all()
+        if SCENARIO_COLUMN not in self.table.column_names:
+            raise ValueError(f"{os.path.basename(path)} has no {SCENARIO_COLUMN} column")
+        info = json.loads((self.table.schema.metadata or {}).get(SWEEP_METADATA_KEY, b"{}"))
+        self.period_column = self.table.column_names[0]
+        self.by_scenario = GRANULARITY_COLUMN in self.table.column_names
+        if self.by_scenario and self.table.num_rows:
+            self.granularity = self.table[GRANULARITY_COLUMN][0].as_py()
+        else:
+            self.granularity = info.get("granularity") or next(
+                (g for g, (_, label) in GRANULARITIES.items() if label == self.period_column), "monthly")
+        self.model_version = info.get("model_version")
+        self._summary = None
+        self._offsets = None
+        self._positions = None
+
+    @property
+    def nbytes(self):
+        return self._source.size()
+
+    @property
+    def num_rows(self):
+        return self.table.num_rows
+
+    def summary(self):
+        """One row per scenario in file order: periods, final and cumulative revenue and profit,
+        final ROI % and payback month (first month with cumulative cash >= 0, one past the
+        horizon if never). Computed by hash aggregation over the mapped columns; files with
+        whole-dollar amounts (e.g. the Export tab's Arrow download) give whole-dollar totals."""
+        if self._summary is None:
+            table, period = self.table, self.period_column
+            grouped = table.group_by(SCENARIO_COLUMN, use_threads=False).aggregate([
+                (period, "count"), ("Revenue: Total", "last"), ("Profit", "last"), ("ROI %", "last"),
+                ("Revenue: Total", "sum"), ("Profit", "sum"),
+            ])
+            paid = (table.select([SCENARIO_COLUMN, period])
+                    .filter(pc.greater_equal(table["Cumulative Cash ($)"], 0))
+                    .group_by(SCENARIO_COLUMN, use_threads=False).aggregate([(period, "min")]))
+            counts = grouped[f"{period}_count"].to_numpy()
+            offsets = np.concatenate([[0], np.cumsum(counts)])
+            names = grouped[SCENARIO_COLUMN].to_pylist()
+            if names and pc.take(table[SCENARIO_COLUMN], pa.array(offsets[:-1])).to_pylist() != names:
+                raise ValueError(f"scenarios in {os.path.basename(self.path)} are not stored in contiguous rows")
+            payback = pd.Series(paid[f"{period}_min"].to_numpy(), index=paid[SCENARIO_COLUMN].to_pylist())
+            payback_period = payback.reindex(names).to_numpy(dtype=float)
+            payback_period = np.where(np.isnan(payback_period), counts + 1, payback_period).astype(np.int64)
+            if self.by_scenario:
+                granularity = np.asarray(pc.take(table[GRANULARITY_COLUMN], pa.array(offsets[:-1])).to_pylist(), dtype=object)
+                payback_months = np.zeros(len(names), dtype=np.int64)
+                for g in set(granularity):
+                    payback_months[granularity == g] = period_month(payback_period[granularity == g], g)
+            else:
+                payback_months = period_month(payback_period, self.granularity)
+            self._summary = pd.DataFrame({
+                "name": names,
+                "periods": counts,
+                "final_revenue": grouped["Revenue: Total_last"].to_numpy(),
+                "final_profit": grouped["Profit_last"].to_numpy(),
+                "final_roi_pct": grouped["ROI %_last"].to_numpy(),
+                "cumulative_revenue": grouped["Revenue: Total_sum"].to_numpy(),
+                "cumulative_profit": grouped["Profit_sum"].to_numpy(),
+                "payback_month": payback_months,
+            })
+            self._offsets = offsets
+            self._positions = {name: i for i, name in enumerate(names)}
+        return self._summary
+
+    def frame(self, name):
+        """Wide DataFrame of one scenario; only its rows are copied out of the map"""
+        self.summary()
+        i = self._positions[name]
+        start, end = self._offsets[i], self._offsets[i + 1]
+        frame = self.table.slice(start, end - start).drop_columns([SCENARIO_COLUMN]).to_pandas()
+        if self.by_scenario:
+            # Back to the scenario's own period label, as in the app's wide frames
+            label = GRANULARITIES[frame[GRANULARITY_COLUMN].iat[0]][1]
+            frame = frame.drop(columns=GRANULARITY_COLUMN).rename(columns=lambda c: c.replace(PERIOD_COLUMN, label))
+        return frame
+
+    def close(self):
+        self._source.close()
+
+
+def list_sweeps(directory):
+    """Sweep files (by SWEEP_SUFFIXES) in directory, newest first; [] if it does not exist"""
+    if not os.path.isdir(directory):
+        return []
+    paths = [os.path.join(directory, f) for f in os.listdir(directory) if f.lower().endswith(SWEEP_SUFFIXES)]
+    return sorted(paths, key=os.path.getmtime, reverse=True)
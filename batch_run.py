@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Batch runner for the AI Enterprise Integration financial model
+
+Reads scenarios from a CSV or Parquet file (one row per scenario, columns named
+after the model parameters; missing columns fall back to AI_ENTERPRISE_DEFAULTS),
+evaluates them across a process pool and streams results to disk as chunks finish.
+
+    python batch_run.py scenarios.csv -o summary.csv
+    python batch_run.py book.parquet -o summary.parquet --series-output series.parquet --workers 8
+    python batch_run.py scenarios.csv --months 120 --granularity weekly
+    python batch_run.py book.csv -o summary.csv --series-output sweeps/book.arrow   # memory-mappable series
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from financial_engine import (
+    MONTHS, MAX_HORIZON_MONTHS, GRANULARITIES, AI_ENTERPRISE_DEFAULTS, AI_ENTERPRISE_PARAMS,
+    generate_ai_enterprise_financials_batch, batch_stacked_frame, horizon_periods, summarize_batch,
+)
+
+SCENARIO_COLUMN = "scenario"
+SERIES_ARROW_SUFFIXES = (".arrow", ".feather")
+
+
+def read_scenarios(path, chunk_size):
+    """Yield scenario tables of at most chunk_size rows from CSV or Parquet"""
+    if path.lower().endswith((".parquet", ".pq")):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            sys.exit("❌ Reading Parquet requires pyarrow: pip install pyarrow")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+def prepare_chunk(chunk, first_row):
+    """Fill defaults for missing parameters and make sure every row has a scenario name"""
+    chunk = chunk.reset_index(drop=True)
+    for name in AI_ENTERPRISE_PARAMS:
+        if name not in chunk:
+            chunk[name] = AI_ENTERPRISE_DEFAULTS[name]
+        else:
+            chunk[name] = chunk[name].fillna(AI_ENTERPRISE_DEFAULTS[name])
+    if SCENARIO_COLUMN not in chunk:
+        chunk[SCENARIO_COLUMN] = [f"scenario_{first_row + i + 1}" for i in range(len(chunk))]
+    return chunk[[SCENARIO_COLUMN] + AI_ENTERPRISE_PARAMS]
+
+
+def evaluate_chunk(periods, granularity, chunk, with_series, exact_series=False):
+    """Worker: evaluate one scenario table in a single vectorized pass.
+
+    exact_series keeps the series amounts unrounded (sweep files read by arrow_io.SweepFile).
+    """
+    batch = generate_ai_enterprise_financials_batch(periods, chunk, granularity=granularity)
+    summary = pd.DataFrame({SCENARIO_COLUMN: chunk[SCENARIO_COLUMN].to_numpy(), **summarize_batch(batch)})
+    series = None
+    if with_series:
+        series = batch_stacked_frame(batch, chunk[SCENARIO_COLUMN], rounded=not exact_series)
+    return summary, series
+
+
+def output_schemas(periods, granularity, with_series, exact_series=False):
+    """Arrow schemas of the (summary, series) outputs, series None unless with_series.
+
+    Taken from a reference run of the defaults with every parameter as float64, the
+    widest type an input column can have; an int chunk casts to it losslessly.
+    """
+    import pyarrow as pa
+    reference = pd.DataFrame([AI_ENTERPRISE_DEFAULTS], dtype="float64")
+    summary, series = evaluate_chunk(periods, granularity, prepare_chunk(reference, 0), with_series, exact_series)
+    summary[SCENARIO_COLUMN] = summary[SCENARIO_COLUMN].astype(str)
+    return (pa.Schema.from_pandas(summary, preserve_index=False),
+            None if series is None else pa.Schema.from_pandas(series, preserve_index=False))
+
+
+class StreamWriter:
+    """Append DataFrames to a CSV, Parquet or Arrow IPC (.arrow/.feather) file chunk by chunk.
+
+    metadata (bytes -> bytes) is added to the Parquet/Arrow schema, e.g. the sweep
+    layout that lets arrow_io.SweepFile read a series file back. Every chunk is cast
+    to `schema` (a pyarrow.Schema, see output_schemas), so a chunk whose columns pandas
+    happened to infer as int cannot fix the file schema; without one the first chunk's is used.
+    """
+
+    def __init__(self, path, metadata=None, schema=None):
+        self.path = path
+        lower = path.lower()
+        self.kind = "parquet" if lower.endswith((".parquet", ".pq")) else "arrow" if lower.endswith(SERIES_ARROW_SUFFIXES) else "csv"
+        self.metadata = metadata
+        self.schema = schema
+        self._writer = None
+        self._wrote_csv = False
+
+    def write(self, df):
+        if self._writer is None and not self._wrote_csv:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if self.kind == "csv":
+            df.to_csv(self.path, mode="a" if self._wrote_csv else "w", header=not self._wrote_csv, index=False)
+            self._wrote_csv = True
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self._writer is None:
+            schema = self.schema or table.schema
+            self.schema = schema.with_metadata({**(schema.metadata or {}), **(self.metadata or {})})
+            self._writer = pq.ParquetWriter(self.path, self.schema) if self.kind == "parquet" else pa.ipc.new_file(self.path, self.schema)
+        self._writer.write_table(table.select(self.schema.names).cast(self.schema))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def print_summary(summary):
+    for row in summary.itertuples(index=False):
+        print(f"{row.scenario}: revenue ${row.final_revenue:,.0f} • profit ${row.final_profit:,.0f} • "
+              f"ROI {row.final_roi_pct:.1f}% • cumulative profit ${row.cumulative_profit:,.0f}")
+
+
+def run_batch(args):
+    """Evaluate all scenarios, keeping at most two chunks per worker in flight"""
+    periods = horizon_periods(args.months, args.granularity)
+    summary_writer = StreamWriter(args.output)
+    series_writer = None
+    if args.series_output:
+        metadata = None
+        if args.series_output.lower().endswith(SERIES_ARROW_SUFFIXES):
+            from arrow_io import sweep_metadata
+            metadata = sweep_metadata(periods, args.granularity)
+        series_writer = StreamWriter(args.series_output, metadata)
+    if summary_writer.kind != "csv" or (series_writer is not None and series_writer.kind != "csv"):
+        summary_writer.schema, series_schema = output_schemas(periods, args.granularity, series_writer is not None,
+                                                              series_writer is not None and series_writer.kind == "arrow")
+        if series_writer is not None:
+            series_writer.schema = series_schema
+    in_flight = deque()
+    total = 0
+    started = time.perf_counter()
+
+    def drain(future):
+        nonlocal total
+        summary, series = future.result()
+        summary_writer.write(summary)
+        if series_writer is not None:
+            series_writer.write(series)
+        if not args.quiet:
+            print_summary(summary)
+        total += len(summary)
+
+    workers = args.workers or os.cpu_count() or 1
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            first_row = 0
+            for chunk in read_scenarios(args.input, args.chunk_size):
+                chunk = prepare_chunk(chunk, first_row)
+                first_row += len(chunk)
+                in_flight.append(pool.submit(evaluate_chunk, periods, args.granularity, chunk, series_writer is not None,
+                                             series_writer is not None and series_writer.kind == "arrow"))
+                while len(in_flight) >= 2 * workers:
+                    drain(in_flight.popleft())
+            while in_flight:
+                drain(in_flight.popleft())
+    finally:
+        summary_writer.close()
+        if series_writer is not None:
+            series_writer.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ {total:,} scenarios in {elapsed:.2f}s ({total / elapsed if elapsed else 0:,.0f} scenarios/sec) → {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate AI enterprise scenarios in batch")
+    parser.add_argument("input", help="CSV or Parquet file with one scenario per row")
+    parser.add_argument("-o", "--output", default="scenario_summary.csv", help="summary output (.csv or .parquet)")
+    parser.add_argument("--series-output", help="also write full per-period series (.csv, .parquet or .arrow/.feather)")
+    parser.add_argument("--months", type=int, default=MONTHS, help=f"forecast horizon in months (default {MONTHS})")
+    parser.add_argument("--granularity", choices=list(GRANULARITIES), default="monthly", help="period length (default monthly)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="scenarios per worker task")
+    parser.add_argument("-q", "--quiet", action="store_true", help="do not print per-scenario summaries")
+    args = parser.parse_args()
+
+    if not 1 <= args.months <= MAX_HORIZON_MONTHS:
+        parser.error(f"--months must be between 1 and {MAX_HORIZON_MONTHS}")
+    if not os.path.exists(args.input):
+        print(f"❌ {args.input} not found!")
+        sys.exit(1)
+    run_batch(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Headless benchmark suite for the AI Enterprise Integration financial model
+
+Times the model, table, export and comparison paths across scenario counts and
+horizons, records peak Python-heap memory (tracemalloc, which includes NumPy
+buffers) and compares the run against a stored baseline. A benchmark that gets
+slower or hungrier than the baseline allows fails the comparison (exit code 1).
+No Streamlit and no network access needed.
+
+    python benchmark.py                  # full sweep, compared to benchmark_baseline.json
+    python benchmark.py --quick          # 1/100 scenarios x 36/120 months only
+    python benchmark.py --only engine_batch,styler
+    python benchmark.py --save-baseline  # record this machine's numbers as the baseline
+"""
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from financial_engine import (
+    AI_ENTERPRISE_DEFAULTS, AI_ENTERPRISE_PARAMS, PARAMETER_BOUNDS, TABLE_FORMATS, ModelMemo,
+    batch_stacked_frame, compact_financials, generate_ai_enterprise_financials,
+    generate_ai_enterprise_financials_batch, summarize_scenarios,
+)
+from export_pipeline import write_excel
+from model_derivatives import model_derivatives, summary_gradients
+from table_view import table_page
+
+SCENARIO_COUNTS = (1, 100, 10_000)
+HORIZONS = (36, 120, 600)
+QUICK_SCENARIO_COUNTS = (1, 100)
+QUICK_HORIZONS = (36, 120)
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+# Benchmarks that materialize per-row DataFrames or loop in Python stop at these sizes
+MAX_LOOP_SCENARIOS = 100
+MAX_FRAME_ROWS = 2_000_000
+
+# Differences below these floors are treated as noise, whatever the ratio
+MIN_TIME_DELTA = 0.005
+MIN_MEMORY_DELTA = 1024 * 1024
+
+COMPARISON_REVENUE_COLUMNS = ["Rev: AI Implementation Services", "Rev: AI Consulting Services",
+                              "Rev: AI Training Services", "Rev: AI Support Services"]
+COMPARISON_COST_COLUMNS = ["Cost: Sales Commission", "Cost: Marketing Investment", "Cost: Implementation Delivery"]
+
+
+def scenario_table(n, seed=0):
+    """n reproducible scenarios drawn uniformly inside PARAMETER_BOUNDS (first row = defaults)"""
+    rng = np.random.default_rng(seed)
+    table = {}
+    for name in AI_ENTERPRISE_PARAMS:
+        low, high, integer = PARAMETER_BOUNDS[name]
+        values = rng.uniform(low, min(high, 36) if name == "marketing_start_month" else high, n)
+        values[0] = AI_ENTERPRISE_DEFAULTS[name]
+        table[name] = np.rint(values).astype(int) if integer else values
+    return pd.DataFrame(table)
+
+
+def scenario_frames(n, months):
+    """(name, wide DataFrame) for n scenarios, as the app builds them"""
+    params = scenario_table(n)
+    return [(f"Scenario {i + 1}", compact_financials(months, params.iloc[[i]]).to_frame()) for i in range(n)]
+
+
+# ---- Benchmarks: factory(n, months) -> zero-argument callable that does the timed work ----
+
+def bench_engine_single(n, months):
+    rows = scenario_table(n).to_dict("records")
+    return lambda: [generate_ai_enterprise_financials(months, *[row[p] for p in AI_ENTERPRISE_PARAMS]) for row in rows]
+
+
+def bench_engine_batch(n, months):
+    params = scenario_table(n)
+    return lambda: generate_ai_enterprise_financials_batch(months, params)
+
+
+def bench_engine_incremental(n, months):
+    """Slider drags: n single-scenario runs, each changing one input of the previous run, sharing a ModelMemo"""
+    rows = scenario_table(n).to_dict("records")
+    def run():
+        memo = ModelMemo()
+        params = dict(AI_ENTERPRISE_DEFAULTS)
+        for i, row in enumerate(rows):
+            name = AI_ENTERPRISE_PARAMS[i % len(AI_ENTERPRISE_PARAMS)]
+            params[name] = row[name]
+            generate_ai_enterprise_financials_batch(months, params, memo=memo)
+    return run
+
+
+def bench_gradients(n, months):
+    """Partial derivatives of every series and summary metric with respect to every input, one forward pass"""
+    params = scenario_table(n)
+    return lambda: summary_gradients(model_derivatives(months, params))
+
+
+def bench_summary_chunked(n, months):
+    params = scenario_table(n)
+    return lambda: summarize_scenarios(months, params)
+
+
+def bench_dataframe(n, months):
+    batch = generate_ai_enterprise_financials_batch(months, scenario_table(n))
+    names = [f"Scenario {i + 1}" for i in range(n)]
+    return lambda: batch_stacked_frame(batch, names)
+
+
+def bench_styler(n, months):
+    frames = [df for _, df in scenario_frames(n, months)]
+    return lambda: [df.style.format(TABLE_FORMATS).to_html() for df in frames]
+
+
+def bench_table_page(n, months):
+    """Financial Analysis table path: filter, sort and cut one page of the stacked frame"""
+    batch = generate_ai_enterprise_financials_batch(months, scenario_table(n))
+    df = batch_stacked_frame(batch, [f"Scenario {i + 1}" for i in range(n)])
+    return lambda: table_page(df, period_column="Month", period_range=(1, months), filter_column="ROI %", filter_min=0,
+                              sort_by="Profit", descending=True, page=2)
+
+
+def bench_to_excel(n, months):
+    """pandas ExcelWriter + DataFrame.to_excel, one sheet per scenario (the original export)"""
+    frames = scenario_frames(n, months)
+    def run():
+        output = io.BytesIO()
+        with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
+            for name, df in frames:
+                df.to_excel(writer, sheet_name=name[:31], index=False)
+    return run
+
+
+def bench_export_xlsx(n, months):
+    """Streaming constant_memory writer used by the Export tab"""
+    frames = scenario_frames(n, months)
+    return lambda: write_excel(io.BytesIO(), iter(frames))
+
+
+def bench_comparison_concat_melt(n, months):
+    """Original comparison data path: concat every scenario, then melt revenue and cost columns"""
+    frames = scenario_frames(n, months)
+    def run():
+        comp_df = pd.concat([df.assign(Scenario=name) for name, df in frames], ignore_index=True)
+        comp_df.melt(id_vars=["Month", "Scenario"], value_vars=COMPARISON_REVENUE_COLUMNS,
+                     var_name="AI Revenue Stream", value_name="Amount")
+        comp_df.melt(id_vars=["Month", "Scenario"], value_vars=COMPARISON_COST_COLUMNS,
+                     var_name="Cost Type", value_name="Amount")
+    return run
+
+
+def bench_comparison_figures(n, months):
+    """Current comparison path: traces read straight from the wide frames"""
+    from charts import COMPARISON_FIGURES, build_figures
+    frames = dict(scenario_frames(n, months))
+    return lambda: build_figures(COMPARISON_FIGURES, frames, downsample=True)
+
+
+def _plotly_available():
+    try:
+        import plotly  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+# name -> (factory, applies(n, months))
+BENCHMARKS = {
+    "engine_single": (bench_engine_single, lambda n, m: n <= MAX_LOOP_SCENARIOS),
+    "engine_batch": (bench_engine_batch, lambda n, m: True),
+    "engine_incremental": (bench_engine_incremental, lambda n, m: n <= MAX_LOOP_SCENARIOS),
+    "gradients": (bench_gradients, lambda n, m: n <= MAX_LOOP_SCENARIOS),
+    "summary_chunked": (bench_summary_chunked, lambda n, m: True),
+    "dataframe": (bench_dataframe, lambda n, m: n * m <= MAX_FRAME_ROWS),
+    "styler": (bench_styler, lambda n, m: n == 1),
+    "table_page": (bench_table_page, lambda n, m: n * m <= MAX_FRAME_ROWS),
+    "to_excel": (bench_to_excel, lambda n, m: n <= MAX_LOOP_SCENARIOS),
+    "export_xlsx": (bench_export_xlsx, lambda n, m: n <= MAX_LOOP_SCENARIOS),
+    "comparison_concat_melt": (bench_comparison_concat_melt, lambda n, m: n <= MAX_LOOP_SCENARIOS),
+    "comparison_figures": (bench_comparison_figures, lambda n, m: n <= MAX_LOOP_SCENARIOS and _plotly_available()),
+}
+
+
+def time_call(fn, min_time=0.5, max_repeats=20):
+    """Best wall time over repeats, stopping once min_time has been spent.
+
+    Calls under a second get an untimed warm-up first (lazy imports, caches).
+    """
+    started = time.perf_counter()
+    fn()
+    first = time.perf_counter() - started
+    if first >= 1.0:
+        return first, 1
+    times = []
+    while len(times) < max_repeats and (not times or sum(times) < min_time):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return min(times), len(times)
+
+
+def peak_memory(fn):
+    """Peak traced allocation (bytes) during one call"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmarks(names, counts, horizons, quiet=False):
+    results = {}
+    for name in names:
+        factory, applies = BENCHMARKS[name]
+        for n in counts:
+            for months in horizons:
+                if not applies(n, months):
+                    continue
+                fn = factory(n, months)
+                seconds, repeats = time_call(fn)
+                peak = peak_memory(fn)
+                key = f"{name}|{n}|{months}"
+                results[key] = {"seconds": seconds, "peak_bytes": peak, "repeats": repeats}
+                if not quiet:
+                    print(f"{name:24} {n:>7,} x {months:>4} mo  {seconds * 1000:10.2f} ms  {peak / 1024**2:9.1f} MB peak")
+    return results
+
+
+def compare(results, baseline, time_tolerance, memory_tolerance):
+    """Regressions against the baseline as (key, what, current, baseline) tuples"""
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if (current["seconds"] > base["seconds"] * (1 + time_tolerance)
+                and current["seconds"] - base["seconds"] > MIN_TIME_DELTA):
+            regressions.append((key, "time", current["seconds"], base["seconds"]))
+        if (current["peak_bytes"] > base["peak_bytes"] * (1 + memory_tolerance)
+                and current["peak_bytes"] - base["peak_bytes"] > MIN_MEMORY_DELTA):
+            regressions.append((key, "memory", current["peak_bytes"], base["peak_bytes"]))
+    return regressions
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the financial model, export and comparison paths")
+    parser.add_argument("--quick", action="store_true", help="small sweep (1/100 scenarios, 36/120 months)")
+    parser.add_argument("--only", help="comma-separated benchmark names: " + ", ".join(BENCHMARKS))
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="write this run as the new baseline")
+    parser.add_argument("-o", "--output", help="also write this run's results to a JSON file")
+    parser.add_argument("--time-tolerance", type=float, default=1.0, help="allowed slowdown vs baseline (1.0 = 2x)")
+    parser.add_argument("--memory-tolerance", type=float, default=0.25, help="allowed peak-memory growth vs baseline")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only print the comparison")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+    counts, horizons = (QUICK_SCENARIO_COUNTS, QUICK_HORIZONS) if args.quick else (SCENARIO_COUNTS, HORIZONS)
+
+    started = time.perf_counter()
+    results = run_benchmarks(names, counts, horizons, args.quiet)
+    report = {"environment": environment(), "results": results}
+    print(f"✅ {len(results)} benchmarks in {time.perf_counter() - started:.1f}s")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.save_baseline:
+        baseline = {"environment": report["environment"], "results": {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        # Merge so a --quick or --only run refreshes just the entries it measured
+        baseline["environment"] = report["environment"]
+        baseline["results"].update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"💾 Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"⚠️ No baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline["results"], args.time_tolerance, args.memory_tolerance)
+    compared = sum(key in baseline["results"] for key in results)
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) against {args.baseline} ({compared} compared):")
+        for key, what, current, base in regressions:
+            if what == "time":
+                print(f"   {key}: {current * 1000:.2f} ms vs {base * 1000:.2f} ms baseline ({current / base:.2f}x)")
+            else:
+                print(f"   {key}: {current / 1024**2:.1f} MB vs {base / 1024**2:.1f} MB baseline ({current / base:.2f}x)")
+        sys.exit(1)
+    print(f"✅ No regressions against {args.baseline} ({compared} compared)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+Plotly figure builders for the dashboard and scenario comparison
+
+Traces adapt to the amount of data: markers are dropped on long series, WebGL
+(Scattergl) is used once a figure carries many points, and series can be
+min/max downsampled. Builders are plain functions of DataFrames so the app can
+memoize them on a hash of the data.
+"""
+import hashlib
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.colors import qualitative
+
+MARKER_POINT_THRESHOLD = 120     # points per trace above which markers are dropped
+WEBGL_POINT_THRESHOLD = 2000     # points per figure above which line traces use Scattergl
+DOWNSAMPLE_MAX_POINTS = 1000     # points per trace kept when downsampling is on
+
+REVENUE_COLUMNS = ["Rev: AI Implementation Services", "Rev: AI Consulting Services", "Rev: AI Training Services", "Rev: AI Support Services"]
+COST_COLUMNS = ["Cost: Sales Commission", "Cost: Marketing Investment", "Cost: Implementation Delivery"]
+
+# Cleaner legend names for AI services and costs
+LEGEND_NAMES = {
+    "Rev: AI Implementation Services": "AI Implementation Projects",
+    "Rev: AI Consulting Services": "AI Consulting Services",
+    "Rev: AI Training Services": "AI Training Programs",
+    "Rev: AI Support Services": "AI Support & Maintenance",
+    "Cost: Sales Commission": "Sales Team Commission",
+    "Cost: Marketing Investment": "Growth Marketing Investment",
+    "Cost: Implementation Delivery": "AI Implementation Delivery Costs",
+}
+
+STREAM_COLORS = ["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728"]  # Blue, Orange, Green, Red
+LINE_DASHES = ["solid", "dash", "dot", "dashdot"]
+
+HORIZONTAL_LEGEND = dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5)
+MARGIN = dict(l=10, r=10, t=30, b=10)
+
+
+def period_column(df):
+    """The period index column ("Month" or "Week"), always first in the wide layout"""
+    return df.columns[0]
+
+
+def comparison_axis_title(frames):
+    """Shared period label of the compared frames, or "Period" when granularities differ"""
+    labels = {period_column(df) for df in frames.values()}
+    return labels.pop() if len(labels) == 1 else "Period"
+
+
+def frame_fingerprint(*frames):
+    """Stable hash of DataFrame contents, used as a figure cache key"""
+    digest = hashlib.blake2b(digest_size=16)
+    for df in frames:
+        digest.update(",".join(map(str, df.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def downsample_minmax(x, y, max_points):
+    """Keep the first point plus the min and max of each bucket so peaks survive"""
+    x, y = np.asarray(x), np.asarray(y)
+    if len(y) <= max_points:
+        return x, y
+    buckets = max(max_points // 2, 1)
+    size = -(-len(y) // buckets)
+    # Pad with the last value so every bucket has `size` points, then pick each bucket's extremes
+    padded = np.pad(y, (0, size * buckets - len(y)), mode="edge").reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    keep = np.concatenate([[0, len(y) - 1], offsets + padded.argmin(axis=1), offsets + padded.argmax(axis=1)])
+    keep = np.unique(np.minimum(keep, len(y) - 1))
+    return x[keep], y[keep]
+
+
+def downsample_mean(x, columns, max_points):
+    """Bucket consecutive points into at most max_points buckets: each bucket's first x and
+    the mean of every column over it. All columns share the buckets, so stacked bars still add up"""
+    x = np.asarray(x)
+    if len(x) <= max_points:
+        return x, [np.asarray(c) for c in columns]
+    size = -(-len(x) // max_points)
+    starts = np.arange(0, len(x), size)
+    counts = np.diff(np.append(starts, len(x)))
+    return x[starts], [np.add.reduceat(np.asarray(c, dtype=float), starts) / counts for c in columns]
+
+
+class TraceStyle:
+    """Trace settings shared by every line in one figure, chosen from its total point count"""
+
+    def __init__(self, points_per_trace, n_traces, downsample=False):
+        if downsample:
+            points_per_trace = min(points_per_trace, DOWNSAMPLE_MAX_POINTS)
+        self.downsample = downsample
+        self.markers = points_per_trace <= MARKER_POINT_THRESHOLD
+        self.scatter = go.Scattergl if points_per_trace * n_traces > WEBGL_POINT_THRESHOLD else go.Scatter
+
+    def line(self, x, y, name, line=None, marker=None, **kwargs):
+        if self.downsample:
+            x, y = downsample_minmax(x, y, DOWNSAMPLE_MAX_POINTS)
+        trace = dict(x=x, y=y, name=name, mode="lines+markers" if self.markers else "lines", line=line, **kwargs)
+        if self.markers and marker is not None:
+            trace["marker"] = marker
+        return self.scatter(**trace)
+
+
+def revenue_costs_figure(df, downsample=False):
+    x = period_column(df)
+    style = TraceStyle(len(df), 2, downsample)
+    fig = go.Figure()
+    fig.add_trace(style.line(df[x], df["Revenue: Total"], "Total Revenue", line=dict(width=3)))
+    fig.add_trace(style.line(df[x], df["Costs: Total"], "Total Costs", line=dict(width=3)))
+    fig.update_layout(height=350, margin=MARGIN, xaxis_title=x, yaxis_title="Amount ($)", legend=HORIZONTAL_LEGEND)
+    return fig
+
+
+def profit_figure(df, downsample=False):
+    x = period_column(df)
+    style = TraceStyle(len(df), 1, downsample)
+    fig = go.Figure(style.line(df[x], df["Profit"], "Profit"))
+    fig.update_layout(height=320, margin=MARGIN, xaxis_title=x, yaxis_title="Profit ($)")
+    return fig
+
+
+def roi_figure(df, downsample=False):
+    x = period_column(df)
+    style = TraceStyle(len(df), 1, downsample)
+    fig = go.Figure(style.line(df[x], df["ROI %"], "ROI %"))
+    fig.update_layout(height=320, margin=MARGIN, xaxis_title=x, yaxis_title="ROI (%)")
+    return fig
+
+
+def revenue_stack_figure(df, downsample=False):
+    # Min/max picks different periods per stream, which would misalign the stack, so bars
+    # are downsampled by averaging each stream over the same buckets instead
+    x = period_column(df)
+    periods, streams = df[x], [df[col] for col in REVENUE_COLUMNS]
+    if downsample:
+        periods, streams = downsample_mean(periods, streams, DOWNSAMPLE_MAX_POINTS)
+    fig = go.Figure()
+    for col, values in zip(REVENUE_COLUMNS, streams):
+        fig.add_trace(go.Bar(x=periods, y=values, name=LEGEND_NAMES[col]))
+    averaged = len(periods) < len(df)
+    fig.update_layout(barmode="stack", height=380, margin=MARGIN, xaxis_title=x,
+                      yaxis_title=f"Revenue ($, average per {x.lower()})" if averaged else "Revenue ($)",
+                      legend=HORIZONTAL_LEGEND, bargap=0 if len(periods) > MARKER_POINT_THRESHOLD else None)
+    return fig
+
+
+def revenue_streams_figure(df, downsample=False):
+    x = period_column(df)
+    style = TraceStyle(len(df), len(REVENUE_COLUMNS), downsample)
+    fig = go.Figure()
+    for i, col in enumerate(REVENUE_COLUMNS):
+        fig.add_trace(style.line(df[x], df[col], LEGEND_NAMES[col],
+                                 line=dict(width=3, color=STREAM_COLORS[i], dash=LINE_DASHES[i]),
+                                 marker=dict(size=6, color=STREAM_COLORS[i])))
+    fig.update_layout(height=400, margin=MARGIN, xaxis_title=x, yaxis_title="Revenue ($)",
+                      legend=HORIZONTAL_LEGEND, hovermode="x unified")
+    return fig
+
+
+def cost_structure_figure(df, downsample=False):
+    x = period_column(df)
+    style = TraceStyle(len(df), len(COST_COLUMNS), downsample)
+    fig = go.Figure()
+    for col in COST_COLUMNS:
+        fig.add_trace(style.line(df[x], df[col], LEGEND_NAMES[col], line=dict(width=3), marker=dict(size=6)))
+    fig.update_layout(height=350, margin=MARGIN, xaxis_title=x, yaxis_title="Cost ($)", legend=HORIZONTAL_LEGEND)
+    return fig
+
+
+def cumulative_cash_figure(df, downsample=False):
+    x = period_column(df)
+    style = TraceStyle(len(df), 1, downsample)
+    fig = go.Figure(style.line(df[x], df["Cumulative Cash ($)"], "Cumulative Cash", line=dict(width=3, color=STREAM_COLORS[2])))
+    fig.add_hline(y=0, line=dict(color="grey", dash="dot"))
+    fig.update_layout(height=320, margin=MARGIN, xaxis_title=x, yaxis_title="Cumulative Cash ($)")
+    return fig
+
+
+def client_cohorts_figure(labels, matrix, period_label, downsample=False):
+    """Active clients stacked by acquisition cohort; matrix is cohorts x periods"""
+    x = np.arange(1, matrix.shape[1] + 1)
+    if downsample and len(x) > DOWNSAMPLE_MAX_POINTS:
+        # Stacked areas need one shared x, so every cohort keeps the same evenly spaced periods
+        keep = np.unique(np.r_[np.linspace(0, len(x) - 1, DOWNSAMPLE_MAX_POINTS).astype(int), len(x) - 1])
+        x, matrix = x[keep], matrix[:, keep]
+    fig = go.Figure()
+    for label, clients in zip(labels, matrix):
+        fig.add_trace(go.Scatter(x=x, y=clients.round(2), name=label, mode="lines", line=dict(width=0.5), stackgroup="clients"))
+    fig.update_layout(height=380, margin=MARGIN, xaxis_title=period_label, yaxis_title="Active Clients",
+                      legend=HORIZONTAL_LEGEND, hovermode="x unified")
+    return fig
+
+
+# Executive Dashboard figures in display order
+DASHBOARD_FIGURES = {
+    "revenue_costs": revenue_costs_figure,
+    "profit": profit_figure,
+    "roi": roi_figure,
+    "revenue_stack": revenue_stack_figure,
+    "revenue_streams": revenue_streams_figure,
+    "cost_structure": cost_structure_figure,
+    "cumulative_cash": cumulative_cash_figure,
+}
+
+# Client cohort view, built from client_cohort_matrix rather than the wide frame
+COHORT_FIGURES = {"client_cohorts": client_cohorts_figure}
+
+
+def comparison_metric_figure(frames, column, yaxis_title, height=350, downsample=False):
+    """One line per scenario for a single column; frames maps scenario name -> DataFrame"""
+    style = TraceStyle(max((len(df) for df in frames.values()), default=0), len(frames), downsample)
+    x = comparison_axis_title(frames)
+    fig = go.Figure()
+    for i, (name, df) in enumerate(frames.items()):
+        color = qualitative.Plotly[i % len(qualitative.Plotly)]
+        fig.add_trace(style.line(df[period_column(df)], df[column], name, line=dict(color=color), marker=dict(color=color)))
+    fig.update_layout(height=height, margin=MARGIN, xaxis_title=x, yaxis_title=yaxis_title)
+    return fig
+
+
+def comparison_breakdown_figure(frames, columns, yaxis_title, height=380, downsample=False):
+    """Color per scenario, dash per column, read straight from the wide frames (no melt)"""
+    style = TraceStyle(max((len(df) for df in frames.values()), default=0), len(frames) * len(columns), downsample)
+    x = comparison_axis_title(frames)
+    fig = go.Figure()
+    for i, (name, df) in enumerate(frames.items()):
+        color = qualitative.Plotly[i % len(qualitative.Plotly)]
+        for j, col in enumerate(columns):
+            fig.add_trace(style.line(df[period_column(df)], df[col], f"{name}, {LEGEND_NAMES.get(col, col)}",
+                                     line=dict(color=color, dash=LINE_DASHES[j % len(LINE_DASHES)]),
+                                     marker=dict(color=color), legendgroup=name))
+    fig.update_layout(height=height, margin=MARGIN, xaxis_title=x, yaxis_title=yaxis_title)
+    return fig
+
+
+# Scenario Comparison figures in display order: name -> builder(frames, downsample)
+COMPARISON_FIGURES = {
+    "profit": lambda frames, downsample=False: comparison_metric_figure(frames, "Profit", "Profit ($)", 350, downsample),
+    "roi": lambda frames, downsample=False: comparison_metric_figure(frames, "ROI %", "ROI (%)", 350, downsample),
+    "revenue_streams": lambda frames, downsample=False: comparison_breakdown_figure(frames, REVENUE_COLUMNS, "Revenue ($)", 380, downsample),
+    "costs": lambda frames, downsample=False: comparison_breakdown_figure(frames, COST_COLUMNS, "Cost ($)", 360, downsample),
+    "cumulative_cash": lambda frames, downsample=False: comparison_metric_figure(frames, "Cumulative Cash ($)", "Cumulative Cash ($)", 350, downsample),
+}
+
+
+def ranking_figure(summary, metric, label, top=30):
+    """Horizontal bars for the first `top` rows of an already ranked summary table"""
+    ranked = summary.head(top).iloc[::-1]
+    fig = go.Figure(go.Bar(x=ranked[metric], y=ranked["name"], orientation="h", marker_color=STREAM_COLORS[0]))
+    fig.update_layout(height=max(300, 18 * len(ranked) + 80), margin=MARGIN, xaxis_title=label)
+    return fig
+
+
+def summary_scatter_figure(summary, metric=None, label=None):
+    """Every scenario as one point: final ROI vs cumulative profit, colored by break-even month"""
+    scatter = go.Scattergl if len(summary) > WEBGL_POINT_THRESHOLD else go.Scatter
+    fig = go.Figure(scatter(
+        x=summary["final_roi_pct"], y=summary["cumulative_profit"], mode="markers", text=summary["name"],
+        marker=dict(size=8, color=summary["break_even_month"], colorscale="Viridis_r", showscale=True,
+                    colorbar=dict(title="Break-even month")),
+        hovertemplate="%{text}<br>Final ROI %{x:.1f}%<br>Cumulative profit $%{y:,.0f}<extra></extra>",
+    ))
+    fig.update_layout(height=380, margin=MARGIN, xaxis_title="Final ROI (%)", yaxis_title="Cumulative Profit ($)")
+    return fig
+
+
+def break_even_histogram_figure(summary, metric=None, label=None):
+    """How many scenarios break even in each month"""
+    fig = go.Figure(go.Histogram(x=summary["break_even_month"], marker_color=STREAM_COLORS[2]))
+    fig.update_layout(height=320, margin=MARGIN, xaxis_title="Break-even month", yaxis_title="Scenarios", bargap=0.05)
+    return fig
+
+
+# Aggregate figures over the scenario summary table: name -> builder(summary, metric, label)
+SUMMARY_FIGURES = {
+    "ranking": ranking_figure,
+    "profit_vs_roi": summary_scatter_figure,
+    "break_even": break_even_histogram_figure,
+}
+
+
+def tornado_figure(impact, label, step_pct):
+    """Tornado chart: change in a metric when each input alone moves down or up by step_pct %.
+
+    impact holds the change for +step_pct % per input label, biggest lever first;
+    the first-order change for -step_pct % is its negative.
+    """
+    ranked = impact.iloc[::-1]
+    fig = go.Figure([
+        go.Bar(x=-ranked.to_numpy(), y=ranked.index, orientation="h", name=f"−{step_pct:g}%", marker_color=STREAM_COLORS[3]),
+        go.Bar(x=ranked.to_numpy(), y=ranked.index, orientation="h", name=f"+{step_pct:g}%", marker_color=STREAM_COLORS[2]),
+    ])
+    fig.update_layout(barmode="relative", height=max(300, 28 * len(ranked) + 100), margin=MARGIN,
+                      xaxis_title=f"Change in {label}", legend=HORIZONTAL_LEGEND)
+    return fig
+
+
+def build_figures(builders, *args, **kwargs):
+    """Build every figure and record its build time and JSON payload size.
+
+    Returns name -> {"figure", "build_seconds", "payload_bytes"}.
+    """
+    built = {}
+    for name, builder in builders.items():
+        started = time.perf_counter()
+        fig = builder(*args, **kwargs)
+        elapsed = time.perf_counter() - started
+        built[name] = {"figure": fig, "build_seconds": elapsed, "payload_bytes": len(fig.to_json())}
+    return built
+
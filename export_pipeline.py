@@ -0,0 +1,170 @@
+"""
+Streaming scenario export (Excel, CSV zip, Parquet, Arrow IPC)
+
+Every writer consumes an iterable of (name, DataFrame) pairs one scenario at a
+time and writes straight to a file object, so memory stays flat no matter how
+many scenarios are exported when the frames are produced lazily. An optional
+summary DataFrame (one row per scenario, e.g. NPV, IRR and payback) is written
+alongside: a first "Summary" sheet, a summary.csv member, or Parquet/Arrow schema
+metadata.
+
+The single-table formats (Parquet, Arrow) stack every scenario under one schema,
+so the period label ("Month", "Week") becomes "Period" in the column names and a
+Granularity column records which one each scenario used.
+"""
+import io
+import re
+import zipfile
+
+import pandas as pd
+
+from financial_engine import GRANULARITIES, WIDE_COLUMNS
+
+EXCEL_SHEET_NAME_LIMIT = 31
+PARQUET_ROW_GROUP_ROWS = 16 * 1024
+SUMMARY_NAME = "Summary"
+PARQUET_SUMMARY_KEY = b"scenario_summary"
+PERIOD_COLUMN = "Period"
+GRANULARITY_COLUMN = "Granularity"
+SCENARIO_COLUMN = "Scenario"
+# Period label of the wide layout ("Month", "Week") -> granularity key
+_LABEL_GRANULARITY = {label: granularity for granularity, (_, label) in GRANULARITIES.items()}
+_INVALID_SHEET_CHARS = re.compile(r"[\[\]:*?/\\]")
+
+
+def _unique_names(name, used, limit=None, pattern=None):
+    """Sanitized, de-duplicated sheet/file name"""
+    base = pattern.sub("_", name) if pattern else name
+    base = (base or "Scenario")[:limit] if limit else (base or "Scenario")
+    candidate, n = base, 1
+    while candidate.lower() in used:
+        n += 1
+        suffix = f" ({n})"
+        candidate = (base[:limit - len(suffix)] if limit else base) + suffix
+    used.add(candidate.lower())
+    return candidate
+
+
+def write_excel(fileobj, scenarios, summary=None):
+    """One worksheet per scenario, written row by row in xlsxwriter constant_memory mode"""
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(fileobj, {"constant_memory": True})
+    header = workbook.add_format({"bold": True})
+    used = set()
+    if summary is not None:
+        sheet = workbook.add_worksheet(_unique_names(SUMMARY_NAME, used))
+        sheet.write_row(0, 0, list(summary.columns), header)
+        for r, row in enumerate(summary.itertuples(index=False, name=None), start=1):
+            # Excel has no NaN (e.g. a scenario without an IRR); leave those cells empty
+            sheet.write_row(r, 0, [None if pd.isna(v) else v for v in row])
+    for name, df in scenarios:
+        sheet = workbook.add_worksheet(_unique_names(name, used, EXCEL_SHEET_NAME_LIMIT, _INVALID_SHEET_CHARS))
+        sheet.write_row(0, 0, list(df.columns), header)
+        for r, row in enumerate(df.itertuples(index=False, name=None), start=1):
+            sheet.write_row(r, 0, row)
+        # constant_memory keeps one temp file open per sheet until workbook.close(), so an
+        # export of ~1000 scenarios would exhaust the usual 1024 file descriptors. Closing
+        # each finished sheet's file (xlsxwriter reopens it when assembling) keeps one open.
+        # _opt_close is private; without it the export still works, only fd use grows.
+        if hasattr(sheet, "_opt_close"):
+            sheet._opt_close()
+    workbook.close()
+
+
+def write_csv_zip(fileobj, scenarios, summary=None):
+    """A zip archive holding one CSV per scenario, each streamed into the archive"""
+    used = set()
+    with zipfile.ZipFile(fileobj, "w", zipfile.ZIP_DEFLATED) as archive:
+        if summary is not None:
+            archive.writestr(_unique_names(SUMMARY_NAME.lower(), used) + ".csv", summary.to_csv(index=False))
+        for name, df in scenarios:
+            member = _unique_names(re.sub(r"[^\w\- .()]", "_", name), used) + ".csv"
+            with archive.open(member, "w", force_zip64=True) as raw, io.TextIOWrapper(raw, encoding="utf-8", newline="") as text:
+                df.to_csv(text, index=False)
+
+
+def stacked_frame(name, df):
+    """A scenario's wide frame in the single-table layout: "Period" in place of its
+    period label in every column name, then Granularity and Scenario columns"""
+    label = df.columns[0]
+    if label not in _LABEL_GRANULARITY:
+        raise ValueError(f"scenario {name!r}: the first column must be the period ({', '.join(_LABEL_GRANULARITY)}), not {label!r}")
+    return df.rename(columns=lambda c: c.replace(label, PERIOD_COLUMN)).assign(
+        **{GRANULARITY_COLUMN: _LABEL_GRANULARITY[label], SCENARIO_COLUMN: name})
+
+
+def stacked_schema():
+    """Declared Arrow schema of the stacked_frame layout: Period int64, Granularity and
+    Scenario strings, every other column float64. Each buffered table is cast to it, so
+    the first scenarios' dtypes (e.g. int32 amounts) cannot fix the file schema."""
+    import pyarrow as pa
+
+    columns = [c.replace("Month", PERIOD_COLUMN) for c in WIDE_COLUMNS]
+    return pa.schema([(columns[0], pa.int64())] + [(c, pa.float64()) for c in columns[1:]]
+                     + [(GRANULARITY_COLUMN, pa.string()), (SCENARIO_COLUMN, pa.string())])
+
+
+def _buffered_tables(scenarios, rows, schema):
+    """Arrow tables of about `rows` rows each from (name, DataFrame) pairs, in the stacked_frame layout cast to schema"""
+    import pyarrow as pa
+
+    def table(frames):
+        return pa.Table.from_pandas(pd.concat(frames, ignore_index=True), preserve_index=False).select(schema.names).cast(schema)
+
+    pending, pending_rows = [], 0
+    for name, df in scenarios:
+        pending.append(stacked_frame(name, df))
+        pending_rows += len(df)
+        if pending_rows >= rows:
+            yield table(pending)
+            pending, pending_rows = [], 0
+    if pending:
+        yield table(pending)
+
+
+def _with_summary(schema, summary):
+    if summary is None:
+        return schema
+    return schema.with_metadata({**(schema.metadata or {}), PARQUET_SUMMARY_KEY: summary.to_json(orient="records")})
+
+
+def write_parquet(fileobj, scenarios, summary=None, row_group_rows=PARQUET_ROW_GROUP_ROWS):
+    """A single Parquet file with Granularity and Scenario columns; scenarios are buffered into
+    row groups of about row_group_rows rows so memory stays bounded. The summary
+    is stored as JSON records under the PARQUET_SUMMARY_KEY file metadata key."""
+    import pyarrow.parquet as pq
+
+    schema = stacked_schema()
+    with pq.ParquetWriter(fileobj, _with_summary(schema, summary)) as writer:
+        for table in _buffered_tables(scenarios, row_group_rows, schema):
+            writer.write_table(table)
+
+
+def write_arrow(fileobj, scenarios, summary=None, batch_rows=PARQUET_ROW_GROUP_ROWS):
+    """A single uncompressed Arrow IPC (Feather v2) file with Granularity and Scenario columns, written
+    in record batches of about batch_rows rows. Readers can memory-map it without
+    copying (arrow_io.SweepFile, pyarrow, Polars, DuckDB). The summary is stored under
+    the same schema metadata key as in Parquet."""
+    import pyarrow as pa
+
+    schema = stacked_schema()
+    with pa.ipc.new_file(fileobj, _with_summary(schema, summary)) as writer:
+        for table in _buffered_tables(scenarios, batch_rows, schema):
+            writer.write_table(table)
+
+
+# Format key -> (label, file extension, MIME type, writer)
+EXPORT_FORMATS = {
+    "xlsx": ("Excel workbook (one sheet per scenario)", "xlsx",
+             "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", write_excel),
+    "csv.zip": ("CSV files (zip)", "zip", "application/zip", write_csv_zip),
+    "parquet": ("Parquet (single file, Scenario column)", "parquet", "application/vnd.apache.parquet", write_parquet),
+    "arrow": ("Arrow / Feather (memory-mappable, Scenario column)", "arrow", "application/vnd.apache.arrow.file", write_arrow),
+}
+
+
+def export_scenarios(fileobj, fmt, scenarios, summary=None):
+    """Write scenarios ((name, DataFrame) iterable) to fileobj in the given EXPORT_FORMATS format,
+    plus an optional per-scenario summary DataFrame"""
+    EXPORT_FORMATS[fmt][3](fileobj, scenarios, summary)
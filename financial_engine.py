@@ -0,0 +1,1154 @@
+"""
+AI Enterprise Integration financial engine
+
+Headless model used by the Streamlit app (FFQ.py), the batch CLI (batch_run.py)
+and any other Python caller. Nothing in here imports Streamlit.
+"""
+import inspect
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from result_cache import ResultCache
+
+# =========================================
+# Default settings (can be adjusted in UI)
+# =========================================
+MONTHS = 36                 # default forecast horizon in months
+MAX_HORIZON_MONTHS = 1200   # 100 years
+
+# Period granularity -> (periods per year, period label)
+GRANULARITIES = {"monthly": (12, "Month"), "weekly": (52, "Week")}
+
+# Bumped whenever a model change alters results for the same inputs; stores use it
+# to recompute summaries saved under an older model
+MODEL_VERSION = 2
+
+# Scenario x period cells per engine call in chunked sweeps; long horizons get
+# fewer scenarios per chunk so a chunk's series stay around 8 MB each
+BATCH_CELL_BUDGET = 1_000_000
+
+AI_ENTERPRISE_DEFAULTS = dict(
+    # AI Implementation Services
+    start_ai_implementations=2, end_ai_implementations=15,
+    avg_implementation_value=125000,
+    start_ai_consulting_monthly=25000, end_ai_consulting_monthly=200000,
+    # AI Training & Support
+    num_enterprise_clients=5, start_training_hours=80, end_training_hours=500,
+    training_rate_per_hour=300,
+    start_support_services_monthly=15000, end_support_services_monthly=150000,
+    # Business Operations
+    sales_commission_pct=0.15, marketing_cost_monthly=25000, marketing_start_month=1,
+    # Advanced AI Metrics
+    ai_adoption_acceleration_factor=2.5, enterprise_retention_rate=95.0,
+    # Client cohorts
+    new_client_share=0.05, client_expansion_rate=0.5,
+    # Investment & valuation
+    initial_investment=2000000, discount_rate=10.0,
+)
+
+# One-click scenario presets: complete parameter sets, "balanced" being the defaults
+SCENARIO_PRESETS = {
+    "aggressive": dict(AI_ENTERPRISE_DEFAULTS, start_ai_implementations=2, end_ai_implementations=25,
+                       avg_implementation_value=200000, ai_adoption_acceleration_factor=5.0, marketing_start_month=1),
+    "balanced": dict(AI_ENTERPRISE_DEFAULTS),
+    "conservative": dict(AI_ENTERPRISE_DEFAULTS, start_ai_implementations=1, end_ai_implementations=8,
+                         avg_implementation_value=75000, ai_adoption_acceleration_factor=1.0, marketing_start_month=6),
+}
+
+# Valid range of every model input: name -> (low, high, integer-valued)
+PARAMETER_BOUNDS = {
+    "start_ai_implementations": (0, 50, True),
+    "end_ai_implementations": (0, 100, True),
+    "avg_implementation_value": (10000, 1000000, False),
+    "start_ai_consulting_monthly": (0, 1000000, False),
+    "end_ai_consulting_monthly": (0, 1000000, False),
+    "num_enterprise_clients": (1, 100, True),
+    "start_training_hours": (0, 2000, False),
+    "end_training_hours": (0, 2000, False),
+    "training_rate_per_hour": (100, 1000, False),
+    "start_support_services_monthly": (0, 500000, False),
+    "end_support_services_monthly": (0, 500000, False),
+    "sales_commission_pct": (0.0, 0.5, False),
+    "marketing_cost_monthly": (0, 200000, False),
+    "marketing_start_month": (1, MONTHS, True),
+    "ai_adoption_acceleration_factor": (0.0, 10.0, False),
+    "enterprise_retention_rate": (70.0, 100.0, False),
+    "new_client_share": (0.0, 1.0, False),
+    "client_expansion_rate": (0.0, 10.0, False),
+    "initial_investment": (0, 100000000, False),
+    "discount_rate": (0.0, 50.0, False),
+}
+
+# ===========================================================
+# Core computation (integer-safe), pricing & capacity rules
+# ===========================================================
+# Scenario inputs in the positional order used by generate_ai_enterprise_financials
+AI_ENTERPRISE_PARAMS = [
+    # AI Implementation Services
+    "start_ai_implementations", "end_ai_implementations", "avg_implementation_value",
+    "start_ai_consulting_monthly", "end_ai_consulting_monthly",
+    # AI Training & Support Services
+    "num_enterprise_clients", "start_training_hours", "end_training_hours", "training_rate_per_hour",
+    "start_support_services_monthly", "end_support_services_monthly",
+    # Business Development & Operations
+    "sales_commission_pct", "marketing_cost_monthly", "marketing_start_month",
+    # Advanced AI Metrics
+    "ai_adoption_acceleration_factor", "enterprise_retention_rate",
+    # Client cohorts
+    "new_client_share", "client_expansion_rate",
+    # Investment & valuation
+    "initial_investment", "discount_rate",
+]
+
+# Inputs quoted per month (volumes, monthly revenues, hours, marketing spend);
+# other granularities scale them to per-period amounts
+MONTHLY_RATE_PARAMS = [
+    "start_ai_implementations", "end_ai_implementations",
+    "start_ai_consulting_monthly", "end_ai_consulting_monthly",
+    "start_training_hours", "end_training_hours",
+    "start_support_services_monthly", "end_support_services_monthly",
+    "marketing_cost_monthly",
+]
+
+def horizon_periods(months, granularity="monthly"):
+    """Number of periods covering a horizon of `months` calendar months"""
+    return max(1, round(months * GRANULARITIES[granularity][0] / 12))
+
+def parameter_bounds(horizon_months=MONTHS):
+    """PARAMETER_BOUNDS with marketing_start_month capped at the forecast horizon"""
+    return {**PARAMETER_BOUNDS, "marketing_start_month": (1, horizon_months, True)}
+
+def period_rates(p, granularity):
+    """Model inputs restated per period for the given granularity.
+
+    Ramps run from the start value in the first period to the end value in the
+    last one. Monthly amounts and the adoption acceleration (% per month) are
+    scaled by 12 / periods-per-year so calendar-time growth does not depend on
+    granularity, and marketing starts in the period holding the first day of
+    marketing_start_month. Retention, pricing and commission are unchanged.
+    """
+    per_year = GRANULARITIES[granularity][0]
+    if per_year == 12:
+        return p
+    scale = 12 / per_year
+    rates = dict(p)
+    for name in MONTHLY_RATE_PARAMS + ["ai_adoption_acceleration_factor"]:
+        rates[name] = p[name] * scale
+    rates["marketing_start_month"] = np.floor((p["marketing_start_month"] - 1) / scale) + 1
+    return rates
+
+def normalize_scenario_params(params):
+    """Turn a parameter table into equal-length 1-D arrays keyed by parameter name.
+
+    Accepts a DataFrame, a list of dicts, or a dict of scalars/sequences.
+    Scalars are broadcast against the longest column. Inputs added after a
+    scenario was saved (missing keys or columns) take their default.
+    """
+    default = AI_ENTERPRISE_DEFAULTS
+    if isinstance(params, pd.DataFrame):
+        columns = {name: params[name].to_numpy() if name in params else np.asarray(default[name]) for name in AI_ENTERPRISE_PARAMS}
+    elif isinstance(params, (list, tuple)):
+        columns = {name: np.asarray([row.get(name, default[name]) for row in params]) for name in AI_ENTERPRISE_PARAMS}
+    else:
+        columns = {name: np.asarray(params.get(name, default[name])) for name in AI_ENTERPRISE_PARAMS}
+    n = max(np.size(v) for v in columns.values())
+    return {name: np.ravel(v) if np.size(v) == n else np.broadcast_to(np.ravel(v), (n,)) for name, v in columns.items()}
+
+def linear_ramp(start, end, periods):
+    """Row-wise np.linspace(start[i], end[i], periods) as an N x periods array.
+
+    np.linspace switches formula for the whole batch when any row has a zero step,
+    so the rows are split here to stay bit-identical to the per-scenario call.
+    """
+    start = np.asarray(start, dtype=float)[:, None]
+    end = np.asarray(end, dtype=float)[:, None]
+    if periods <= 1:
+        return np.repeat(start, periods, axis=1)
+    div = periods - 1
+    steps = np.arange(periods, dtype=float)
+    delta = end - start
+    step = delta / div
+    ramp = np.where(step == 0, steps / div * delta, steps * step) + start
+    ramp[:, -1] = end[:, 0]
+    return ramp
+
+# Cohort sums run over blocks short enough that factor ** block stays within
+# exp(+-COHORT_LOG_RANGE); per-period survival below MIN_PERIOD_RETENTION is
+# treated as that floor so blocks stay at least 65 periods long
+COHORT_LOG_RANGE = 600.0
+MIN_PERIOD_RETENTION = 1e-4
+
+# Retained clients' usage expands to at most this multiple of their first-period
+# level (applied to the portfolio average), so compounding stays finite on long horizons
+CLIENT_EXPANSION_CAP = 10.0
+
+def cohort_decay_sum(inflow, factor):
+    """Row-wise out[:, t] = sum over c <= t of inflow[:, c] * factor ** (t - c).
+
+    This is the cohort x period matrix (cohort c joins in period c and scales by
+    factor every period after) summed over cohorts, i.e. inflow times the
+    upper-triangular Toeplitz matrix of powers of factor. It is evaluated as a
+    rescaled cumulative sum, block by block, so no periods x periods matrix is
+    built and the cost is O(N x periods) for any number of cohorts. inflow is
+    N x periods and factor has one positive value per row.
+    """
+    inflow = np.asarray(inflow, dtype=float)
+    factor = np.maximum(np.asarray(factor, dtype=float), MIN_PERIOD_RETENTION)[:, None]
+    if len(factor) > 1 and (factor == factor[0]).all():
+        # One shared factor (single runs, most sweeps): one row of powers broadcasts to all
+        factor = factor[:1]
+    out = np.empty_like(inflow)
+    # Typical retention fits the whole horizon in one block
+    steepest = np.abs(np.log(factor)).max(initial=0.0)
+    block = inflow.shape[1] if steepest == 0 else max(int(COHORT_LOG_RANGE / steepest), 1)
+    powers = factor ** np.arange(min(block, inflow.shape[1]) + 1)
+    inverse = 1 / powers[:, :-1]
+    for start in range(0, inflow.shape[1], block):
+        width = min(block, inflow.shape[1] - start)
+        # Within the block: factor**k * cumsum(x_j / factor**j), plus the carried total decayed k + 1 times
+        chunk = out[:, start:start + width]
+        np.multiply(inflow[:, start:start + width], inverse[:, :width], out=chunk)
+        np.cumsum(chunk, axis=1, out=chunk)
+        chunk *= powers[:, :width]
+        if start:
+            chunk += out[:, start - 1:start] * powers[:, 1:width + 1]
+    return out
+
+def client_acquisitions(implementations, p):
+    """Clients joining each period: the initial portfolio in period 1 plus the share of
+    implementation projects that land a new client (N x periods, like implementations)"""
+    inflow = implementations * np.asarray(p["new_client_share"], dtype=float).reshape(-1, 1)
+    inflow[:, 0] += p["num_enterprise_clients"]
+    return inflow
+
+def client_retention_factor(retention_rate_pct, granularity="monthly"):
+    """Share of clients kept per period, from the monthly retention rate (%)"""
+    return (np.asarray(retention_rate_pct, dtype=float) / 100) ** (12 / GRANULARITIES[granularity][0])
+
+def client_expansion_factor(expansion_rate_pct, granularity="monthly"):
+    """Per-period usage growth of a retained client, from the monthly expansion rate (%)"""
+    return (1 + np.asarray(expansion_rate_pct, dtype=float) / 100) ** (12 / GRANULARITIES[granularity][0])
+
+def client_cohort_rates(p, granularity="monthly"):
+    """Per-period retention (clients kept) and expansion (usage growth per client) factors"""
+    return (client_retention_factor(p["enterprise_retention_rate"], granularity),
+            client_expansion_factor(p["client_expansion_rate"], granularity))
+
+# ===========================================================
+# Model dependency graph
+# ===========================================================
+# name -> (function, argument names, model inputs it depends on, directly or through other nodes).
+# Arguments are model inputs (per-period rates, one value per scenario), earlier nodes
+# (scenarios x periods, or 1 x periods when shared by every scenario) or the context
+# values below. Nodes are registered in dependency order.
+MODEL_NODES = {}
+MODEL_CONTEXT = ("periods", "idx", "granularity")
+
+def model_node(function):
+    """Register function as the MODEL_NODES node of the same name, reading its arguments by name"""
+    inputs = tuple(inspect.signature(function).parameters)
+    params = set()
+    for name in inputs:
+        if name in MODEL_NODES:
+            params.update(MODEL_NODES[name][2])
+        elif name in AI_ENTERPRISE_DEFAULTS:
+            params.add(name)
+        elif name not in MODEL_CONTEXT:
+            raise ValueError(f"model node {function.__name__} reads unknown input {name}")
+    MODEL_NODES[function.__name__] = (function, inputs, tuple(sorted(params)))
+    return function
+
+# ---- AI Enterprise Integration Financial Model ----
+# Nodes never modify their arguments (shared and memoized results are read-only), only
+# arrays they created; those already span every row the node is evaluated for.
+
+@model_node
+def ai_implementations_per_month(start_ai_implementations, end_ai_implementations, ai_adoption_acceleration_factor,
+                                 periods, idx):
+    # AI Implementation Services (core revenue driver), with AI adoption acceleration (exponential growth factor)
+    ramp = linear_ramp(start_ai_implementations, end_ai_implementations, periods)
+    return ramp * (1 + (idx - 1) * ai_adoption_acceleration_factor[:, None] / 100)
+
+@model_node
+def ai_implementation_revenue(ai_implementations_per_month, avg_implementation_value):
+    return ai_implementations_per_month * avg_implementation_value[:, None]
+
+@model_node
+def ai_consulting_revenue(start_ai_consulting_monthly, end_ai_consulting_monthly, periods):
+    return linear_ramp(start_ai_consulting_monthly, end_ai_consulting_monthly, periods)
+
+# Enterprise client cohorts: the initial portfolio joins in period 1 and a share of
+# implementation projects land new clients. Each cohort shrinks by the retention rate
+# and its per-client usage grows by the expansion rate with every period of tenure.
+@model_node
+def client_inflow(ai_implementations_per_month, new_client_share, num_enterprise_clients):
+    return client_acquisitions(ai_implementations_per_month,
+                               {"new_client_share": new_client_share, "num_enterprise_clients": num_enterprise_clients})
+
+@model_node
+def client_retention(enterprise_retention_rate, granularity):
+    return client_retention_factor(enterprise_retention_rate, granularity)
+
+@model_node
+def client_expansion(client_expansion_rate, granularity):
+    return client_expansion_factor(client_expansion_rate, granularity)
+
+def _cohort_sum(inflow, factor):
+    """cohort_decay_sum with a shared (1-row) inflow or factor broadcast to the other's rows"""
+    rows = max(len(inflow), len(factor))
+    return cohort_decay_sum(np.broadcast_to(inflow, (rows, inflow.shape[1])), np.broadcast_to(factor, (rows,)))
+
+@model_node
+def active_clients(client_inflow, client_retention):
+    return _cohort_sum(client_inflow, client_retention)
+
+@model_node
+def portfolio_usage(client_inflow, client_retention, client_expansion, active_clients, num_enterprise_clients):
+    # Clients weighted by tenure expansion (the initial client count in period 1), in units
+    # of the initial portfolio: the training and support ramps describe that portfolio
+    usage = _cohort_sum(client_inflow, client_retention * client_expansion)
+    np.minimum(usage, CLIENT_EXPANSION_CAP * active_clients, out=usage)
+    usage /= np.maximum(num_enterprise_clients[:, None], 1)
+    return usage
+
+# AI Training & Support Services (recurring revenue, per active client)
+@model_node
+def training_hours_per_month(start_training_hours, end_training_hours, portfolio_usage, periods):
+    hours = linear_ramp(start_training_hours, end_training_hours, periods)
+    hours *= portfolio_usage
+    return hours
+
+@model_node
+def training_revenue(training_hours_per_month, training_rate_per_hour):
+    return training_hours_per_month * training_rate_per_hour[:, None]
+
+@model_node
+def support_services_revenue(start_support_services_monthly, end_support_services_monthly, portfolio_usage, periods):
+    revenue = linear_ramp(start_support_services_monthly, end_support_services_monthly, periods)
+    revenue *= portfolio_usage
+    return revenue
+
+# Round for display
+@model_node
+def ai_implementations_display(ai_implementations_per_month):
+    return np.rint(ai_implementations_per_month).astype(int)
+
+@model_node
+def training_hours_display(training_hours_per_month):
+    return np.rint(training_hours_per_month).astype(int)
+
+# ---- Total AI Enterprise Revenue ----
+@model_node
+def total_revenue(ai_implementation_revenue, ai_consulting_revenue, training_revenue, support_services_revenue):
+    return ai_implementation_revenue + ai_consulting_revenue + training_revenue + support_services_revenue
+
+# ---- AI Enterprise Costs ----
+@model_node
+def sales_commission(total_revenue, sales_commission_pct):
+    # Sales commission (percentage of revenue)
+    return (total_revenue * sales_commission_pct[:, None]).round(0)
+
+@model_node
+def marketing_costs(marketing_cost_monthly, marketing_start_month, idx):
+    # Marketing costs start from specified month (growth investment)
+    return np.where(idx >= marketing_start_month[:, None], np.trunc(marketing_cost_monthly[:, None]), 0.0)
+
+@model_node
+def implementation_costs(ai_implementations_per_month, avg_implementation_value):
+    # AI Implementation delivery costs (25% of implementation revenue)
+    return ai_implementations_per_month * (avg_implementation_value[:, None] * 0.25)
+
+@model_node
+def total_costs(sales_commission, marketing_costs, implementation_costs):
+    return sales_commission + marketing_costs + implementation_costs
+
+@model_node
+def profit(total_revenue, total_costs):
+    return total_revenue - total_costs
+
+@model_node
+def cumulative_cash(profit, initial_investment):
+    # Cash position after the upfront investment (paid at the start of period 1)
+    cash = np.cumsum(np.broadcast_to(profit, (len(initial_investment), profit.shape[1])), axis=1)
+    cash -= initial_investment[:, None]
+    return cash
+
+@model_node
+def roi_pct(profit, total_costs):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(total_costs > 0, profit / total_costs * 100, 0)
+
+@model_node
+def revenue_per_implementation(total_revenue, ai_implementations_display):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(ai_implementations_display > 0, total_revenue / ai_implementations_display, 0)
+
+# Nodes returned in a batch result (the rest are intermediate)
+MODEL_OUTPUTS = [
+    "ai_implementations_per_month", "ai_implementations_display", "active_clients",
+    "training_hours_per_month", "training_hours_display",
+    "ai_implementation_revenue", "ai_consulting_revenue", "training_revenue", "support_services_revenue",
+    "total_revenue", "sales_commission", "marketing_costs", "implementation_costs", "total_costs",
+    "profit", "cumulative_cash", "roi_pct", "revenue_per_implementation",
+]
+
+def _release_schedule():
+    """node -> intermediate nodes no later node reads, so they can be freed once it has run"""
+    last_reader = {}
+    for name, (_, inputs, _) in MODEL_NODES.items():
+        for i in inputs:
+            if i in MODEL_NODES and i not in MODEL_OUTPUTS:
+                last_reader[i] = name
+    schedule = {}
+    for node, reader in last_reader.items():
+        schedule.setdefault(reader, []).append(node)
+    return schedule
+
+MODEL_RELEASES = _release_schedule()
+
+class ModelMemo:
+    """Per-node results of the model graph, reused across evaluations.
+
+    Holds nodes whose inputs were the same for every scenario of an evaluation
+    (all of them for a single scenario), keyed by node, horizon, granularity and
+    the values of just the inputs the node depends on, so changing one input
+    recomputes only the nodes downstream of it. Entries live in a byte-bounded
+    LRU ResultCache; safe to share between threads.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.cache = ResultCache(max_bytes=max_bytes)
+        self._lock = threading.Lock()
+        self._counts = {name: [0, 0, 0.0] for name in MODEL_NODES}
+        # Nodes computed (not found) by the most recent evaluation
+        self.last_recomputed = []
+
+    def lookup(self, name, key):
+        value = self.cache.get(key)
+        with self._lock:
+            self._counts[name][0 if value is not None else 1] += 1
+        return value
+
+    def store(self, name, key, value, seconds):
+        self.cache.put(key, value)
+        with self._lock:
+            self._counts[name][2] += seconds
+
+    def stats(self):
+        """name -> hits, misses and seconds spent computing misses, in graph order"""
+        with self._lock:
+            return {name: {"hits": hits, "misses": misses, "compute_seconds": seconds}
+                    for name, (hits, misses, seconds) in self._counts.items()}
+
+    def clear(self):
+        self.cache.clear()
+        with self._lock:
+            self._counts = {name: [0, 0, 0.0] for name in MODEL_NODES}
+            self.last_recomputed = []
+
+def evaluate_model(periods, p, granularity="monthly", memo=None):
+    """MODEL_OUTPUTS results for normalized parameters p, as name -> read-only array.
+
+    A node whose inputs are the same for every scenario runs once on a single row,
+    which the nodes reading it broadcast, and with a memo is first looked up by the
+    values of those inputs. Only nodes downstream of an input that varies across
+    the scenarios run on every row. Intermediate nodes are dropped as soon as the
+    last node reading them has run.
+    """
+    n = len(p["avg_implementation_value"])
+    rates = period_rates(p, granularity)
+    shared = {name: n <= 1 or bool((v == v[0]).all()) for name, v in p.items()}
+    first_rates = {name: v[:1] for name, v in rates.items()}
+    context = {"periods": periods, "idx": np.arange(1, periods + 1), "granularity": granularity}
+    scalars = {}
+    values = {}
+    recomputed = []
+    for name, (function, inputs, params) in MODEL_NODES.items():
+        constant = n <= 1 or all(shared[q] for q in params)
+        key = value = None
+        if memo is not None and constant and n:
+            for q in params:
+                if q not in scalars:
+                    scalars[q] = p[q][0].item()
+            key = ("model_node", name, periods, granularity) + tuple(scalars[q] for q in params)
+            value = memo.lookup(name, key)
+        if value is None:
+            source = first_rates if constant else rates
+            started = time.perf_counter()
+            value = function(*[values[i] if i in values else source[i] if i in source else context[i] for i in inputs])
+            value.flags.writeable = False
+            if key is not None:
+                memo.store(name, key, value, time.perf_counter() - started)
+            recomputed.append(name)
+        values[name] = value
+        for done in MODEL_RELEASES.get(name, ()):
+            del values[done]
+    if memo is not None:
+        memo.last_recomputed = recomputed
+    return values
+
+def generate_ai_enterprise_financials_batch(periods, params, as_frames=False, granularity="monthly", memo=None):
+    """Evaluate N scenarios in one vectorized pass over the model graph.
+
+    Every series is returned as a read-only N x periods array in a dict, together
+    with the normalized inputs under "params"; series shared by every scenario are
+    broadcast views of one row. Inputs are quoted per month and converted by
+    period_rates for other granularities. memo (a ModelMemo) reuses node results
+    from earlier calls. With as_frames=True a list of per-scenario DataFrames (same
+    layout as generate_ai_enterprise_financials) is returned instead.
+    """
+    p = normalize_scenario_params(params)
+    n = len(p["avg_implementation_value"])
+    values = evaluate_model(periods, p, granularity, memo)
+    batch = {"periods": periods, "granularity": granularity, "params": p}
+    for name in MODEL_OUTPUTS:
+        value = values[name]
+        batch[name] = value if len(value) == n else np.broadcast_to(value, (n, periods))
+    if as_frames:
+        return [batch_scenario_frame(batch, i) for i in range(n)]
+    return batch
+
+# ===========================================================
+# Compact per-scenario results (scalars once, series in one typed block)
+# ===========================================================
+# Wide display layout, in column order: scalar inputs repeated per period and per-period
+# series. Names are the monthly ones; wide_columns() relabels them for other granularities.
+WIDE_COLUMNS = [
+    "Month",
+    "AI Implementations per Month", "Avg Implementation Value ($)", "AI Adoption Acceleration (%)",
+    "Enterprise Clients", "Active Clients", "Training Hours per Month", "Training Rate per Hour ($)", "Enterprise Retention Rate (%)",
+    "Rev: AI Implementation Services", "Rev: AI Consulting Services", "Rev: AI Training Services",
+    "Rev: AI Support Services", "Revenue: Total",
+    "Cost: Sales Commission", "Cost: Marketing Investment", "Cost: Implementation Delivery", "Costs: Total",
+    "Profit", "Cumulative Cash ($)", "ROI %", "Revenue per Implementation ($)",
+]
+
+# Constant columns: wide column -> (input parameter, display conversion)
+COMPACT_SCALARS = {
+    "Avg Implementation Value ($)": ("avg_implementation_value", int),
+    "AI Adoption Acceleration (%)": ("ai_adoption_acceleration_factor", lambda v: round(v, 2)),
+    "Enterprise Clients": ("num_enterprise_clients", int),
+    "Training Rate per Hour ($)": ("training_rate_per_hour", int),
+    "Enterprise Retention Rate (%)": ("enterprise_retention_rate", lambda v: round(v, 1)),
+}
+
+# Monthly columns: wide column -> (batch series, decimals). decimals=None is an integer
+# column (truncated like .astype(int)); otherwise the value is rounded to that many
+# decimals and stored exactly as an integer count of 10**-decimals.
+COMPACT_SERIES = {
+    "AI Implementations per Month": ("ai_implementations_display", None),
+    "Active Clients": ("active_clients", 1),
+    "Training Hours per Month": ("training_hours_display", None),
+    "Rev: AI Implementation Services": ("ai_implementation_revenue", None),
+    "Rev: AI Consulting Services": ("ai_consulting_revenue", None),
+    "Rev: AI Training Services": ("training_revenue", None),
+    "Rev: AI Support Services": ("support_services_revenue", None),
+    "Revenue: Total": ("total_revenue", None),
+    "Cost: Sales Commission": ("sales_commission", None),
+    "Cost: Marketing Investment": ("marketing_costs", None),
+    "Cost: Implementation Delivery": ("implementation_costs", None),
+    "Costs: Total": ("total_costs", None),
+    "Profit": ("profit", None),
+    "Cumulative Cash ($)": ("cumulative_cash", None),
+    "ROI %": ("roi_pct", 1),
+    "Revenue per Implementation ($)": ("revenue_per_implementation", 0),
+}
+
+# Display formats (str.format) for the wide layout's currency and percentage columns
+TABLE_FORMATS = {
+    "Avg Implementation Value ($)": "${:,.0f}",
+    "Training Rate per Hour ($)": "${:,.0f}",
+    "AI Adoption Acceleration (%)": "{:.1f}%",
+    "Enterprise Retention Rate (%)": "{:.1f}%",
+    "Rev: AI Implementation Services": "${:,.0f}",
+    "Rev: AI Consulting Services": "${:,.0f}",
+    "Rev: AI Training Services": "${:,.0f}",
+    "Rev: AI Support Services": "${:,.0f}",
+    "Revenue: Total": "${:,.0f}",
+    "Cost: Sales Commission": "${:,.0f}",
+    "Cost: Marketing Investment": "${:,.0f}",
+    "Cost: Implementation Delivery": "${:,.0f}",
+    "Costs: Total": "${:,.0f}",
+    "Profit": "${:,.0f}",
+    "Cumulative Cash ($)": "${:,.0f}",
+    "ROI %": "{:.1f}%",
+    "Revenue per Implementation ($)": "${:,.0f}"
+}
+
+def wide_columns(granularity="monthly"):
+    """WIDE_COLUMNS with "Month" replaced by the period label (e.g. "Week", "Training Hours per Week")"""
+    label = GRANULARITIES[granularity][1]
+    return [column.replace("Month", label) for column in WIDE_COLUMNS]
+
+def _smallest_int_dtype(values):
+    """int32 when every value fits, int64 otherwise"""
+    info = np.iinfo(np.int32)
+    if values.size == 0 or (values.min() >= info.min and values.max() <= info.max):
+        return np.int32
+    return np.int64
+
+class CompactFinancials:
+    """One scenario's results with scalar inputs stored once and every per-period
+    series in a single structured array (int32 fields where the values fit).
+
+    Lossless: to_frame() rebuilds exactly the generate_ai_enterprise_financials layout.
+    """
+    __slots__ = ("periods", "granularity", "scalars", "series")
+
+    def __init__(self, periods, scalars, series, granularity="monthly"):
+        self.periods = periods
+        self.granularity = granularity
+        self.scalars = scalars
+        self.series = series
+
+    @classmethod
+    def from_batch(cls, batch, i):
+        # .item() hands back the caller's Python scalar so int()/round() match the scalar path
+        p = {name: v[i].item() for name, v in batch["params"].items()}
+        scalars = {column: convert(p[name]) for column, (name, convert) in COMPACT_SCALARS.items()}
+        stored = {}
+        for column, (key, decimals) in COMPACT_SERIES.items():
+            values = batch[key][i]
+            if decimals is None:
+                stored[column] = values.astype(np.int64)
+            else:
+                # np.round(v, d) is rint(v * 10**d) / 10**d, so the integer count is exact
+                stored[column] = np.rint(values * 10 ** decimals).astype(np.int64)
+        series = np.empty(batch["periods"], dtype=[(c, _smallest_int_dtype(v)) for c, v in stored.items()])
+        for column, values in stored.items():
+            series[column] = values
+        return cls(batch["periods"], scalars, series, batch["granularity"])
+
+    def column(self, name):
+        """One wide-layout column (by its WIDE_COLUMNS name) as a NumPy array"""
+        if name == "Month":
+            return np.arange(1, self.periods + 1)
+        if name in self.scalars:
+            return np.full(self.periods, self.scalars[name])
+        decimals = COMPACT_SERIES[name][1]
+        values = self.series[name].astype(np.int64)
+        if decimals is None:
+            return values
+        return values / 10 ** decimals if decimals else values.astype(float)
+
+    def to_frame(self):
+        """Expand to the wide display/export DataFrame"""
+        return pd.DataFrame({label: self.column(name) for name, label in zip(WIDE_COLUMNS, wide_columns(self.granularity))})
+
+    @property
+    def nbytes(self):
+        return self.series.nbytes + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in self.scalars.items())
+
+def compact_batch(batch):
+    """CompactFinancials for every scenario of a batch result"""
+    return [CompactFinancials.from_batch(batch, i) for i in range(len(batch["params"]["avg_implementation_value"]))]
+
+def compact_financials(periods, params, granularity="monthly", memo=None):
+    """CompactFinancials for a single parameter set"""
+    return CompactFinancials.from_batch(
+        generate_ai_enterprise_financials_batch(periods, params, granularity=granularity, memo=memo), 0)
+
+def batch_scenario_frame(batch, i):
+    """Build the display DataFrame for scenario i of a batch result."""
+    return CompactFinancials.from_batch(batch, i).to_frame()
+
+def batch_stacked_frame(batch, scenario_names=None, rounded=True):
+    """All scenarios of a batch as one long DataFrame (scenario-major, display layout).
+
+    Same columns and values as concatenating batch_scenario_frame for every scenario,
+    plus a "Scenario" column, but built with one reshape per column; the input-derived
+    constants (value, acceleration, clients, rate, retention) are always float64, so
+    frames of different batches share one dtype per column. rounded=False
+    keeps the per-period amounts as unrounded floats, so totals summed from the frame
+    (e.g. by arrow_io.SweepFile) match summarize_batch.
+    """
+    periods = batch["periods"]
+    n = len(batch["params"]["avg_implementation_value"])
+    # .item() + Python int()/round() per scenario keeps the constants' values identical to the scalar path
+    p = {name: [x.item() for x in v] for name, v in batch["params"].items()}
+    def constant(values):
+        return np.repeat(np.asarray(values), periods)
+    def parameter(values):
+        # float64 whatever the input dtype, so chunks of a streamed file share one schema
+        return constant(np.asarray(values, dtype=np.float64))
+    def series(key):
+        return batch[key].reshape(-1)
+    def amount(key):
+        return series(key).astype(int) if rounded else series(key)
+    def rounded_to(key, decimals):
+        return series(key).round(decimals) if rounded else series(key)
+    df = pd.DataFrame({
+        "Month": np.tile(np.arange(1, periods + 1), n),
+        "AI Implementations per Month": series("ai_implementations_display"),
+        "Avg Implementation Value ($)": parameter([int(v) for v in p["avg_implementation_value"]]),
+        "AI Adoption Acceleration (%)": parameter([round(v, 2) for v in p["ai_adoption_acceleration_factor"]]),
+        "Enterprise Clients": parameter([int(v) for v in p["num_enterprise_clients"]]),
+        "Active Clients": rounded_to("active_clients", 1),
+        "Training Hours per Month": series("training_hours_display"),
+        "Training Rate per Hour ($)": parameter([int(v) for v in p["training_rate_per_hour"]]),
+        "Enterprise Retention Rate (%)": parameter([round(v, 1) for v in p["enterprise_retention_rate"]]),
+        "Rev: AI Implementation Services": amount("ai_implementation_revenue"),
+        "Rev: AI Consulting Services": amount("ai_consulting_revenue"),
+        "Rev: AI Training Services": amount("training_revenue"),
+        "Rev: AI Support Services": amount("support_services_revenue"),
+        "Revenue: Total": amount("total_revenue"),
+        "Cost: Sales Commission": amount("sales_commission"),
+        "Cost: Marketing Investment": amount("marketing_costs"),
+        "Cost: Implementation Delivery": amount("implementation_costs"),
+        "Costs: Total": amount("total_costs"),
+        "Profit": amount("profit"),
+        "Cumulative Cash ($)": amount("cumulative_cash"),
+        "ROI %": rounded_to("roi_pct", 1),
+        "Revenue per Implementation ($)": rounded_to("revenue_per_implementation", 0),
+    })
+    df.columns = wide_columns(batch["granularity"])
+    if scenario_names is not None:
+        df["Scenario"] = constant(list(scenario_names))
+    return df
+
+def generate_ai_enterprise_financials(
+    # AI Enterprise Integration Model
+    months, 
+    # AI Implementation Services
+    start_ai_implementations, end_ai_implementations, avg_implementation_value, 
+    start_ai_consulting_monthly, end_ai_consulting_monthly,
+    # AI Training & Support Services  
+    num_enterprise_clients, start_training_hours, end_training_hours, training_rate_per_hour, 
+    start_support_services_monthly, end_support_services_monthly,
+    # Business Development & Operations
+    sales_commission_pct, marketing_cost_monthly, marketing_start_month,
+    # Advanced AI Metrics
+    ai_adoption_acceleration_factor, enterprise_retention_rate,
+    # Client cohorts
+    new_client_share=AI_ENTERPRISE_DEFAULTS["new_client_share"],
+    client_expansion_rate=AI_ENTERPRISE_DEFAULTS["client_expansion_rate"],
+    # Investment & valuation
+    initial_investment=AI_ENTERPRISE_DEFAULTS["initial_investment"],
+    discount_rate=AI_ENTERPRISE_DEFAULTS["discount_rate"],
+):
+    params = dict(zip(AI_ENTERPRISE_PARAMS, [
+        start_ai_implementations, end_ai_implementations, avg_implementation_value,
+        start_ai_consulting_monthly, end_ai_consulting_monthly,
+        num_enterprise_clients, start_training_hours, end_training_hours, training_rate_per_hour,
+        start_support_services_monthly, end_support_services_monthly,
+        sales_commission_pct, marketing_cost_monthly, marketing_start_month,
+        ai_adoption_acceleration_factor, enterprise_retention_rate,
+        new_client_share, client_expansion_rate,
+        initial_investment, discount_rate,
+    ]))
+    return generate_ai_enterprise_financials_batch(months, params, as_frames=True)[0]
+
+def period_month(period, granularity="monthly"):
+    """Calendar month (1-based) containing a 1-based period index"""
+    per_year = GRANULARITIES[granularity][0]
+    if per_year == 12:
+        return period
+    return np.ceil(np.asarray(period) * 12 / per_year).astype(int)
+
+def client_cohort_matrix(batch, i, cohort_months=12):
+    """Active clients of scenario i by acquisition cohort: (labels, cohorts x periods array).
+
+    Row 0 is the initial portfolio; each other row holds the clients won during one
+    block of cohort_months calendar months. Rows sum to batch["active_clients"][i].
+    """
+    periods, granularity = batch["periods"], batch["granularity"]
+    group = (period_month(np.arange(1, periods + 1), granularity) - 1) // cohort_months + 1
+    p = {name: v[i:i + 1] for name, v in batch["params"].items()}
+    acquired = client_acquisitions(batch["ai_implementations_per_month"][i:i + 1], p)[0]
+    acquired[0] -= p["num_enterprise_clients"][0]
+    inflow = np.zeros((group[-1] + 1, periods))
+    inflow[group, np.arange(periods)] = acquired
+    inflow[0, 0] = p["num_enterprise_clients"][0]
+    retention, _ = client_cohort_rates(p, granularity)
+    matrix = cohort_decay_sum(inflow, np.repeat(retention, len(inflow)))
+    if cohort_months == 12:
+        labels = [f"Year {k}" for k in range(1, len(inflow))]
+    else:
+        labels = [f"Months {(k - 1) * cohort_months + 1}-{k * cohort_months}" for k in range(1, len(inflow))]
+    return ["Initial clients"] + labels, matrix
+
+# Annual IRR search range (%); scenarios whose NPV keeps one sign across it have no IRR
+IRR_BOUNDS_PCT = (-99.0, 1e6)
+# On the per-period log rate; NPV sums are only accurate to ~1e-9 of their size, so a
+# tighter stop would just bisect noise. Shifts the annual IRR by well under 0.001%.
+IRR_TOLERANCE = 1e-8
+IRR_MAX_ITERATIONS = 100
+# Long cash-flow series are first solved summed into this many periods to seed Newton
+IRR_COARSE_PERIODS = 64
+
+def _discounted(flows, log_rate, t):
+    """flows (N x T) times exp(-log_rate * t); log_rate is log(1 + r) per period, one per row"""
+    if len(log_rate) > 1 and (log_rate == log_rate[0]).all():
+        return flows * np.exp(-log_rate[0] * t)
+    return flows * np.exp(-np.outer(log_rate, t))
+
+def net_present_value(initial, flows, annual_rate_pct, periods_per_year=12):
+    """Row-wise NPV of initial (at t = 0) plus flows at the end of periods 1..T,
+    discounted at an annual rate (%) compounded per period"""
+    log_rate = np.log1p(np.asarray(annual_rate_pct, dtype=float) / 100) / periods_per_year
+    t = np.arange(1, flows.shape[1] + 1)
+    return initial + _discounted(flows, np.broadcast_to(log_rate, len(flows)), t).sum(axis=1)
+
+def _solve_rate(initial, flows, t, start, tol, max_iter, periods_per_year):
+    """Per-period log rate x with initial + sum(flows * exp(-x * t)) = 0, NaN without a sign change.
+
+    Newton steps run on every unsolved row at once; each row keeps a bracket with a
+    sign change and falls back to bisection when a step would leave it.
+    """
+    lo = np.full(len(flows), np.log1p(IRR_BOUNDS_PCT[0] / 100) / periods_per_year)
+    hi = np.full(len(flows), np.log1p(IRR_BOUNDS_PCT[1] / 100) / periods_per_year)
+    f_lo = initial + _discounted(flows, lo, t).sum(axis=1)
+    f_hi = initial + _discounted(flows, hi, t).sum(axis=1)
+    result = np.full(len(flows), np.nan)
+    rows = np.flatnonzero(np.sign(f_lo) != np.sign(f_hi))
+    flows, initial, lo, hi, f_lo = flows[rows], initial[rows], lo[rows], hi[rows], f_lo[rows]
+    x = np.where(np.isfinite(start[rows]), np.clip(start[rows], lo, hi), (lo + hi) / 2)
+    for _ in range(max_iter):
+        if not len(rows):
+            break
+        weighted = _discounted(flows, x, t)
+        f = initial + weighted.sum(axis=1)
+        slope = -(weighted @ t)
+        # Keep the root bracketed: x replaces the end whose NPV has the same sign
+        below = np.sign(f) == np.sign(f_lo)
+        lo, f_lo = np.where(below, x, lo), np.where(below, f, f_lo)
+        hi = np.where(below, hi, x)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = x - f / slope
+        bisect = ~np.isfinite(step) | (step <= lo) | (step >= hi)
+        step = np.where(bisect, (lo + hi) / 2, step)
+        done = (np.abs(step - x) <= tol * (1 + np.abs(x))) | (hi - lo <= tol * (1 + np.abs(x))) | (f == 0)
+        result[rows[done]] = np.where(f[done] == 0, x[done], step[done])
+        keep = ~done
+        if not keep.all():
+            rows, flows, initial, lo, hi, f_lo = rows[keep], flows[keep], initial[keep], lo[keep], hi[keep], f_lo[keep]
+        x = step[keep]
+    result[rows] = x
+    return result
+
+def internal_rate_of_return(initial, flows, periods_per_year=12, tol=IRR_TOLERANCE, max_iter=IRR_MAX_ITERATIONS):
+    """Annual IRR (%) per row of initial (at t = 0) plus flows (N x T, end of each period).
+
+    Solved for the continuous per-period rate log(1 + r) by bracketed Newton over
+    all rows at once (see _solve_rate). Long series are first solved with their
+    flows summed into IRR_COARSE_PERIODS buckets, which is cheap and lands within
+    a few quadratic Newton steps of the exact root. Rows whose NPV has the same
+    sign at both ends of IRR_BOUNDS_PCT (e.g. flows that are never negative) get NaN.
+    """
+    flows = np.asarray(flows, dtype=float)
+    initial = np.broadcast_to(np.asarray(initial, dtype=float), len(flows))
+    t = np.arange(1, flows.shape[1] + 1)
+    start = np.full(len(flows), np.log1p(0.1) / periods_per_year)
+    if flows.shape[1] > 2 * IRR_COARSE_PERIODS:
+        edges = np.linspace(0, flows.shape[1], IRR_COARSE_PERIODS + 1).astype(int)[:-1]
+        coarse_t = np.add.reduceat(t, edges) / np.diff(np.r_[edges, flows.shape[1]])
+        coarse = _solve_rate(initial, np.add.reduceat(flows, edges, axis=1), coarse_t, start, 1e-6, max_iter, periods_per_year)
+        start = np.where(np.isfinite(coarse), coarse, start)
+    rate = _solve_rate(initial, flows, t, start, tol, max_iter, periods_per_year)
+    return np.expm1(rate * periods_per_year) * 100
+
+def summarize_batch(batch, metrics=None):
+    """Per-scenario headline numbers: final-period revenue, profit and ROI %, cumulative
+    revenue and profit, break-even month (calendar month of the first period with
+    cumulative profit >= 0, one past the horizon if never), peak cost month, NPV of
+    the investment and profits at the discount rate, annual IRR % (NaN without a
+    sign change) and payback month (first month with cumulative cash >= 0).
+
+    metrics limits the result to those keys (and skips computing the others).
+    """
+    wanted = set(metrics) if metrics is not None else None
+    def want(key):
+        return key in wanted if wanted is not None else True
+    granularity = batch["granularity"]
+    per_year = GRANULARITIES[granularity][0]
+    investment = batch["params"]["initial_investment"].astype(float)
+    def first_period(reached):
+        return period_month(np.where(reached.any(axis=1), reached.argmax(axis=1) + 1, batch["periods"] + 1), granularity)
+    result = {}
+    if want("final_revenue"):
+        result["final_revenue"] = batch["total_revenue"][:, -1]
+    if want("final_profit"):
+        result["final_profit"] = batch["profit"][:, -1]
+    if want("final_roi_pct"):
+        result["final_roi_pct"] = batch["roi_pct"][:, -1]
+    if want("cumulative_revenue"):
+        result["cumulative_revenue"] = batch["total_revenue"].sum(axis=1)
+    if want("cumulative_profit") or want("break_even_month"):
+        cumulative = batch["profit"].cumsum(axis=1)
+        if want("cumulative_profit"):
+            result["cumulative_profit"] = cumulative[:, -1]
+        if want("break_even_month"):
+            result["break_even_month"] = first_period(cumulative >= 0)
+    if want("peak_cost_month"):
+        result["peak_cost_month"] = period_month(batch["total_costs"].argmax(axis=1) + 1, granularity)
+    if want("npv"):
+        result["npv"] = net_present_value(-investment, batch["profit"], batch["params"]["discount_rate"], per_year)
+    if want("irr_pct"):
+        result["irr_pct"] = internal_rate_of_return(-investment, batch["profit"], per_year)
+    if want("payback_month"):
+        result["payback_month"] = first_period(batch["cumulative_cash"] >= 0)
+    return result
+
+def chunk_rows(periods, chunk_size):
+    """Scenarios per engine call: chunk_size, reduced to stay within BATCH_CELL_BUDGET"""
+    return max(1, min(chunk_size, BATCH_CELL_BUDGET // max(periods, 1)))
+
+def summarize_scenarios(periods, params, granularity="monthly", chunk_size=5000, progress=None, metrics=None,
+                        memo=None):
+    """summarize_batch for a parameter table of any size, evaluated in memory-bounded chunks.
+
+    progress (if given) is called with the completed fraction after each chunk;
+    metrics (if given) limits the result to those keys; memo (a ModelMemo) is
+    shared by the chunks.
+    """
+    p = normalize_scenario_params(params)
+    n = len(p["avg_implementation_value"])
+    step = chunk_rows(periods, chunk_size)
+    result = None
+    for start in range(0, n, step):
+        end = min(start + step, n)
+        chunk = summarize_batch(generate_ai_enterprise_financials_batch(
+            periods, {name: v[start:end] for name, v in p.items()}, granularity=granularity, memo=memo), metrics)
+        if result is None:
+            result = {k: np.empty(n, dtype=v.dtype) for k, v in chunk.items()}
+        for k, v in chunk.items():
+            result[k][start:end] = v
+        if progress is not None:
+            progress(end / n)
+    return result
+
+def scenario_cache_key(params):
+    """Normalized, hashable parameter tuple (numpy scalars become Python numbers; missing inputs take their default)"""
+    values = (params.get(name, AI_ENTERPRISE_DEFAULTS[name]) for name in AI_ENTERPRISE_PARAMS)
+    return tuple(v.item() if hasattr(v, "item") else v for v in values)
+
+# ===========================================================
+# Monte Carlo risk simulation (chunked, bounded memory)
+# ===========================================================
+# Inputs that can be drawn from a distribution, with the range samples are clipped to
+MONTE_CARLO_BOUNDS = {
+    "ai_adoption_acceleration_factor": (0.0, None),
+    "enterprise_retention_rate": (0.0, 100.0),
+    "new_client_share": (0.0, 1.0),
+    "client_expansion_rate": (0.0, None),
+    "avg_implementation_value": (0.0, None),
+    "start_ai_implementations": (0.0, None),
+    "end_ai_implementations": (0.0, None),
+}
+
+# Histogram cells per metric; long horizons get fewer bins per period to stay within it
+MONTE_CARLO_HISTOGRAM_CELLS = 4 * 1024 * 1024
+
+# Series summarised by the simulation: batch key -> display name
+MONTE_CARLO_METRICS = {"total_revenue": "Revenue", "profit": "Profit", "roi_pct": "ROI %"}
+
+def draw_scenario_samples(rng, base_params, distributions, n):
+    """Draw n parameter sets around base_params.
+
+    distributions maps an input name to (method, *args) where method is a
+    numpy Generator method, e.g. ("normal", 2.5, 0.5) or ("triangular", 90, 95, 99).
+    Inputs without a distribution stay fixed at their base value.
+    """
+    samples = {name: np.full(n, base_params[name]) for name in AI_ENTERPRISE_PARAMS}
+    for name, (method, *args) in distributions.items():
+        low, high = MONTE_CARLO_BOUNDS.get(name, (None, None))
+        draws = getattr(rng, method)(*args, size=n)
+        samples[name] = np.clip(draws, low, high) if low is not None or high is not None else draws
+    return samples
+
+def _monte_carlo_pass(periods, granularity, base_params, distributions, n_samples, seed, chunk_size, visit):
+    """Replay the seeded sample stream chunk by chunk, handing each batch to visit()."""
+    rng = np.random.default_rng(seed)
+    done = 0
+    while done < n_samples:
+        n = min(chunk_size, n_samples - done)
+        batch = generate_ai_enterprise_financials_batch(
+            periods, draw_scenario_samples(rng, base_params, distributions, n), granularity=granularity)
+        for key in MONTE_CARLO_METRICS:
+            visit(key, batch[key])
+        done += n
+
+def simulate_ai_enterprise_financials(periods, base_params, distributions, n_samples=10000, seed=None,
+                                      chunk_size=10000, percentiles=(5, 50, 95), bins=4096, granularity="monthly"):
+    """Monte Carlo percentile bands for Revenue, Profit and ROI % per period.
+
+    Samples are evaluated in fixed-size chunks so memory does not grow with
+    n_samples; long horizons use smaller chunks and fewer histogram bins. A
+    first pass finds each period's range and a second pass (same seed, same
+    draws) fills per-period histograms the percentiles are read from.
+    """
+    if seed is None:
+        seed = int(np.random.SeedSequence().entropy % 2**32)
+    started = time.perf_counter()
+    chunk_size = chunk_rows(periods, chunk_size)
+    bins = max(64, min(bins, MONTE_CARLO_HISTOGRAM_CELLS // periods))
+
+    lo = {key: np.full(periods, np.inf) for key in MONTE_CARLO_METRICS}
+    hi = {key: np.full(periods, -np.inf) for key in MONTE_CARLO_METRICS}
+    def track_range(key, values):
+        np.minimum(lo[key], values.min(axis=0), out=lo[key])
+        np.maximum(hi[key], values.max(axis=0), out=hi[key])
+    _monte_carlo_pass(periods, granularity, base_params, distributions, n_samples, seed, chunk_size, track_range)
+
+    counts = {key: np.zeros(periods * bins, dtype=np.int64) for key in MONTE_CARLO_METRICS}
+    width = {key: (hi[key] - lo[key]) / bins for key in MONTE_CARLO_METRICS}
+    offsets = np.arange(periods) * bins
+    def fill_histogram(key, values):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pos = np.where(width[key] > 0, (values - lo[key]) / width[key], 0)
+        idx = np.clip(pos.astype(np.int64), 0, bins - 1) + offsets
+        counts[key] += np.bincount(idx.ravel(), minlength=periods * bins)
+    _monte_carlo_pass(periods, granularity, base_params, distributions, n_samples, seed, chunk_size, fill_histogram)
+
+    rows = np.arange(periods)
+    bands = {}
+    for key in MONTE_CARLO_METRICS:
+        hist = counts[key].reshape(periods, bins)
+        cum = hist.cumsum(axis=1)
+        band = []
+        for pct in percentiles:
+            target = pct / 100 * n_samples
+            b = np.minimum((cum < target).sum(axis=1), bins - 1)
+            below = np.where(b > 0, cum[rows, b - 1], 0)
+            frac = np.clip((target - below) / np.maximum(hist[rows, b], 1), 0, 1)
+            band.append(lo[key] + (b + frac) * width[key])
+        bands[key] = np.vstack(band)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "periods": periods,
+        "granularity": granularity,
+        "percentiles": tuple(percentiles),
+        "bands": bands,
+        "n_samples": n_samples,
+        "seed": seed,
+        "elapsed": elapsed,
+        "samples_per_sec": n_samples / elapsed if elapsed > 0 else float("inf"),
+    }
+
+# ===========================================================
+# Two-parameter sensitivity sweep
+# ===========================================================
+def parameter_grid(name, low, high, steps):
+    """Evenly spaced sweep values, de-duplicated whole numbers for integer inputs"""
+    values = np.linspace(low, high, steps)
+    if PARAMETER_BOUNDS[name][2]:
+        values = np.unique(np.rint(values)).astype(int)
+    return values
+
+def sensitivity_grid(periods, base_params, x_name, x_values, y_name, y_values,
+                     metric="cumulative_profit", chunk_size=5000, progress=None, granularity="monthly", memo=None):
+    """Evaluate a summarize_batch metric over the x_values x y_values grid.
+
+    The grid is flattened and pushed through the batch engine chunk_size
+    scenarios at a time (fewer on long horizons); progress (if given) is called
+    with the completed fraction after each chunk. Nodes of the model graph that
+    depend on neither swept input are computed once (or found in memo). Returns a
+    len(y_values) x len(x_values) array.
+    """
+    if x_name == y_name:
+        raise ValueError("Sensitivity sweep needs two different parameters")
+    grid_x, grid_y = np.meshgrid(np.asarray(x_values), np.asarray(y_values))
+    params = dict(base_params)
+    params[x_name] = grid_x.ravel()
+    params[y_name] = grid_y.ravel()
+    result = summarize_scenarios(periods, params, granularity, chunk_size, progress, metrics=[metric], memo=memo)[metric]
+    return result.astype(float).reshape(grid_x.shape)
+
+# ===========================================================
+# Goal seek / optimizer over bounded parameter ranges
+# ===========================================================
+def _box_vertices(low, high, max_vertices):
+    """Corners of the search box (all of them when there are few enough)"""
+    d = len(low)
+    if 2 ** d > max_vertices:
+        return np.empty((0, d))
+    bits = (np.arange(2 ** d)[:, None] >> np.arange(d)) & 1
+    return np.where(bits == 1, high, low)
+
+def optimize_scenario(periods, base_params, variables, objective="cumulative_profit", maximize=True,
+                      constraints=None, n_candidates=2048, rounds=8, shrink=0.5, seed=0, max_vertices=1024,
+                      granularity="monthly"):
+    """Search bounded parameter ranges for the best summarize_batch objective.
+
+    variables maps parameter name -> (low, high); constraints maps a
+    summarize_batch metric -> (min, max) with None for an open side, e.g.
+    {"final_roi_pct": (150, None)}. Most of the model is affine in its inputs
+    (client retention and expansion compound, but monotonically) and an ROI
+    floor is linear (profit - floor% * costs >= 0), so optima sit on or near
+    the corners of the box: the first round evaluates every vertex alongside
+    random candidates, later rounds sample a box shrunk around the incumbent.
+    Every round is a single vectorized batch. Ties on the objective are broken
+    by cumulative profit.
+    """
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    names = list(variables)
+    low = np.array([variables[n][0] for n in names], dtype=float)
+    high = np.array([variables[n][1] for n in names], dtype=float)
+    integer = np.array([PARAMETER_BOUNDS[n][2] for n in names])
+    constraints = constraints or {}
+    sign = 1 if maximize else -1
+    # Only what ranking needs is computed per round; the winner gets every metric at the end
+    needed = {objective, "cumulative_profit", *constraints}
+
+    best = None
+    center, radius = (low + high) / 2, (high - low) / 2
+    evaluations = 0
+    for round_no in range(rounds):
+        lo, hi = np.maximum(low, center - radius), np.minimum(high, center + radius)
+        candidates = lo + rng.random((n_candidates, len(names))) * (hi - lo)
+        if round_no == 0:
+            candidates = np.vstack([_box_vertices(low, high, max_vertices), candidates])
+        if best is not None:
+            candidates = np.vstack([best["x"], candidates])
+        candidates = np.where(integer, np.rint(candidates), candidates)
+
+        params = dict(base_params)
+        params.update({n: candidates[:, i] for i, n in enumerate(names)})
+        metrics = summarize_scenarios(periods, params, granularity, chunk_size=len(candidates), metrics=needed)
+        evaluations += len(candidates)
+
+        feasible = np.ones(len(candidates), dtype=bool)
+        for metric, (min_value, max_value) in constraints.items():
+            if min_value is not None:
+                feasible &= metrics[metric] >= min_value
+            if max_value is not None:
+                feasible &= metrics[metric] <= max_value
+        if feasible.any():
+            # NaN objectives (e.g. no IRR) rank last
+            score = np.where(feasible & ~np.isnan(metrics[objective]), sign * metrics[objective], -np.inf)
+            tie_break = np.where(feasible, metrics["cumulative_profit"], -np.inf)
+            pick = np.lexsort((tie_break, score))[-1]
+        else:
+            # Nothing feasible yet: move towards the smallest total constraint violation
+            violation = np.zeros(len(candidates))
+            for metric, (min_value, max_value) in constraints.items():
+                if min_value is not None:
+                    violation += np.maximum(min_value - metrics[metric], 0)
+                if max_value is not None:
+                    violation += np.maximum(metrics[metric] - max_value, 0)
+            pick = np.argmin(np.where(np.isnan(violation), np.inf, violation))
+        best = {
+            "x": candidates[pick],
+            "feasible": bool(feasible[pick]),
+            "metrics": {k: v[pick].item() for k, v in metrics.items()},
+        }
+        center, radius = best["x"], radius * shrink
+
+    best_params = dict(base_params)
+    best_params.update({n: (int(v) if integer[i] else float(v)) for i, (n, v) in enumerate(zip(names, best["x"]))})
+    best["metrics"] = {k: v[0].item() for k, v in summarize_batch(
+        generate_ai_enterprise_financials_batch(periods, best_params, granularity=granularity)).items()}
+    return {
+        "params": best_params,
+        "objective": best["metrics"][objective],
+        "metrics": best["metrics"],
+        "feasible": best["feasible"],
+        "evaluations": evaluations,
+        "elapsed": time.perf_counter() - started,
+    }
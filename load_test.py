@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Load test for the local model API (api_server.py)
+
+Sends requests over concurrent keep-alive connections to a running server and
+reports throughput and latency percentiles, then the server's cache and coalescing
+counters. Parameter sets come from benchmark.scenario_table, so runs are
+reproducible; --distinct bounds how many different ones are sent, which sets the
+cache hit rate (0 = every request different).
+
+    python api_server.py &
+    python load_test.py                                     # 2,000 single-scenario requests, 16 connections
+    python load_test.py --requests 10000 --concurrency 64 --distinct 500
+    python load_test.py --endpoint batch --batch-size 5000 --requests 20 --format arrow
+"""
+import argparse
+import http.client
+import json
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from api_server import ARROW_TYPE, DEFAULT_PORT, JSON_TYPE
+from benchmark import scenario_table
+from financial_engine import MONTHS
+
+
+def request_bodies(args):
+    """Encoded request bodies; request i sends bodies[i % len(bodies)]"""
+    count = min(args.requests, args.distinct) if args.distinct else args.requests
+    options = {"months": args.months, "granularity": args.granularity}
+    if args.endpoint == "scenario":
+        return [json.dumps({**options, "params": row}).encode()
+                for row in scenario_table(count, seed=args.seed).to_dict("records")]
+    return [json.dumps({**options, "series": args.series,
+                        "scenarios": scenario_table(args.batch_size, seed=args.seed + i).to_dict("records")}).encode()
+            for i in range(count)]
+
+
+def run_load(args, bodies):
+    """Fire args.requests requests from args.concurrency threads; returns (latencies, errors, elapsed)"""
+    url = urlsplit(args.url)
+    path = f"/{args.endpoint}?format={args.format}"
+    headers = {"Content-Type": JSON_TYPE, "Accept": ARROW_TYPE if args.format == "arrow" else JSON_TYPE}
+    latencies = np.zeros(args.requests)
+    errors = []
+    next_request = iter(range(args.requests))
+    lock = threading.Lock()
+
+    def client():
+        connection = http.client.HTTPConnection(url.hostname, url.port or DEFAULT_PORT, timeout=args.timeout)
+        while True:
+            with lock:
+                i = next(next_request, None)
+            if i is None:
+                break
+            started = time.perf_counter()
+            try:
+                connection.request("POST", path, body=bodies[i % len(bodies)], headers=headers)
+                response = connection.getresponse()
+                payload = response.read()
+                if response.status != 200:
+                    errors.append(f"HTTP {response.status}: {payload[:200].decode(errors='replace')}")
+            except (OSError, http.client.HTTPException) as e:
+                errors.append(f"{type(e).__name__}: {e}")
+                connection.close()
+            latencies[i] = time.perf_counter() - started
+        connection.close()
+
+    threads = [threading.Thread(target=client) for _ in range(args.concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - started
+
+
+def server_stats(url):
+    connection = http.client.HTTPConnection(url.hostname, url.port or DEFAULT_PORT, timeout=10)
+    try:
+        connection.request("GET", "/health")
+        return json.loads(connection.getresponse().read())
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the local financial model API")
+    parser.add_argument("--url", default=f"http://127.0.0.1:{DEFAULT_PORT}", help="server address")
+    parser.add_argument("--endpoint", choices=["scenario", "batch"], default="scenario")
+    parser.add_argument("--requests", type=int, default=2000, help="requests to send (default 2000)")
+    parser.add_argument("--concurrency", type=int, default=16, help="parallel connections (default 16)")
+    parser.add_argument("--distinct", type=int, default=0, help="distinct parameter sets to cycle through (0 = all distinct)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="scenarios per /batch request (default 1000)")
+    parser.add_argument("--series", action="store_true", help="ask /batch for per-period series too")
+    parser.add_argument("--months", type=int, default=MONTHS, help=f"forecast horizon in months (default {MONTHS})")
+    parser.add_argument("--granularity", default="monthly", help="period length (default monthly)")
+    parser.add_argument("--format", choices=["json", "arrow"], default="json", help="response format")
+    parser.add_argument("--timeout", type=float, default=300, help="per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the generated parameter sets")
+    args = parser.parse_args()
+
+    if args.requests < 1 or args.concurrency < 1 or args.batch_size < 1:
+        parser.error("--requests, --concurrency and --batch-size must be at least 1")
+    url = urlsplit(args.url)
+    try:
+        before = server_stats(url)
+    except OSError as e:
+        sys.exit(f"❌ No API server at {args.url} ({e}); start one with: python api_server.py")
+
+    bodies = request_bodies(args)
+    print(f"🎯 {args.requests:,} x POST /{args.endpoint} ({args.format}) over {args.concurrency} connection(s), "
+          f"{len(bodies):,} distinct bodies")
+    latencies, errors, elapsed = run_load(args, bodies)
+    after = server_stats(url)
+
+    scenarios = args.requests * (args.batch_size if args.endpoint == "batch" else 1)
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) * 1000
+    print(f"✅ {args.requests:,} requests in {elapsed:.2f}s: {args.requests / elapsed:,.0f} req/s, "
+          f"{scenarios / elapsed:,.0f} scenarios/s")
+    print(f"⏱️ latency p50 {p50:.1f} ms • p90 {p90:.1f} ms • p99 {p99:.1f} ms • max {latencies.max() * 1000:.1f} ms")
+    cache, coalescing = after["cache"], after["coalescing"]
+    hits = cache["hits"] - before["cache"]["hits"]
+    misses = cache["misses"] - before["cache"]["misses"]
+    calls = coalescing["engine_calls"] - before["coalescing"]["engine_calls"]
+    coalesced = coalescing["requests"] - before["coalescing"]["requests"]
+    print(f"💾 cache hits {hits:,} / {hits + misses:,} • shared in-flight "
+          f"{coalescing['shared_inflight'] - before['coalescing']['shared_inflight']:,} • "
+          f"coalesced {coalesced:,} request(s) into {calls:,} engine call(s)")
+    if errors:
+        print(f"❌ {len(errors):,} failed request(s), first: {errors[0]}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
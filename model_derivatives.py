@@ -0,0 +1,308 @@
+"""
+Analytic sensitivities of the financial model
+
+Forward-mode differentiation over the model graph (financial_engine.MODEL_NODES).
+Every node has a tangent rule here, and a single pass carries the partial
+derivatives of each series with respect to every continuous input alongside
+the values. d(series) / d(input) for all inputs therefore costs one model
+evaluation, not one per input. The results are exact derivatives of the model,
+except for two simplifications: whole-dollar rounding (commission, marketing)
+is differentiated as if it were absent, and the integer display counts have
+zero derivative. No Streamlit needed.
+"""
+import numpy as np
+
+from financial_engine import (
+    AI_ENTERPRISE_PARAMS, CLIENT_EXPANSION_CAP, GRANULARITIES, MIN_PERIOD_RETENTION, MODEL_NODES,
+    MODEL_OUTPUTS, MONTHLY_RATE_PARAMS, cohort_decay_sum, internal_rate_of_return, linear_ramp,
+    normalize_scenario_params, period_rates,
+)
+
+# Inputs that only take effect in whole steps (a start month) have no derivative
+DISCRETE_PARAMS = ["marketing_start_month"]
+SENSITIVITY_PARAMS = [name for name in AI_ENTERPRISE_PARAMS if name not in DISCRETE_PARAMS]
+
+# Summary metrics with a derivative (break-even and payback months are step functions)
+GRADIENT_METRICS = ["final_revenue", "final_profit", "final_roi_pct", "cumulative_revenue", "cumulative_profit",
+                    "npv", "irr_pct"]
+
+# node name -> rule(v, d) returning the node's tangent. v holds input rates (one value per
+# scenario), node values (scenarios x periods) and the context values (periods, idx, granularity); d holds the
+# tangents of inputs (wrt x scenarios) and nodes (wrt x scenarios x periods).
+TANGENT_RULES = {}
+
+
+def tangent_rule(node):
+    """Register the decorated function as the tangent rule of a MODEL_NODES node"""
+    def register(rule):
+        TANGENT_RULES[node] = rule
+        return rule
+    return register
+
+
+def _col(values):
+    """Per-scenario values (or their tangents) as a column that broadcasts over periods"""
+    return values[..., None]
+
+
+def _ramp_tangent(d_start, d_end, periods):
+    """linear_ramp is linear in (start, end), so its tangent is the ramp between the tangents"""
+    wrt, n = d_start.shape
+    return linear_ramp(d_start.ravel(), d_end.ravel(), periods).reshape(wrt, n, periods)
+
+
+def _cohort_tangent(total, factor, d_inflow, d_factor):
+    """Tangent of total = cohort_decay_sum(inflow, factor).
+
+    total[t] = factor * total[t - 1] + inflow[t], so its tangent follows the same
+    recurrence with inflow d_inflow + total[t - 1] * d_factor and is itself a
+    cohort_decay_sum. Factors below MIN_PERIOD_RETENTION are clamped by the model
+    and get zero derivative.
+    """
+    wrt, n, periods = d_inflow.shape
+    d_factor = np.where(factor >= MIN_PERIOD_RETENTION, d_factor, 0.0)
+    previous = np.concatenate([np.zeros((n, 1)), total[:, :-1]], axis=1)
+    forcing = d_inflow + previous * _col(d_factor)
+    return cohort_decay_sum(forcing.reshape(wrt * n, periods), np.tile(factor, wrt)).reshape(wrt, n, periods)
+
+
+def _rate_factor_tangent(d_rate_pct, base, granularity):
+    """Tangent of base ** (12 / periods per year), where base moves by d_rate_pct / 100"""
+    exponent = 12 / GRANULARITIES[granularity][0]
+    return exponent * base ** (exponent - 1) * d_rate_pct / 100
+
+
+@tangent_rule("ai_implementations_per_month")
+def _(v, d):
+    ramp = linear_ramp(v["start_ai_implementations"], v["end_ai_implementations"], v["periods"])
+    elapsed = v["idx"] - 1
+    growth = 1 + elapsed * _col(v["ai_adoption_acceleration_factor"]) / 100
+    return (_ramp_tangent(d["start_ai_implementations"], d["end_ai_implementations"], v["periods"]) * growth
+            + ramp * elapsed * _col(d["ai_adoption_acceleration_factor"]) / 100)
+
+
+@tangent_rule("ai_implementation_revenue")
+def _(v, d):
+    return (d["ai_implementations_per_month"] * _col(v["avg_implementation_value"])
+            + v["ai_implementations_per_month"] * _col(d["avg_implementation_value"]))
+
+
+@tangent_rule("ai_consulting_revenue")
+def _(v, d):
+    return _ramp_tangent(d["start_ai_consulting_monthly"], d["end_ai_consulting_monthly"], v["periods"])
+
+
+@tangent_rule("client_inflow")
+def _(v, d):
+    inflow = (d["ai_implementations_per_month"] * _col(v["new_client_share"])
+              + v["ai_implementations_per_month"] * _col(d["new_client_share"]))
+    inflow[..., 0] += d["num_enterprise_clients"]
+    return inflow
+
+
+@tangent_rule("client_retention")
+def _(v, d):
+    return _rate_factor_tangent(d["enterprise_retention_rate"], v["enterprise_retention_rate"] / 100, v["granularity"])
+
+
+@tangent_rule("client_expansion")
+def _(v, d):
+    return _rate_factor_tangent(d["client_expansion_rate"], 1 + v["client_expansion_rate"] / 100, v["granularity"])
+
+
+@tangent_rule("active_clients")
+def _(v, d):
+    return _cohort_tangent(v["active_clients"], v["client_retention"], d["client_inflow"], d["client_retention"])
+
+
+@tangent_rule("portfolio_usage")
+def _(v, d):
+    factor = v["client_retention"] * v["client_expansion"]
+    d_factor = d["client_retention"] * v["client_expansion"] + v["client_retention"] * d["client_expansion"]
+    uncapped = cohort_decay_sum(v["client_inflow"], factor)
+    d_usage = np.where(uncapped <= CLIENT_EXPANSION_CAP * v["active_clients"],
+                       _cohort_tangent(uncapped, factor, d["client_inflow"], d_factor),
+                       CLIENT_EXPANSION_CAP * d["active_clients"])
+    clients = v["num_enterprise_clients"]
+    d_clients = np.where(clients >= 1, d["num_enterprise_clients"], 0.0)
+    return (d_usage - v["portfolio_usage"] * _col(d_clients)) / _col(np.maximum(clients, 1))
+
+
+@tangent_rule("training_hours_per_month")
+def _(v, d):
+    ramp = linear_ramp(v["start_training_hours"], v["end_training_hours"], v["periods"])
+    return (_ramp_tangent(d["start_training_hours"], d["end_training_hours"], v["periods"]) * v["portfolio_usage"]
+            + ramp * d["portfolio_usage"])
+
+
+@tangent_rule("training_revenue")
+def _(v, d):
+    return (d["training_hours_per_month"] * _col(v["training_rate_per_hour"])
+            + v["training_hours_per_month"] * _col(d["training_rate_per_hour"]))
+
+
+@tangent_rule("support_services_revenue")
+def _(v, d):
+    ramp = linear_ramp(v["start_support_services_monthly"], v["end_support_services_monthly"], v["periods"])
+    d_ramp = _ramp_tangent(d["start_support_services_monthly"], d["end_support_services_monthly"], v["periods"])
+    return d_ramp * v["portfolio_usage"] + ramp * d["portfolio_usage"]
+
+
+@tangent_rule("ai_implementations_display")
+def _(v, d):
+    return np.zeros_like(d["ai_implementations_per_month"])
+
+
+@tangent_rule("training_hours_display")
+def _(v, d):
+    return np.zeros_like(d["training_hours_per_month"])
+
+
+@tangent_rule("total_revenue")
+def _(v, d):
+    return d["ai_implementation_revenue"] + d["ai_consulting_revenue"] + d["training_revenue"] + d["support_services_revenue"]
+
+
+@tangent_rule("sales_commission")
+def _(v, d):
+    return d["total_revenue"] * _col(v["sales_commission_pct"]) + v["total_revenue"] * _col(d["sales_commission_pct"])
+
+
+@tangent_rule("marketing_costs")
+def _(v, d):
+    return np.where(v["idx"] >= _col(v["marketing_start_month"]), _col(d["marketing_cost_monthly"]), 0.0)
+
+
+@tangent_rule("implementation_costs")
+def _(v, d):
+    return (d["ai_implementations_per_month"] * _col(v["avg_implementation_value"] * 0.25)
+            + v["ai_implementations_per_month"] * _col(d["avg_implementation_value"] * 0.25))
+
+
+@tangent_rule("total_costs")
+def _(v, d):
+    return d["sales_commission"] + d["marketing_costs"] + d["implementation_costs"]
+
+
+@tangent_rule("profit")
+def _(v, d):
+    return d["total_revenue"] - d["total_costs"]
+
+
+@tangent_rule("cumulative_cash")
+def _(v, d):
+    return np.cumsum(d["profit"], axis=2) - _col(d["initial_investment"])
+
+
+@tangent_rule("roi_pct")
+def _(v, d):
+    costs = v["total_costs"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(costs > 0, (d["profit"] * costs - v["profit"] * d["total_costs"]) / costs ** 2 * 100, 0.0)
+
+
+@tangent_rule("revenue_per_implementation")
+def _(v, d):
+    shown = v["ai_implementations_display"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(shown > 0, d["total_revenue"] / shown, 0.0)
+
+
+_untangled = [name for name in MODEL_NODES if name not in TANGENT_RULES]
+if _untangled:
+    raise ValueError(f"model nodes without a tangent rule: {', '.join(_untangled)}")
+
+
+def model_derivatives(periods, params, granularity="monthly"):
+    """Evaluate the model and its partial derivatives in one forward pass.
+
+    Returns a batch dict (as generate_ai_enterprise_financials_batch) with two more
+    keys: "wrt", the SENSITIVITY_PARAMS order, and "derivatives", which maps every
+    MODEL_OUTPUTS series to a len(wrt) x N x periods array; entry [j] is
+    d(series) / d(wrt[j]) per scenario and period. Memory grows with
+    len(wrt) x N x periods, so it is meant for a handful of scenarios.
+    """
+    p = normalize_scenario_params(params)
+    n = len(p["avg_implementation_value"])
+    rates = period_rates(p, granularity)
+    per_month = 12 / GRANULARITIES[granularity][0]
+    context = {"periods": periods, "idx": np.arange(1, periods + 1), "granularity": granularity}
+    values = {**rates, **context}
+    tangents = {}
+    for name in AI_ENTERPRISE_PARAMS:
+        seed = np.zeros((len(SENSITIVITY_PARAMS), n))
+        if name in SENSITIVITY_PARAMS:
+            # period_rates scales monthly amounts (and the monthly acceleration) by months per period
+            scaled = name in MONTHLY_RATE_PARAMS or name == "ai_adoption_acceleration_factor"
+            seed[SENSITIVITY_PARAMS.index(name)] = per_month if scaled else 1.0
+        tangents[name] = seed
+    for name, (function, inputs, _) in MODEL_NODES.items():
+        values[name] = function(*[values[i] for i in inputs])
+        tangents[name] = TANGENT_RULES[name](values, tangents)
+    batch = {"periods": periods, "granularity": granularity, "params": p, "wrt": list(SENSITIVITY_PARAMS)}
+    batch.update({name: values[name] for name in MODEL_OUTPUTS})
+    batch["derivatives"] = {name: tangents[name] for name in MODEL_OUTPUTS}
+    return batch
+
+
+def summary_gradients(batch, metrics=None):
+    """Partial derivatives of summarize_batch metrics from a model_derivatives result.
+
+    Returns metric -> len(wrt) x N array, for GRADIENT_METRICS (or the given subset).
+    The IRR's derivative comes from the implicit function theorem on NPV(IRR) = 0
+    and is NaN wherever the IRR is.
+    """
+    wanted = metrics if metrics is not None else GRADIENT_METRICS
+    d = batch["derivatives"]
+    wrt = batch["wrt"]
+    per_year = GRANULARITIES[batch["granularity"]][0]
+    t = np.arange(1, batch["periods"] + 1)
+    profit = batch["profit"]
+    d_investment = np.zeros(len(wrt)) if "initial_investment" not in wrt else np.eye(len(wrt))[wrt.index("initial_investment")]
+    d_rate = np.zeros(len(wrt)) if "discount_rate" not in wrt else np.eye(len(wrt))[wrt.index("discount_rate")]
+    result = {}
+    for metric in wanted:
+        if metric == "final_revenue":
+            result[metric] = d["total_revenue"][..., -1]
+        elif metric == "final_profit":
+            result[metric] = d["profit"][..., -1]
+        elif metric == "final_roi_pct":
+            result[metric] = d["roi_pct"][..., -1]
+        elif metric == "cumulative_revenue":
+            result[metric] = d["total_revenue"].sum(axis=2)
+        elif metric == "cumulative_profit":
+            result[metric] = d["profit"].sum(axis=2)
+        elif metric == "npv":
+            rate_pct = batch["params"]["discount_rate"].astype(float)
+            discount = np.exp(-np.outer(np.log1p(rate_pct / 100) / per_year, t))
+            # d(log rate per period) / d(rate %) = 1 / ((100 + rate %) * periods per year)
+            d_log_rate = _col(d_rate) / ((100 + rate_pct) * per_year)
+            result[metric] = (-_col(d_investment) + (d["profit"] * discount).sum(axis=2)
+                              - (profit * discount * t).sum(axis=1) * d_log_rate)
+        elif metric == "irr_pct":
+            investment = batch["params"]["initial_investment"].astype(float)
+            irr_pct = internal_rate_of_return(-investment, profit, per_year)
+            discount = np.exp(-np.outer(np.log1p(irr_pct / 100) / per_year, t))
+            # NPV(rate) = -investment + sum(profit_t * exp(-rate * t)) stays 0 at the IRR
+            d_npv = -_col(d_investment) + (d["profit"] * discount).sum(axis=2)
+            slope = -(profit * discount * t).sum(axis=1)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                result[metric] = -d_npv / slope * per_year * (100 + irr_pct)
+        else:
+            raise ValueError(f"{metric} has no derivative; choose from {', '.join(GRADIENT_METRICS)}")
+    return result
+
+
+def scenario_gradients(periods, params, granularity="monthly", metrics=None):
+    """Partial derivatives of summary metrics for one parameter set: metric -> {input: derivative}"""
+    batch = model_derivatives(periods, params, granularity)
+    return {metric: dict(zip(batch["wrt"], values[:, 0].tolist()))
+            for metric, values in summary_gradients(batch, metrics).items()}
+
+
+def what_if_deltas(gradient, params, step_pct=10.0):
+    """First-order change of a metric when each input alone rises by step_pct % of its value.
+
+    gradient is one metric of scenario_gradients; returns input -> change.
+    """
+    return {name: slope * float(params[name]) * step_pct / 100 for name, slope in gradient.items()}
@@ -0,0 +1,265 @@
+"""
+Opt-in per-rerun profiler: wall time and memory allocation per named stage
+
+Stages nest (a tab contains its charts) and are kept for the last N reruns.
+Allocation is measured with tracemalloc, which only runs while a profiled
+rerun is in progress; it is process-wide, so reruns of other sessions running
+at the same moment are counted too. Traces export in the Chrome trace-event
+format, which chrome://tracing, Perfetto and speedscope load directly.
+
+StartupReport times a server process's cold start once, phase by phase, from the
+launcher (or the top of the script) to the end of the first rendered run.
+"""
+import contextlib
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+import pandas as pd
+
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+
+
+def _start_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracing_users += 1
+
+
+def _stop_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        _tracing_users = max(_tracing_users - 1, 0)
+        if _tracing_users == 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+class RerunProfiler:
+    """Per-session stage timings for the last `history` reruns"""
+
+    def __init__(self, history=20):
+        self.enabled = False
+        self.reruns = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._open = None
+        self._next_id = 1
+
+    def resize(self, history):
+        if history != self.reruns.maxlen:
+            self.reruns = deque(self.reruns, maxlen=history)
+
+    # ---- recording ----
+
+    def start_rerun(self, enabled, label="rerun"):
+        """Begin recording a rerun (no-op when profiling is off)"""
+        if self._open is not None:
+            # The previous rerun was cut short (st.rerun, st.stop, an exception); keep what it recorded
+            self._open["rerun"]["label"] += " (interrupted)"
+            self._end(self._open, interrupted=True)
+        self.enabled = enabled
+        if enabled:
+            self._open = self._begin(label)
+
+    def finish_rerun(self):
+        """Close the current rerun and add it to the history"""
+        if self._open is not None:
+            self._end(self._open)
+
+    def stage(self, name):
+        """Context manager timing one stage; nests inside the enclosing stage"""
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return self._stage(name)
+
+    @contextlib.contextmanager
+    def _stage(self, name):
+        # Stages outside a rerun (e.g. a download callback) are recorded as their own entry
+        recording = getattr(self._local, "recording", None)
+        standalone = recording is None
+        if standalone:
+            recording = self._begin(name)
+        stack = recording["stack"]
+        frame = {"name": name, "depth": len(stack) - 1, "start": time.perf_counter(),
+                 "mem_start": tracemalloc.get_traced_memory()[0], "child_peak": 0}
+        stack.append(frame)
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            self._close(recording, frame)
+            if standalone:
+                self._end(recording)
+
+    def _begin(self, label):
+        _start_tracing()
+        tracemalloc.reset_peak()
+        now = time.perf_counter()
+        root = {"name": label, "depth": -1, "start": now, "mem_start": tracemalloc.get_traced_memory()[0], "child_peak": 0}
+        recording = {"rerun": {"label": label, "started_at": time.time(), "origin": now, "stages": []}, "stack": [root]}
+        self._local.recording = recording
+        return recording
+
+    def _close(self, recording, frame):
+        stack = recording["stack"]
+        current, peak = tracemalloc.get_traced_memory()
+        # Peak above the stage's starting point, including any nested stage's peak
+        peak = max(peak - frame["mem_start"], frame["child_peak"])
+        stack.pop()
+        parent = stack[-1]
+        parent["child_peak"] = max(parent["child_peak"], peak + frame["mem_start"] - parent["mem_start"])
+        tracemalloc.reset_peak()
+        recording["rerun"]["stages"].append({
+            "stage": frame["name"],
+            "depth": frame["depth"],
+            "start": frame["start"] - recording["rerun"]["origin"],
+            "seconds": time.perf_counter() - frame["start"],
+            "alloc_bytes": current - frame["mem_start"],
+            "peak_bytes": peak,
+        })
+
+    def _end(self, recording, interrupted=False):
+        rerun, root = recording["rerun"], recording["stack"][0]
+        stages = rerun["stages"]
+        if interrupted:
+            # Time after the last finished stage was spent idle, not in the rerun
+            rerun["seconds"] = max((s["start"] + s["seconds"] for s in stages), default=0.0)
+            rerun["peak_bytes"] = root["child_peak"]
+        else:
+            rerun["seconds"] = time.perf_counter() - root["start"]
+            rerun["peak_bytes"] = max(tracemalloc.get_traced_memory()[1] - root["mem_start"], root["child_peak"])
+        stages.sort(key=lambda s: s["start"])
+        if recording is self._open:
+            self._open = None
+        if getattr(self._local, "recording", None) is recording:
+            self._local.recording = None
+        _stop_tracing()
+        with self._lock:
+            rerun["id"] = self._next_id
+            self._next_id += 1
+            self.reruns.append(rerun)
+
+    # ---- reporting ----
+
+    def history_frame(self):
+        """One row per recorded stage: rerun id, label, stage, depth, wall and allocation"""
+        with self._lock:
+            reruns = list(self.reruns)
+        rows = [
+            {"rerun": r["id"], "label": r["label"], **{k: s[k] for k in ("stage", "depth", "seconds", "alloc_bytes", "peak_bytes")}}
+            for r in reruns for s in r["stages"]
+        ]
+        return pd.DataFrame(rows, columns=["rerun", "label", "stage", "depth", "seconds", "alloc_bytes", "peak_bytes"])
+
+    def totals_frame(self):
+        """One row per recorded rerun: id, label, wall time and peak allocation"""
+        with self._lock:
+            reruns = list(self.reruns)
+        return pd.DataFrame([{"rerun": r["id"], "label": r["label"], "seconds": r["seconds"], "peak_bytes": r["peak_bytes"]}
+                             for r in reruns], columns=["rerun", "label", "seconds", "peak_bytes"])
+
+    def chrome_trace(self):
+        """Chrome trace-event document covering every recorded rerun"""
+        with self._lock:
+            reruns = list(self.reruns)
+        pid = os.getpid()
+        events = []
+        for r in reruns:
+            ts0 = r["started_at"] * 1e6
+            events.append({"name": f"{r['label']} #{r['id']}", "ph": "X", "pid": pid, "tid": r["id"],
+                           "ts": ts0, "dur": r["seconds"] * 1e6, "args": {"peak_bytes": r["peak_bytes"]}})
+            for s in r["stages"]:
+                events.append({"name": s["stage"], "ph": "X", "pid": pid, "tid": r["id"],
+                               "ts": ts0 + s["start"] * 1e6, "dur": s["seconds"] * 1e6,
+                               "args": {"alloc_bytes": s["alloc_bytes"], "peak_bytes": s["peak_bytes"]}})
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": r["id"],
+                           "args": {"name": f"{r['label']} #{r['id']}"}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+# Set by setup_and_run.py to its start time (time.time()), so the startup report covers the launcher too
+LAUNCH_TIME_ENV = "AI_ENTERPRISE_LAUNCHED_AT"
+
+
+class StartupReport:
+    """Wall time per phase from launch to a server process's first rendered run.
+
+    The first script run claims the report (begin) and times its phases; the first
+    run to reach the end of the script closes it (finish). Phases added after that,
+    such as background cache warming, are listed but not counted in the total.
+    """
+
+    def __init__(self):
+        self.phases = []
+        self.rendered = False
+        self._claimed = False
+        self._mark = None
+        self._lock = threading.Lock()
+
+    def begin(self, script_started):
+        """Claim the report for this run, given perf_counter() at the top of the script.
+
+        Records the launcher and server start (when launched by setup_and_run.py) and
+        the script's imports; returns False if an earlier run already claimed it.
+        """
+        with self._lock:
+            if self._claimed:
+                return False
+            self._claimed = True
+        now = time.perf_counter()
+        launched_at = os.environ.get(LAUNCH_TIME_ENV)
+        if launched_at:
+            try:
+                self._add("launcher + server start", time.time() - (now - script_started) - float(launched_at))
+            except ValueError:
+                pass
+        self._add("imports", now - script_started)
+        self._mark = now
+        return True
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Context manager timing one phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self._add(name, end - start)
+            if not self.rendered:
+                self._mark = end
+
+    def finish(self, name="first render"):
+        """Record the time since the last phase as the first render; True only for the first call after begin"""
+        with self._lock:
+            if not self._claimed or self.rendered:
+                return False
+            self.phases.append({"phase": name, "seconds": time.perf_counter() - self._mark, "before_render": True})
+            self.rendered = True
+        return True
+
+    def _add(self, name, seconds):
+        with self._lock:
+            self.phases.append({"phase": name, "seconds": seconds, "before_render": not self.rendered})
+
+    def total_seconds(self):
+        """Launch (or script start) to first render"""
+        with self._lock:
+            return sum(p["seconds"] for p in self.phases if p["before_render"])
+
+    def frame(self):
+        """One row per phase: name, wall time and whether it delayed the first render"""
+        with self._lock:
+            return pd.DataFrame(list(self.phases), columns=["phase", "seconds", "before_render"])
+
+    def summary(self):
+        """One line, e.g. 'imports 0.61s • warm cache: defaults 0.12s • first render 0.40s • total 1.13s'"""
+        with self._lock:
+            phases = [p for p in self.phases if p["before_render"]]
+        return " • ".join([f"{p['phase']} {p['seconds']:.2f}s" for p in phases]
+                          + [f"total {sum(p['seconds'] for p in phases):.2f}s"])
@@ -0,0 +1,223 @@
+"""
+Persistent on-disk scenario store (SQLite)
+
+Only the parameter vector, horizon, granularity and a row of summary metrics
+are stored per scenario; full series are recomputed from the parameters when a
+scenario is opened. The summary row is written on save, so ranking and
+comparing hundreds of scenarios never touches the model. The months column
+holds the number of periods.
+"""
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+from financial_engine import (
+    AI_ENTERPRISE_PARAMS, MODEL_VERSION, generate_ai_enterprise_financials_batch, summarize_batch,
+)
+
+SUMMARY_COLUMNS = ["final_revenue", "final_profit", "final_roi_pct", "cumulative_revenue", "cumulative_profit",
+                   "break_even_month", "peak_cost_month", "npv", "irr_pct", "payback_month"]
+
+# Summary columns that are legitimately NULL (no IRR without a sign change in the cash flows)
+NULLABLE_SUMMARY_COLUMNS = {"irr_pct"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scenarios (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    created_at REAL NOT NULL,
+    months INTEGER NOT NULL,
+    granularity TEXT NOT NULL DEFAULT 'monthly',
+    params TEXT NOT NULL,
+    final_revenue REAL,
+    final_profit REAL,
+    final_roi_pct REAL,
+    cumulative_revenue REAL,
+    cumulative_profit REAL,
+    break_even_month INTEGER,
+    peak_cost_month INTEGER,
+    npv REAL,
+    irr_pct REAL,
+    payback_month INTEGER,
+    model_version INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS scenario_tags (
+    scenario_id INTEGER NOT NULL REFERENCES scenarios(id) ON DELETE CASCADE,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (scenario_id, tag)
+);
+CREATE INDEX IF NOT EXISTS idx_scenario_tags_tag ON scenario_tags(tag);
+CREATE INDEX IF NOT EXISTS idx_scenarios_final_roi ON scenarios(final_roi_pct);
+CREATE INDEX IF NOT EXISTS idx_scenarios_final_profit ON scenarios(final_profit);
+CREATE INDEX IF NOT EXISTS idx_scenarios_cumulative_profit ON scenarios(cumulative_profit);
+CREATE INDEX IF NOT EXISTS idx_scenarios_final_revenue ON scenarios(final_revenue);
+"""
+
+# Indexes on columns added by MIGRATIONS, created once the columns exist
+MIGRATED_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_scenarios_cumulative_revenue ON scenarios(cumulative_revenue);
+CREATE INDEX IF NOT EXISTS idx_scenarios_break_even ON scenarios(break_even_month);
+CREATE INDEX IF NOT EXISTS idx_scenarios_npv ON scenarios(npv);
+"""
+
+
+# Columns added after the first release: name -> DDL, applied to older databases on open
+MIGRATIONS = {
+    "granularity": "ALTER TABLE scenarios ADD COLUMN granularity TEXT NOT NULL DEFAULT 'monthly'",
+    "cumulative_revenue": "ALTER TABLE scenarios ADD COLUMN cumulative_revenue REAL",
+    "peak_cost_month": "ALTER TABLE scenarios ADD COLUMN peak_cost_month INTEGER",
+    "model_version": "ALTER TABLE scenarios ADD COLUMN model_version INTEGER NOT NULL DEFAULT 1",
+    "npv": "ALTER TABLE scenarios ADD COLUMN npv REAL",
+    "irr_pct": "ALTER TABLE scenarios ADD COLUMN irr_pct REAL",
+    "payback_month": "ALTER TABLE scenarios ADD COLUMN payback_month INTEGER",
+}
+
+
+def scenario_summary(periods, params, granularity="monthly", memo=None):
+    """Summary metrics for one parameter set (memo: a ModelMemo to reuse model nodes from)"""
+    metrics = summarize_batch(generate_ai_enterprise_financials_batch(periods, params, granularity=granularity, memo=memo))
+    return {k: metrics[k][0].item() for k in SUMMARY_COLUMNS}
+
+
+class ScenarioStore:
+    """SQLite-backed scenario library; each call opens its own connection so it is safe across threads"""
+
+    def __init__(self, path="scenarios.db"):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(scenarios)")}
+            for column, ddl in MIGRATIONS.items():
+                if column not in existing:
+                    conn.execute(ddl)
+            conn.executescript(MIGRATED_INDEXES)
+        self._backfill_summaries()
+
+    def _backfill_summaries(self):
+        """Fill summary columns added after a scenario was saved, and recompute summaries
+        saved under an older MODEL_VERSION, one batch per horizon"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, months, granularity, params FROM scenarios WHERE model_version < ? OR "
+                + " OR ".join(f"{c} IS NULL" for c in SUMMARY_COLUMNS if c not in NULLABLE_SUMMARY_COLUMNS),
+                (MODEL_VERSION,),
+            ).fetchall()
+            groups = {}
+            for scenario_id, periods, granularity, params in rows:
+                groups.setdefault((periods, granularity), []).append((scenario_id, json.loads(params)))
+            for (periods, granularity), scenarios in groups.items():
+                metrics = summarize_batch(generate_ai_enterprise_financials_batch(
+                    periods, [p for _, p in scenarios], granularity=granularity))
+                conn.executemany(
+                    f"UPDATE scenarios SET {', '.join(c + ' = ?' for c in SUMMARY_COLUMNS)}, model_version = ? WHERE id = ?",
+                    [(*[metrics[c][i].item() for c in SUMMARY_COLUMNS], MODEL_VERSION, scenario_id)
+                     for i, (scenario_id, _) in enumerate(scenarios)],
+                )
+
+    @contextmanager
+    def _connect(self):
+        """Connection that commits on success and is always closed"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA foreign_keys=ON")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def save(self, name, params, periods, tags=(), metrics=None, granularity="monthly"):
+        """Insert or replace a scenario; returns its summary metrics"""
+        params = {k: params[k].item() if hasattr(params[k], "item") else params[k] for k in AI_ENTERPRISE_PARAMS}
+        metrics = metrics or scenario_summary(periods, params, granularity)
+        with self._connect() as conn:
+            conn.execute("DELETE FROM scenarios WHERE name = ?", (name,))
+            cur = conn.execute(
+                f"INSERT INTO scenarios (name, created_at, months, granularity, params, model_version, "
+                f"{', '.join(SUMMARY_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, {', '.join('?' * len(SUMMARY_COLUMNS))})",
+                (name, time.time(), periods, granularity, json.dumps(params), MODEL_VERSION,
+                 *[metrics[k] for k in SUMMARY_COLUMNS]),
+            )
+            conn.executemany("INSERT OR IGNORE INTO scenario_tags (scenario_id, tag) VALUES (?, ?)",
+                             [(cur.lastrowid, t) for t in tags if t])
+        return metrics
+
+    def delete(self, name):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM scenarios WHERE name = ?", (name,))
+
+    def count(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM scenarios").fetchone()[0]
+
+    def names(self):
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute("SELECT name FROM scenarios ORDER BY created_at")]
+
+    def tags(self):
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute("SELECT DISTINCT tag FROM scenario_tags ORDER BY tag")]
+
+    def get(self, name):
+        """(periods, params, granularity) for a stored scenario, or None"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT months, params, granularity FROM scenarios WHERE name = ?", (name,)).fetchone()
+        return None if row is None else (row[0], json.loads(row[1]), row[2])
+
+    def get_many(self, names):
+        """name -> (periods, params, granularity) for the stored scenarios among names, in one query"""
+        names = list(names)
+        rows = []
+        with self._connect() as conn:
+            # Stay under SQLite's bound-parameter limit
+            for i in range(0, len(names), 500):
+                chunk = names[i:i + 500]
+                rows += conn.execute(f"SELECT name, months, params, granularity FROM scenarios WHERE name IN ({', '.join('?' * len(chunk))})",
+                                     chunk).fetchall()
+        found = {name: (periods, json.loads(params), granularity) for name, periods, params, granularity in rows}
+        return {name: found[name] for name in names if name in found}
+
+    def summaries(self, names):
+        """Summary rows (name, months, granularity and SUMMARY_COLUMNS) for the stored scenarios among names, in order"""
+        names = list(names)
+        frames = []
+        with self._connect() as conn:
+            for i in range(0, len(names), 500):
+                chunk = names[i:i + 500]
+                frames.append(pd.read_sql_query(
+                    f"SELECT name, months, granularity, {', '.join(SUMMARY_COLUMNS)} FROM scenarios "
+                    f"WHERE name IN ({', '.join('?' * len(chunk))})", conn, params=chunk))
+        if not frames:
+            return pd.DataFrame(columns=["name", "months", "granularity"] + SUMMARY_COLUMNS)
+        found = pd.concat(frames, ignore_index=True).set_index("name")
+        return found.reindex([n for n in names if n in found.index]).reset_index()
+
+    def query(self, tag=None, name_contains=None, min_roi=None, order_by="final_roi_pct", descending=True,
+              limit=100, offset=0):
+        """Filtered, sorted page of scenario summaries as a DataFrame (no series are loaded)"""
+        if order_by not in SUMMARY_COLUMNS + ["name", "created_at"]:
+            raise ValueError(f"Cannot sort scenarios by {order_by!r}")
+        where, args = [], []
+        if tag:
+            where.append("id IN (SELECT scenario_id FROM scenario_tags WHERE tag = ?)")
+            args.append(tag)
+        if name_contains:
+            # % and _ in the search text are literal characters, not wildcards
+            escaped = name_contains.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            where.append("name LIKE ? ESCAPE '\\'")
+            args.append(f"%{escaped}%")
+        if min_roi is not None:
+            where.append("final_roi_pct >= ?")
+            args.append(min_roi)
+        sql = (
+            f"SELECT s.name, s.months, s.granularity, {', '.join('s.' + c for c in SUMMARY_COLUMNS)}, "
+            "(SELECT GROUP_CONCAT(tag, ', ') FROM scenario_tags t WHERE t.scenario_id = s.id) AS tags "
+            "FROM scenarios s"
+            + (" WHERE " + " AND ".join(where) if where else "")
+            + f" ORDER BY s.{order_by} {'DESC' if descending else 'ASC'}, s.name LIMIT ? OFFSET ?"
+        )
+        with self._connect() as conn:
+            return pd.read_sql_query(sql, conn, params=args + [limit, offset])
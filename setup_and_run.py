@@ -1,48 +1,159 @@
 #!/usr/bin/env python3
 """
 Setup script for AI Enterprise Integration Financial Intelligence Platform
+
+Skips pip when the requirements are already met: a fingerprint of requirements.txt,
+the interpreter and the installed versions of the listed packages is saved after each
+successful check or install, and a matching fingerprint means nothing changed.
+Arguments it does not recognise are passed on to `streamlit run`.
+
+    python setup_and_run.py                        # check (or install), then launch
+    python setup_and_run.py --reinstall            # always run pip first
+    python setup_and_run.py --server.port 8502     # extra options for streamlit
 """
+import argparse
+import hashlib
+import json
+import os
+import re
 import subprocess
 import sys
-import os
+import time
+from importlib import metadata
+
+REQUIREMENTS = "requirements.txt"
+FINGERPRINT_PATH = ".requirements.fingerprint"
+# Launch time handed to the app for its startup report (profiling.LAUNCH_TIME_ENV); this
+# script runs before the requirements are known to be installed, so it imports nothing from the app
+LAUNCH_TIME_ENV = "AI_ENTERPRISE_LAUNCHED_AT"
+
+def read_requirements(path=REQUIREMENTS):
+    """Requirement lines without comments and blanks"""
+    with open(path) as f:
+        lines = [line.split("#", 1)[0].strip() for line in f]
+    return [line for line in lines if line]
+
+def installed_versions(requirements):
+    """Installed version of each listed distribution (None when missing)"""
+    versions = {}
+    for line in requirements:
+        name = re.match(r"[A-Za-z0-9._-]+", line)
+        if name is None:
+            continue
+        try:
+            versions[name.group(0).lower()] = metadata.version(name.group(0))
+        except metadata.PackageNotFoundError:
+            versions[name.group(0).lower()] = None
+    return versions
+
+def requirements_fingerprint(requirements, versions):
+    """Hash of the requirement lines, this interpreter and the installed versions"""
+    payload = json.dumps({"requirements": requirements, "python": sys.executable, "version": sys.version,
+                          "installed": versions}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def requirements_satisfied(requirements):
+    """True if every requirement is installed at an allowed version.
+
+    Lines the check cannot interpret (pip options, URLs, markers needing packaging
+    when it is missing) count as unsatisfied, which leaves them to pip.
+    """
+    try:
+        from packaging.requirements import InvalidRequirement, Requirement
+    except ImportError:
+        return False
+    for line in requirements:
+        try:
+            req = Requirement(line)
+        except InvalidRequirement:
+            return False
+        if req.marker is not None and not req.marker.evaluate():
+            continue
+        if req.url:
+            return False
+        try:
+            version = metadata.version(req.name)
+        except metadata.PackageNotFoundError:
+            return False
+        if not req.specifier.contains(version, prereleases=True):
+            return False
+    return True
+
+def saved_fingerprint():
+    try:
+        with open(FINGERPRINT_PATH) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def save_fingerprint(fingerprint):
+    try:
+        with open(FINGERPRINT_PATH, "w") as f:
+            f.write(fingerprint + "\n")
+    except OSError as e:
+        print(f"⚠️ Could not save the requirements fingerprint: {e}")
 
 def install_requirements():
     """Install required packages"""
     try:
         print("📦 Installing required packages...")
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "-r", "requirements.txt"])
+        subprocess.check_call([sys.executable, "-m", "pip", "install", "-r", REQUIREMENTS])
         print("✅ Dependencies installed successfully!")
         return True
     except subprocess.CalledProcessError as e:
         print(f"❌ Error installing dependencies: {e}")
         return False
 
-def run_streamlit():
+def ensure_requirements(reinstall=False):
+    """Run pip only when the requirements changed or are not met; returns False if pip failed"""
+    requirements = read_requirements()
+    fingerprint = requirements_fingerprint(requirements, installed_versions(requirements))
+    if not reinstall and fingerprint == saved_fingerprint():
+        print("✅ Requirements unchanged since the last check, skipping pip")
+        return True
+    if not reinstall and requirements_satisfied(requirements):
+        print("✅ Requirements already satisfied, skipping pip")
+        save_fingerprint(fingerprint)
+        return True
+    if not install_requirements():
+        return False
+    save_fingerprint(requirements_fingerprint(requirements, installed_versions(requirements)))
+    return True
+
+def run_streamlit(streamlit_args=()):
     """Run the Streamlit app"""
     try:
         print("🚀 Starting AI Enterprise Integration Platform...")
-        subprocess.run([sys.executable, "-m", "streamlit", "run", "FFQ.py"])
+        subprocess.run([sys.executable, "-m", "streamlit", "run", "FFQ.py", *streamlit_args])
     except KeyboardInterrupt:
         print("\n👋 Application stopped by user")
     except Exception as e:
         print(f"❌ Error running application: {e}")
 
 def main():
+    launched_at = time.time()
+    parser = argparse.ArgumentParser(description="Install requirements if needed and launch the platform")
+    parser.add_argument("--reinstall", action="store_true", help="run pip even if the requirements are met")
+    args, streamlit_args = parser.parse_known_args()
+
     print("🤖 AI Enterprise Integration Financial Intelligence Platform")
     print("=" * 60)
-    
+
     # Check if requirements.txt exists
-    if not os.path.exists("requirements.txt"):
+    if not os.path.exists(REQUIREMENTS):
         print("❌ requirements.txt not found!")
         return
-    
+
     # Install dependencies
-    if install_requirements():
-        print("\n🎯 Setup complete! Starting application...")
-        run_streamlit()
+    started = time.perf_counter()
+    if ensure_requirements(args.reinstall):
+        print(f"\n🎯 Setup complete in {time.perf_counter() - started:.2f}s! Starting application...")
+        # The app's startup report counts from here (sidebar "🚀 Startup" and the server log)
+        os.environ[LAUNCH_TIME_ENV] = repr(launched_at)
+        run_streamlit(streamlit_args)
     else:
         print("\n❌ Setup failed. Please install dependencies manually:")
-        print("pip install streamlit pandas numpy plotly openpyxl xlsxwriter")
+        print("pip install -r requirements.txt")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
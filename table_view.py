@@ -0,0 +1,72 @@
+"""
+Server-side shaping for the detailed financial table
+
+The app never sends a whole table to the browser. Rows are filtered, sorted and
+cut to one page here on index arrays, so only the visible page is copied.
+Currency and percent formatting is left to typed column configs on the client.
+The helpers take plain wide DataFrames, one scenario or many stacked, and need
+no Streamlit.
+"""
+import numpy as np
+import pandas as pd
+
+from financial_engine import TABLE_FORMATS
+
+PAGE_SIZES = [100, 250, 500, 1000, 5000]
+DEFAULT_PAGE_SIZE = 500
+
+
+def column_format(column):
+    """printf-style client-side format for a wide-layout column, or None for the default"""
+    fmt = TABLE_FORMATS.get(column)
+    if fmt is None:
+        return None
+    return "$%.0f" if fmt.startswith("$") else "%.1f%%"
+
+
+def page_count(rows, page_size):
+    return max(-(-rows // page_size), 1)
+
+
+def _sorted_prefix(values, descending, count):
+    """Positions of the first `count` values in stable sorted order.
+
+    Numeric columns only partially sort: everything strictly before the
+    count-th value, then its ties in original order, so the result matches a
+    full stable sort without sorting rows that land on later pages.
+    """
+    if values.dtype.kind in "if" and count < len(values) and not np.isnan(values).any():
+        keys = -values if descending else values
+        boundary = np.partition(keys, count - 1)[count - 1]
+        before = np.flatnonzero(keys < boundary)
+        chosen = np.concatenate([before, np.flatnonzero(keys == boundary)[:count - len(before)]])
+        return chosen[np.lexsort((chosen, keys[chosen]))]
+    return pd.Series(values).sort_values(ascending=not descending, kind="stable").index.to_numpy()[:count]
+
+
+def table_page(df, columns=None, period_column=None, period_range=None, filter_column=None, filter_min=None,
+               filter_max=None, sort_by=None, descending=False, page=1, page_size=DEFAULT_PAGE_SIZE):
+    """One page of df after filtering and sorting, plus the number of matching rows.
+
+    period_range is an inclusive (first, last) on period_column; filter_min and
+    filter_max bound filter_column (None = open). Sorting is stable, so ties keep
+    the scenario/period order. Only the returned page is materialized.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    if period_range is not None:
+        period = df[period_column].to_numpy()
+        mask &= (period >= period_range[0]) & (period <= period_range[1])
+    if filter_column is not None:
+        values = df[filter_column].to_numpy()
+        if filter_min is not None:
+            mask &= values >= filter_min
+        if filter_max is not None:
+            mask &= values <= filter_max
+    rows = np.flatnonzero(mask)
+    matching = len(rows)
+    start = (max(page, 1) - 1) * page_size
+    if sort_by is not None:
+        # Only the rows up to the end of this page are sorted (and kept)
+        rows = rows[_sorted_prefix(df[sort_by].to_numpy()[rows], descending, start + page_size)]
+    positions = [df.columns.get_loc(c) for c in (columns or df.columns)]
+    return df.iloc[rows[start:start + page_size], positions], matching
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from charts import DOWNSAMPLE_MAX_POINTS, REVENUE_COLUMNS, build_figures, revenue_stack_figure
+from financial_engine import AI_ENTERPRISE_DEFAULTS, compact_financials
+from result_cache import estimate_nbytes
+
+
+@pytest.fixture(scope="module")
+def long_frame():
+    return compact_financials(1200 * 52 // 12, AI_ENTERPRISE_DEFAULTS, "weekly").to_frame()
+
+
+def test_revenue_stack_downsamples_to_aligned_bucket_means(long_frame):
+    fig = revenue_stack_figure(long_frame, downsample=True)
+    assert all(len(trace.x) <= DOWNSAMPLE_MAX_POINTS for trace in fig.data)
+    assert len({tuple(trace.x) for trace in fig.data}) == 1
+    size = -(-len(long_frame) // DOWNSAMPLE_MAX_POINTS)
+    for trace, column in zip(fig.data, REVENUE_COLUMNS):
+        values = long_frame[column].to_numpy(dtype=float)
+        assert trace.y[0] == pytest.approx(values[:size].mean())
+        # Every bucket but a shorter last one spans `size` periods, so the means give back the total
+        counts = np.minimum(size, len(values) - np.arange(len(trace.y)) * size)
+        assert np.dot(trace.y, counts) == pytest.approx(values.sum())
+
+
+def test_revenue_stack_keeps_every_period_without_downsampling(long_frame):
+    fig = revenue_stack_figure(long_frame, downsample=False)
+    assert all(len(trace.x) == len(long_frame) for trace in fig.data)
+
+
+def test_cached_figure_size_reuses_the_payload_measurement(long_frame, monkeypatch):
+    built = build_figures({"revenue_stack": revenue_stack_figure}, long_frame.head(36))
+    monkeypatch.setattr(type(built["revenue_stack"]["figure"]), "to_json", lambda self: pytest.fail("serialized again"))
+    assert estimate_nbytes(built) >= built["revenue_stack"]["payload_bytes"]
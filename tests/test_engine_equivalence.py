@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from financial_engine import (
+    AI_ENTERPRISE_DEFAULTS, AI_ENTERPRISE_PARAMS, GRANULARITIES, MONTHS, SCENARIO_PRESETS, batch_stacked_frame,
+    compact_financials, generate_ai_enterprise_financials, generate_ai_enterprise_financials_batch, horizon_periods,
+    parameter_bounds,
+)
+
+
+def random_scenarios(n, seed=0):
+    """n parameter sets drawn uniformly inside parameter_bounds(), integer inputs rounded"""
+    rng = np.random.default_rng(seed)
+    rows = [{} for _ in range(n)]
+    for name, (low, high, integer) in parameter_bounds(MONTHS).items():
+        for row, value in zip(rows, rng.uniform(low, high, n)):
+            row[name] = int(round(value)) if integer else float(value)
+    return rows
+
+
+SCENARIOS = {"defaults": dict(AI_ENTERPRISE_DEFAULTS), **SCENARIO_PRESETS,
+             **{f"random {i + 1}": p for i, p in enumerate(random_scenarios(8))}}
+
+
+@pytest.fixture(scope="module", params=list(GRANULARITIES))
+def stacked(request):
+    """(granularity, periods, batch_stacked_frame of every scenario in one batch)"""
+    granularity = request.param
+    periods = horizon_periods(MONTHS, granularity)
+    batch = generate_ai_enterprise_financials_batch(periods, list(SCENARIOS.values()), granularity=granularity)
+    return granularity, periods, batch_stacked_frame(batch, list(SCENARIOS))
+
+
+@pytest.mark.parametrize("name", list(SCENARIOS))
+def test_stacked_frame_matches_per_scenario_frame(stacked, name):
+    granularity, periods, frame = stacked
+    rows = frame[frame["Scenario"] == name].drop(columns="Scenario").reset_index(drop=True)
+    single = compact_financials(periods, SCENARIOS[name], granularity).to_frame()
+    pd.testing.assert_frame_equal(rows, single, check_dtype=False, check_exact=True)
+
+
+@pytest.mark.parametrize("name", list(SCENARIOS))
+def test_compact_financials_matches_positional_api(name):
+    params = SCENARIOS[name]
+    frame = generate_ai_enterprise_financials(MONTHS, *(params[p] for p in AI_ENTERPRISE_PARAMS))
+    pd.testing.assert_frame_equal(compact_financials(MONTHS, params).to_frame(), frame, check_exact=True)
+
+
+def test_stacked_frame_keeps_scenario_order_and_length(stacked):
+    _, periods, frame = stacked
+    assert len(frame) == periods * len(SCENARIOS)
+    assert frame["Scenario"].iloc[::periods].tolist() == list(SCENARIOS)
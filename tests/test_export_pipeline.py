@@ -0,0 +1,98 @@
+import io
+import json
+import zipfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from arrow_io import SweepFile
+from export_pipeline import EXPORT_FORMATS, PARQUET_SUMMARY_KEY, export_scenarios
+from financial_engine import AI_ENTERPRISE_DEFAULTS, compact_financials
+
+
+@pytest.fixture
+def scenarios():
+    """One monthly and one weekly scenario over the same year"""
+    return [("Monthly", compact_financials(12, AI_ENTERPRISE_DEFAULTS, "monthly").to_frame()),
+            ("Weekly", compact_financials(52, AI_ENTERPRISE_DEFAULTS, "weekly").to_frame())]
+
+
+@pytest.fixture
+def summary():
+    return pd.DataFrame({"name": ["Monthly", "Weekly"], "npv": [1.0, 2.0]})
+
+
+def export(fmt, scenarios, summary):
+    output = io.BytesIO()
+    export_scenarios(output, fmt, iter(scenarios), summary)
+    output.seek(0)
+    return output
+
+
+@pytest.mark.parametrize("fmt", list(EXPORT_FORMATS))
+def test_mixed_granularities_export_to_every_format(fmt, scenarios, summary):
+    output = export(fmt, scenarios, summary)
+    if fmt == "xlsx":
+        sheets = pd.read_excel(output, sheet_name=None)
+        assert list(sheets) == ["Summary", "Monthly", "Weekly"]
+        for name, df in scenarios:
+            pd.testing.assert_frame_equal(sheets[name], df, check_dtype=False)
+    elif fmt == "csv.zip":
+        with zipfile.ZipFile(output) as archive:
+            assert archive.namelist() == ["summary.csv", "Monthly.csv", "Weekly.csv"]
+            for name, df in scenarios:
+                pd.testing.assert_frame_equal(pd.read_csv(archive.open(f"{name}.csv")), df, check_dtype=False)
+    else:
+        table = pq.read_table(output) if fmt == "parquet" else pa.ipc.open_file(output).read_all()
+        assert json.loads(table.schema.metadata[PARQUET_SUMMARY_KEY]) == summary.to_dict(orient="records")
+        stacked = table.to_pandas()
+        assert stacked.columns[0] == "Period"
+        assert list(stacked.columns[-2:]) == ["Granularity", "Scenario"]
+        assert "AI Implementations per Period" in stacked
+        assert stacked.groupby("Scenario", sort=False)["Granularity"].unique().map(list).to_dict() == {
+            "Monthly": ["monthly"], "Weekly": ["weekly"]}
+        for name, df in scenarios:
+            rows = stacked[stacked["Scenario"] == name]
+            assert rows["Period"].tolist() == df.iloc[:, 0].tolist()
+            assert rows["Profit"].tolist() == df["Profit"].tolist()
+
+
+def test_sweep_file_reads_a_mixed_arrow_export(tmp_path, scenarios, summary):
+    path = tmp_path / "export.arrow"
+    path.write_bytes(export("arrow", scenarios, summary).getvalue())
+    sweep = SweepFile(str(path))
+    try:
+        assert sweep.summary()["periods"].tolist() == [12, 52]
+        for name, df in scenarios:
+            pd.testing.assert_frame_equal(sweep.frame(name), df, check_dtype=False)
+    finally:
+        sweep.close()
+
+
+def test_frame_without_a_period_column_is_rejected(summary):
+    with pytest.raises(ValueError, match="period"):
+        export("parquet", [("Bad", pd.DataFrame({"Profit": [1]}))], summary)
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_schema_does_not_follow_the_first_scenario(fmt, scenarios, summary):
+    (_, first), (_, second) = scenarios
+    first = first.astype({"Profit": "int32", "Enterprise Clients": "int64"})
+    second = second.astype({"Profit": "float64", "Enterprise Clients": "float64"})
+    output = io.BytesIO()
+    # One scenario per row group / record batch, so each is cast on its own
+    EXPORT_FORMATS[fmt][3](output, [("Monthly", first), ("Weekly", second)], summary, 1)
+    output.seek(0)
+    table = pq.read_table(output) if fmt == "parquet" else pa.ipc.open_file(output).read_all()
+    assert table.schema.field("Profit").type == pa.float64()
+    assert table.schema.field("Period").type == pa.int64()
+    assert table.num_rows == 12 + 52
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_empty_export_still_has_the_schema(fmt):
+    table = (pq.read_table if fmt == "parquet" else lambda f: pa.ipc.open_file(f).read_all())(export(fmt, [], None))
+    assert table.num_rows == 0
+    assert table.column_names[0] == "Period"
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from table_view import _sorted_prefix, page_count, table_page
+
+ROWS = 1037
+PAGE_SIZE = 100
+
+
+@pytest.fixture(scope="module")
+def table():
+    """Stacked-looking table: ties in "Clients", NaN in "ROI %", unique "Profit" """
+    rng = np.random.default_rng(7)
+    roi = rng.normal(10, 5, ROWS).round(1)
+    roi[rng.choice(ROWS, 50, replace=False)] = np.nan
+    return pd.DataFrame({
+        "Scenario": np.repeat([f"Scenario {i}" for i in range(ROWS // 61 + 1)], 61)[:ROWS],
+        "Month": np.tile(np.arange(1, 62), ROWS // 61 + 1)[:ROWS],
+        "Clients": rng.integers(0, 5, ROWS),
+        "ROI %": roi,
+        "Profit": rng.permutation(ROWS) * 1000.0 - 400_000,
+    })
+
+
+def expected_page(df, sort_by, descending, page, page_size=PAGE_SIZE):
+    start = (page - 1) * page_size
+    return df.sort_values(sort_by, ascending=not descending, kind="stable").iloc[start:start + page_size]
+
+
+PAGES = [1, 2, page_count(ROWS, PAGE_SIZE), page_count(ROWS, PAGE_SIZE) + 3]
+
+
+@pytest.mark.parametrize("page", PAGES, ids=["first", "second", "last partial", "past the end"])
+@pytest.mark.parametrize("descending", [False, True], ids=["ascending", "descending"])
+@pytest.mark.parametrize("sort_by", ["Profit", "Clients", "ROI %", "Scenario"])
+def test_sorted_page_matches_full_sort(table, sort_by, descending, page):
+    rows, total = table_page(table, sort_by=sort_by, descending=descending, page=page, page_size=PAGE_SIZE)
+    assert total == ROWS
+    pd.testing.assert_frame_equal(rows, expected_page(table, sort_by, descending, page))
+
+
+def test_last_partial_and_past_the_end_pages(table):
+    last = page_count(ROWS, PAGE_SIZE)
+    rows, _ = table_page(table, sort_by="Profit", page=last, page_size=PAGE_SIZE)
+    assert len(rows) == ROWS - (last - 1) * PAGE_SIZE
+    rows, total = table_page(table, sort_by="Profit", page=last + 1, page_size=PAGE_SIZE)
+    assert rows.empty and total == ROWS
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_ties_keep_original_order_and_nan_sorts_last(table, descending):
+    positions = _sorted_prefix(table["Clients"].to_numpy(), descending, 300)
+    clients = table["Clients"].to_numpy()[positions]
+    assert (np.diff(clients) <= 0).all() if descending else (np.diff(clients) >= 0).all()
+    for value in np.unique(clients):
+        tied = positions[clients == value]
+        assert (np.diff(tied) > 0).all()
+    positions = _sorted_prefix(table["ROI %"].to_numpy(), descending, ROWS)
+    assert np.isnan(table["ROI %"].to_numpy()[positions][-50:]).all()
+
+
+@pytest.mark.parametrize("page", [1, 3])
+@pytest.mark.parametrize("descending", [False, True])
+def test_filtered_sorted_page_matches_full_sort(table, descending, page):
+    rows, total = table_page(table, columns=["Scenario", "Month", "Profit"], period_column="Month", period_range=(5, 40),
+                             filter_column="Clients", filter_min=1, filter_max=3, sort_by="Profit", descending=descending,
+                             page=page, page_size=50)
+    kept = table[table["Month"].between(5, 40) & table["Clients"].between(1, 3)]
+    assert total == len(kept)
+    pd.testing.assert_frame_equal(rows, expected_page(kept, "Profit", descending, page, 50)[["Scenario", "Month", "Profit"]])